@@ -1,6 +1,10 @@
 from flask import Flask
 from flask_cors import CORS
 from config.settings import config
+from app.utils.cache import SharedCache
+from app.utils.bar_store import BarStore
+from app.utils.recommendation_store import RecommendationStore
+from app.utils import auth_utils, circuit_breaker, deadlines, errors, http_client, metrics, rate_limiter
 
 def create_app(config_name='default'):
     """Application factory function"""
@@ -11,12 +15,59 @@ def create_app(config_name='default'):
     
     # Initialize CORS
     CORS(app, resources={r"/*": {"origins": app.config['FRONTEND_URL']}})
+
+    # Per-request trace IDs in the logs and request/stage latency metrics
+    metrics.init_app(app)
+
+    # Request deadlines that upstream calls inherit, and per-upstream circuit breakers
+    deadlines.init_app(app)
+    circuit_breaker.init_app(app)
+
+    # JSON error responses (400/409/422/503/504/500) for exceptions the views raise
+    errors.init_app(app)
+
+    # Pooled, keep-alive client for outbound HTTP calls
+    http_client.init_app(app)
+
+    # Token-bucket budgets every upstream call queues on
+    rate_limiter.init_app(app)
+
+    # Service token for the throttle service
+    auth_utils.init_app(app)
+
+    # Shared cache for upstream market data
+    app.extensions['market_data_cache'] = SharedCache(
+        name='market_data',
+        path=app.config['CACHE_PATH'],
+        max_entries=app.config['CACHE_MAX_ENTRIES'],
+        stale_seconds=app.config['CACHE_STALE_SECONDS'],
+        refresh_lease_seconds=app.config['CACHE_REFRESH_LEASE_SECONDS']
+    )
+    app.extensions['bar_store'] = BarStore(app.config['BAR_STORE_PATH'])
+
+    # Persisted recommendations, replayed for retries that reuse an Idempotency-Key
+    app.extensions['recommendation_store'] = RecommendationStore(
+        path=app.config['RECOMMENDATION_STORE_PATH'],
+        lease_seconds=app.config['IDEMPOTENCY_LEASE_SECONDS'],
+        wait_seconds=app.config['IDEMPOTENCY_WAIT_SECONDS']
+    )
+
+    # One OpenAI client per worker, shared by every request
+    from app.services import openai_service
+    openai_service.init_app(app)
     
     # Register blueprints
     from app.routes.portfolio import portfolio_bp
     from app.routes.trade import trade_bp
+    from app.routes.ops import ops_bp
+    from app.routes.recommendations import recommendations_bp
     
     app.register_blueprint(portfolio_bp)
     app.register_blueprint(trade_bp)
+    app.register_blueprint(ops_bp)
+    app.register_blueprint(recommendations_bp)
+
+    from app.cli import register_commands
+    register_commands(app)
     
     return app 
\ No newline at end of file
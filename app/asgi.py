@@ -0,0 +1,66 @@
+from typing import Optional
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import Flask
+from quart import Quart
+from quart_cors import cors
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from app.utils import circuit_breaker, deadlines, errors, metrics
+
+class AsgiDispatcher:
+    """Serve the async blueprints natively and every other route through the Flask app.
+
+    Requests whose path and method match a route on the Quart app run on the
+    event loop; anything else (operational endpoints, CLI-only features) is
+    handed to the WSGI app on a thread.
+    """
+
+    def __init__(self, async_app: Quart, wsgi_app: Flask):
+        self.async_app = async_app
+        self.wsgi_app = wsgi_app
+        self._wsgi = WsgiToAsgi(wsgi_app)
+        self._adapter = async_app.url_map.bind("localhost")
+
+    def _is_async_route(self, scope) -> bool:
+        try:
+            self._adapter.match(scope["path"], method=scope["method"])
+            return True
+        except HTTPException:
+            return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not self._is_async_route(scope):
+            return await self._wsgi(scope, receive, send)
+        return await self.async_app(scope, receive, send)
+
+def create_asgi_app(config_name: str = 'default', wsgi_app: Optional[Flask] = None) -> AsgiDispatcher:
+    """Application factory for the ASGI (async) request path.
+
+    The Quart app shares config and extensions (caches, bar store, LLM cache)
+    with the Flask app, so both paths read and fill the same state.
+    """
+    wsgi_app = wsgi_app or create_app(config_name)
+
+    app = Quart(__name__)
+    app.config.from_mapping(wsgi_app.config)
+    app.extensions = wsgi_app.extensions
+    metrics.init_async_app(app)
+    deadlines.init_async_app(app)
+    circuit_breaker.init_async_app(app)
+    errors.init_async_app(app)
+    app = cors(app, allow_origin=wsgi_app.config['FRONTEND_URL'] or "*")
+
+    from app.routes.async_portfolio import portfolio_bp
+    from app.routes.async_trade import trade_bp
+
+    app.register_blueprint(portfolio_bp)
+    app.register_blueprint(trade_bp)
+
+    @app.after_serving
+    async def close_http_client():
+        from app.utils import async_http_client
+        await async_http_client.aclose()
+
+    return AsgiDispatcher(app, wsgi_app)
@@ -0,0 +1,104 @@
+import json
+from datetime import date, timedelta
+
+import click
+from flask import Flask, current_app
+
+from app.services.backtest_service import BacktestService
+from app.services.polygon_service import PolygonService
+from app.services.prewarm_service import PrewarmService
+from app.utils.market_hours import last_market_close
+
+def register_commands(app: Flask) -> None:
+    """Register the application's Flask CLI commands."""
+
+    @app.cli.command("ingest-bars")
+    @click.option("--start", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+                  help="First day to ingest; must follow the last ingested day (default: the day after it).")
+    @click.option("--end", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+                  help="Last day to ingest (default: last completed session).")
+    def ingest_bars(start, end):
+        """Ingest grouped-daily OHLCV bars into the local bar store."""
+        store = current_app.extensions['bar_store']
+        delay = current_app.config['MARKET_DATA_DELAY_MINUTES']
+
+        end_day = end.date() if end else last_market_close(delay_minutes=delay).date()
+        through = store.ingested_through()
+        if start:
+            start_day = start.date()
+            # The store only appends after its last day, so earlier bars would be dropped
+            if through and start_day <= through:
+                raise click.ClickException(
+                    f"--start {start_day.isoformat()} overlaps the bar store, which is ingested through "
+                    f"{through.isoformat()}; start after that day or omit --start"
+                )
+        else:
+            start_day = through + timedelta(days=1) if through else end_day - timedelta(
+                days=current_app.config['BAR_STORE_BACKFILL_DAYS'])
+
+        if start_day > end_day:
+            click.echo(f"Bar store is already current through {end_day.isoformat()}")
+            return
+
+        appended = PolygonService().ingest_bars(start_day, end_day)
+        click.echo(f"Ingested {sum(appended.values())} bars over {len(appended)} days "
+                   f"({start_day.isoformat()} to {end_day.isoformat()})")
+
+    @app.cli.command("prewarm")
+    @click.argument("tickers", nargs=-1)
+    def prewarm(tickers):
+        """Pre-warm trend closes and previous-close prices (default: the watchlist)."""
+        report = PrewarmService().run([t.upper() for t in tickers] or None)
+        click.echo(f"Pre-warmed {report['tickers']} tickers in {report['seconds']}s "
+                   f"({report['closes_fetched']} closes fetched, {report['prices_cached']} prices cached)")
+        for ticker, error in report["errors"].items():
+            click.echo(f"  {ticker}: {error}")
+
+    @app.cli.command("backtest")
+    @click.argument("decisions", type=click.File("r"))
+    @click.option("--start", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+                  help="First day to simulate (default: the earliest decision).")
+    @click.option("--end", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+                  help="Last day to simulate (default: the latest close in the bar store).")
+    @click.option("--cost-bps", type=float, default=None,
+                  help="Cost per trade in basis points of its value (default: BACKTEST_COST_BPS).")
+    @click.option("--fixed-cost", type=float, default=None,
+                  help="Cost per trade in currency (default: BACKTEST_FIXED_COST).")
+    @click.option("--output", type=click.Path(dir_okay=False), default=None,
+                  help="Write the full report to this JSON file.")
+    def backtest(decisions, start, end, cost_bps, fixed_cost, output):
+        """Backtest recorded allocations against buy-and-hold on the bar store's closes.
+
+        DECISIONS is a JSON file of portfolios, each with dated decisions
+        shaped like /manipulate-portfolio's ``portfolio`` or as ``targets``.
+        """
+        service = BacktestService()
+        try:
+            portfolios = service.parse_portfolios(json.load(decisions))
+            report = service.run(portfolios, start.date() if start else None, end.date() if end else None,
+                                 cost_bps, fixed_cost)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        click.echo(f"{len(portfolios)} portfolios, {report['start']} to {report['end']} "
+                   f"({report['days']} days), {report['seconds']}s")
+        if report["missing"]:
+            click.echo(f"No closes for: {', '.join(report['missing'])}")
+        click.echo(f"{'portfolio':<16}{'return':>9}{'hold':>9}{'excess':>9}{'cagr':>8}{'vol':>8}"
+                   f"{'maxdd':>8}{'turnover':>10}{'costs':>10}")
+        for result in report["portfolios"]:
+            strategy = result["strategy"]
+
+            def percent(value):
+                return "n/a" if value is None else f"{100 * value:.1f}%"
+
+            click.echo(f"{str(result['id']):<16}{percent(strategy['total_return']):>9}"
+                       f"{percent(result['buy_and_hold']['total_return']):>9}{percent(result['excess_return']):>9}"
+                       f"{percent(strategy['cagr']):>8}{percent(strategy['volatility']):>8}"
+                       f"{percent(strategy['max_drawdown']):>8}{strategy['turnover'] or 0:>9.2f}x"
+                       f"{strategy['costs'] or 0:>10.2f}")
+
+        if output:
+            with open(output, "w") as f:
+                json.dump(report, f, indent=2)
+            click.echo(f"Saved report to {output}")
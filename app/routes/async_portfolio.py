@@ -0,0 +1,106 @@
+from quart import Blueprint, request, jsonify, current_app
+from http import HTTPStatus
+from app.services.async_portfolio_service import AsyncPortfolioService
+from app.routes.portfolio import assessment_mode, validate_portfolio_request, validate_rebalance_batch_request
+from app.utils.llm_cache import bypass_requested
+from app.utils.streaming import wants_event_stream, async_sse_response
+from app.utils.rate_limiter import INTERACTIVE, priority
+from app.routes.recommendations import claim_recommendation, recommendation_headers
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = getLogger(__name__)
+portfolio_bp = Blueprint('portfolio', __name__)
+
+def create_service() -> AsyncPortfolioService:
+    return AsyncPortfolioService(
+        current_app._get_current_object(),
+        bypass_cache=bypass_requested(request.headers)
+    )
+
+async def record_recommendation(
+    endpoint: str,
+    payload: Any,
+    run: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Run a recommendation request once per Idempotency-Key and store its result."""
+    claim = claim_recommendation(request.headers, endpoint, payload)
+    if claim is None:
+        return await run(), {}
+
+    record_id, result, replayed = await current_app.extensions['recommendation_store'].record_async(*claim, run)
+    return result, recommendation_headers(record_id, replayed)
+
+@portfolio_bp.route('/build-portfolio', methods=['GET'])
+async def build_portfolio():
+    """Get initial portfolio recommendations based on user preferences and cash."""
+    prompt = request.args.get('prompt', '')
+
+    portfolio_service = create_service()
+    if wants_event_stream(request.headers):
+        return async_sse_response(portfolio_service.generate_stream(prompt=prompt))
+
+    result = await portfolio_service.generate(prompt=prompt)
+
+    return jsonify({"recommendation": result}), HTTPStatus.OK
+
+@portfolio_bp.route('/manipulate-portfolio', methods=['POST'])
+async def manipulate_portfolio():
+    """Get recommendations for portfolio changes based on current holdings."""
+    data = await request.get_json()
+    validate_portfolio_request(data)
+
+    portfolio_service = create_service()
+
+    async def manipulate():
+        with priority(INTERACTIVE):
+            return await portfolio_service.manipulate(
+                cash=data['cash'],
+                totals=data['totals'],
+                additional_info=data.get('additionalInfo', '')
+            )
+
+    result, headers = await record_recommendation("manipulate_portfolio", data, manipulate)
+    return jsonify(result), HTTPStatus.OK, headers
+
+@portfolio_bp.route('/manipulate-portfolio/batch', methods=['POST'])
+async def manipulate_portfolio_batch():
+    """Rebalance many accounts to a shared target allocation, or one per account."""
+    data = await request.get_json(silent=True)
+    validate_rebalance_batch_request(data, current_app.config)
+
+    portfolio_service = create_service()
+    result = await portfolio_service.rebalance_accounts(
+        accounts=data['accounts'],
+        targets=data.get('targets'),
+        prices=data.get('prices')
+    )
+
+    return jsonify(result), HTTPStatus.OK
+
+@portfolio_bp.route('/assess-risk-and-diversify', methods=['POST'])
+async def assess_risk_and_diversify():
+    """Assess risk and recommend diversification strategies."""
+    data = await request.get_json()
+    validate_portfolio_request(data)
+    mode = assessment_mode(request.args, data)
+
+    portfolio_service = create_service()
+    if wants_event_stream(request.headers) and mode == "full":
+        return async_sse_response(portfolio_service.assess_risk_and_diversify_stream(
+            cash=data['cash'],
+            totals=data['totals'],
+            additional_info=data.get('additionalInfo', '')
+        ))
+
+    result, headers = await record_recommendation(
+        "assess_risk_and_diversify",
+        {**data, "mode": mode},
+        lambda: portfolio_service.assess_risk_and_diversify(
+            cash=data['cash'],
+            totals=data['totals'],
+            additional_info=data.get('additionalInfo', ''),
+            mode=mode
+        )
+    )
+    return jsonify(result), HTTPStatus.OK, headers
@@ -0,0 +1,81 @@
+from quart import Blueprint, request, jsonify, current_app
+from http import HTTPStatus
+from app.services.async_polygon_service import AsyncPolygonService
+from app.services.async_tweet_service import AsyncTweetService
+from app.services.tweet_service import TRADE_FIELDS
+from app.routes.trade import parse_trend_params, validate_batch_request, validate_tweet_batch_request
+from app.utils.llm_cache import bypass_requested
+from app.utils.streaming import wants_event_stream, async_sse_response
+from logging import getLogger
+from typing import Any, AsyncIterator, Tuple
+
+logger = getLogger(__name__)
+
+trade_bp = Blueprint('trade', __name__)
+
+@trade_bp.route("/trade", methods=["GET"])
+async def analyze_trade():
+    """Analyze trade using polygon.io data and trend analysis."""
+    ticker = request.args.get("ticker")
+    if not ticker:
+        return jsonify({"error": "Ticker is required"}), HTTPStatus.BAD_REQUEST
+
+    polygon_service = AsyncPolygonService(current_app._get_current_object())
+    trend_analysis = await polygon_service.analyze_trend(
+        ticker, **parse_trend_params(request.args, current_app.config)
+    )
+
+    return jsonify(trend_analysis), HTTPStatus.OK
+
+@trade_bp.route("/trade/batch", methods=["POST"])
+async def analyze_trade_batch():
+    """Analyze trends for several tickers in one request."""
+    data = await request.get_json(silent=True)
+    tickers = validate_batch_request(data, current_app.config)
+
+    polygon_service = AsyncPolygonService(current_app._get_current_object())
+    trend_analysis = await polygon_service.analyze_trends(
+        tickers, **parse_trend_params(data, current_app.config)
+    )
+
+    return jsonify(trend_analysis), HTTPStatus.OK
+
+async def stream_tweet(deltas: AsyncIterator[str]) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield each tweet delta as a ``token`` event, then the full tweet."""
+    parts = []
+    async for delta in deltas:
+        parts.append(delta)
+        yield "token", {"delta": delta}
+    yield "result", {"response": "".join(parts)}
+
+@trade_bp.route("/tweet", methods=["GET"])
+async def generate_tweet():
+    """Generate a tweet about a trade."""
+    if not all(request.args.get(param) for param in TRADE_FIELDS):
+        return jsonify({"error": "Missing required parameters"}), HTTPStatus.BAD_REQUEST
+
+    tweet_service = AsyncTweetService(
+        current_app._get_current_object(),
+        bypass_cache=bypass_requested(request.headers)
+    )
+    trade = {param: request.args.get(param) for param in TRADE_FIELDS}
+    if wants_event_stream(request.headers):
+        return async_sse_response(stream_tweet(tweet_service.tweet_stream(trade)))
+
+    tweet = await tweet_service.tweet(trade)
+
+    return jsonify({"response": tweet}), HTTPStatus.OK
+
+@trade_bp.route("/tweet/batch", methods=["POST"])
+async def generate_tweet_batch():
+    """Generate tweets about several trades with as few OpenAI completions as possible."""
+    data = await request.get_json(silent=True)
+    trades = validate_tweet_batch_request(data, current_app.config)
+
+    tweet_service = AsyncTweetService(
+        current_app._get_current_object(),
+        bypass_cache=bypass_requested(request.headers)
+    )
+    tweets = await tweet_service.tweet_batch(trades)
+
+    return jsonify(tweets), HTTPStatus.OK
@@ -0,0 +1,44 @@
+from flask import Blueprint, Response, jsonify, current_app
+from http import HTTPStatus
+from logging import getLogger
+from app.utils import circuit_breaker, metrics, rate_limiter, singleflight
+from app.utils.access import require_token
+
+logger = getLogger(__name__)
+ops_bp = Blueprint('ops', __name__)
+
+# Off unless OPS_TOKEN is set, and then only for callers presenting it
+ops_bp.before_request(require_token('OPS_TOKEN'))
+
+@ops_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Report LLM response cache hit/miss counts."""
+    return jsonify({"llm": current_app.extensions['llm_cache'].stats()}), HTTPStatus.OK
+
+@ops_bp.route('/coalescing/stats', methods=['GET'])
+def coalescing_stats():
+    """Report upstream calls made and calls coalesced onto an in-flight one."""
+    return jsonify(singleflight.stats()), HTTPStatus.OK
+
+@ops_bp.route('/prewarm/report', methods=['GET'])
+def prewarm_report():
+    """Report the timings of the last post-close pre-warm run in this worker."""
+    report = current_app.extensions.get('prewarm_report')
+    if report is None:
+        return jsonify({"error": "No pre-warm run yet"}), HTTPStatus.NOT_FOUND
+    return jsonify(report), HTTPStatus.OK
+
+@ops_bp.route('/rate-limits/stats', methods=['GET'])
+def rate_limit_stats():
+    """Report admissions, waits, timeouts and queue depth per upstream rate limiter."""
+    return jsonify(rate_limiter.stats()), HTTPStatus.OK
+
+@ops_bp.route('/circuit-breakers/stats', methods=['GET'])
+def circuit_breaker_stats():
+    """Report the state and call outcomes of every upstream circuit breaker."""
+    return jsonify(circuit_breaker.stats()), HTTPStatus.OK
+
+@ops_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Serve this worker's latency, error, token, cache and queue metrics for Prometheus."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
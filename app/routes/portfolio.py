@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from http import HTTPStatus
-from app.services.portfolio_service import PortfolioService
+from app.services.portfolio_service import PortfolioService, ASSESSMENT_MODES
+from app.utils.streaming import wants_event_stream, sse_response
+from app.utils.rate_limiter import INTERACTIVE, priority
+from app.routes.recommendations import record_recommendation
 from logging import getLogger
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 logger = getLogger(__name__)
 portfolio_bp = Blueprint('portfolio', __name__)
@@ -10,25 +13,17 @@ portfolio_bp = Blueprint('portfolio', __name__)
 @portfolio_bp.route('/build-portfolio', methods=['GET'])
 def build_portfolio():
     """Get initial portfolio recommendations based on user preferences and cash."""
-    try:
-        prompt = request.args.get('prompt', '')
-        
-        portfolio_service = PortfolioService()
-        result = portfolio_service.generate(
-            prompt=prompt
-        )
-        
-        return jsonify({"recommendation": result}), HTTPStatus.OK
-        
-    except ValueError as e:
-        logger.warning(f"Invalid request: {str(e)}")
-        return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
-    except Exception as e:
-        logger.error(f"Error in build_portfolio: {str(e)}", exc_info=True)
-        return jsonify({
-            "error": "Internal server error",
-            "details": str(e)
-        }), HTTPStatus.INTERNAL_SERVER_ERROR
+    prompt = request.args.get('prompt', '')
+    
+    portfolio_service = PortfolioService()
+    if wants_event_stream():
+        return sse_response(portfolio_service.generate_stream(prompt=prompt))
+
+    result = portfolio_service.generate(
+        prompt=prompt
+    )
+    
+    return jsonify({"recommendation": result}), HTTPStatus.OK
 
 def validate_portfolio_request(data: Dict[str, Any]) -> None:
     """Validate the portfolio manipulation request data."""
@@ -41,53 +36,118 @@ def validate_portfolio_request(data: Dict[str, Any]) -> None:
     if not isinstance(data.get('totals'), dict):
         raise ValueError("Totals must be a dictionary of holdings")
 
+def assessment_mode(args: Dict[str, Any], data: Dict[str, Any]) -> str:
+    """Read the assessment ``mode`` from the query string or body (default ``full``)."""
+    mode = args.get('mode') or data.get('mode') or "full"
+    if mode not in ASSESSMENT_MODES:
+        raise ValueError(f"Mode must be one of: {', '.join(ASSESSMENT_MODES)}")
+    return mode
+
+def validate_targets(targets: Any, name: str = "Targets") -> None:
+    """Validate a target allocation of percentages by ticker."""
+    if not isinstance(targets, dict) or not targets:
+        raise ValueError(f"{name} must be a non-empty dictionary of percentages by ticker")
+
+    if not all(isinstance(p, (int, float)) and p >= 0 for p in targets.values()):
+        raise ValueError(f"{name} percentages must be non-negative numbers")
+
+    if sum(targets.values()) > 100 + 1e-9:
+        raise ValueError(f"{name} percentages must not add up to more than 100")
+
+def validate_rebalance_batch_request(data: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> None:
+    """Validate the batch rebalance request data."""
+    if not isinstance(data, dict):
+        raise ValueError("Invalid request body")
+
+    accounts = data.get('accounts')
+    if not isinstance(accounts, list) or not accounts:
+        raise ValueError("Accounts must be a non-empty list")
+
+    max_accounts = (config or current_app.config)['REBALANCE_BATCH_MAX_ACCOUNTS']
+    if len(accounts) > max_accounts:
+        raise ValueError(f"At most {max_accounts} accounts are allowed per batch")
+
+    if data.get('targets') is not None:
+        validate_targets(data['targets'])
+
+    prices = data.get('prices')
+    if prices is not None and not (
+        isinstance(prices, dict) and all(isinstance(p, (int, float)) and p > 0 for p in prices.values())
+    ):
+        raise ValueError("Prices must be a dictionary of positive numbers by ticker")
+
+    for index, account in enumerate(accounts):
+        try:
+            validate_portfolio_request(account)
+            for holding in account['totals'].values():
+                if not isinstance(holding, dict) or not all(
+                    isinstance(holding.get(key), (int, float)) for key in ('position', 'currentPrice')
+                ):
+                    raise ValueError("Each holding needs a numeric position and currentPrice")
+            if account.get('targets') is not None:
+                validate_targets(account['targets'])
+            elif data.get('targets') is None:
+                raise ValueError("Targets are required when the batch has no default targets")
+        except ValueError as e:
+            raise ValueError(f"Account {index}: {str(e)}")
+
 @portfolio_bp.route('/manipulate-portfolio', methods=['POST'])
 def manipulate_portfolio():
     """Get recommendations for portfolio changes based on current holdings."""
-    try:
-        data = request.get_json()
-        validate_portfolio_request(data)
+    data = request.get_json()
+    validate_portfolio_request(data)
 
-        portfolio_service = PortfolioService()
-        result = portfolio_service.manipulate(
-            cash=data['cash'],
-            totals=data['totals'],
-            additional_info=data.get('additionalInfo', '')
-        )
+    portfolio_service = PortfolioService()
 
-        return jsonify(result), HTTPStatus.OK
-        
-    except ValueError as e:
-        logger.warning(f"Invalid request: {str(e)}")
-        return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
-    except Exception as e:
-        logger.error(f"Error in manipulate_portfolio: {str(e)}", exc_info=True)
-        return jsonify({
-            "error": "Internal server error",
-            "details": str(e)
-        }), HTTPStatus.INTERNAL_SERVER_ERROR
+    def manipulate():
+        with priority(INTERACTIVE):
+            return portfolio_service.manipulate(
+                cash=data['cash'],
+                totals=data['totals'],
+                additional_info=data.get('additionalInfo', '')
+            )
+
+    result, headers = record_recommendation("manipulate_portfolio", data, manipulate)
+    return jsonify(result), HTTPStatus.OK, headers
+
+@portfolio_bp.route('/manipulate-portfolio/batch', methods=['POST'])
+def manipulate_portfolio_batch():
+    """Rebalance many accounts to a shared target allocation, or one per account."""
+    data = request.get_json(silent=True)
+    validate_rebalance_batch_request(data)
+
+    portfolio_service = PortfolioService()
+    result = portfolio_service.rebalance_accounts(
+        accounts=data['accounts'],
+        targets=data.get('targets'),
+        prices=data.get('prices')
+    )
+
+    return jsonify(result), HTTPStatus.OK
 
 @portfolio_bp.route('/assess-risk-and-diversify', methods=['POST'])
 def assess_risk_and_diversify():
     """Assess risk and recommend diversification strategies."""
-    try:
-        data = request.get_json()
-        validate_portfolio_request(data)
+    data = request.get_json()
+    validate_portfolio_request(data)
+    mode = assessment_mode(request.args, data)
 
-        portfolio_service = PortfolioService()
-        result = portfolio_service.assess_risk_and_diversify(
+    portfolio_service = PortfolioService()
+    if wants_event_stream() and mode == "full":
+        return sse_response(portfolio_service.assess_risk_and_diversify_stream(
             cash=data['cash'],
             totals=data['totals'],
             additional_info=data.get('additionalInfo', '')
+        ))
+
+    result, headers = record_recommendation(
+        "assess_risk_and_diversify",
+        {**data, "mode": mode},
+        lambda: portfolio_service.assess_risk_and_diversify(
+            cash=data['cash'],
+            totals=data['totals'],
+            additional_info=data.get('additionalInfo', ''),
+            mode=mode
         )
-        return jsonify(result), HTTPStatus.OK
-        
-    except ValueError as e:
-        logger.warning(f"Invalid request: {str(e)}")
-        return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
-    except Exception as e:
-        logger.error(f"Error in assess_risk_and_diversify: {str(e)}", exc_info=True)
-        return jsonify({
-            "error": "Internal server error",
-            "details": str(e)
-        }), HTTPStatus.INTERNAL_SERVER_ERROR 
\ No newline at end of file
+    )
+    return jsonify(result), HTTPStatus.OK, headers
@@ -0,0 +1,124 @@
+from flask import Blueprint, request, jsonify, current_app
+from http import HTTPStatus
+from logging import getLogger
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from app.utils.access import require_token
+from app.utils.recommendation_store import IDEMPOTENCY_HEADER, USER_HEADER, fingerprint
+
+logger = getLogger(__name__)
+recommendations_bp = Blueprint('recommendations', __name__)
+
+RECOMMENDATION_ID_HEADER = "X-Recommendation-Id"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+MAX_USER_ID_LENGTH = 255
+
+# X-User-Id is not authenticated here, so stored recommendations are only served
+# to a trusted caller (e.g. the gateway that sets it) presenting RECOMMENDATIONS_READ_TOKEN
+recommendations_bp.before_request(require_token('RECOMMENDATIONS_READ_TOKEN'))
+
+def recommendation_owner(headers: Mapping[str, str]) -> Optional[str]:
+    """The user recommendations are recorded for, or None when the caller sends no X-User-Id."""
+    owner = headers.get(USER_HEADER, "").strip()
+    if len(owner) > MAX_USER_ID_LENGTH:
+        raise ValueError(f"{USER_HEADER} must be at most {MAX_USER_ID_LENGTH} characters")
+    return owner or None
+
+def require_owner(headers: Mapping[str, str]) -> str:
+    """The caller's X-User-Id; stored recommendations are only served to their owner."""
+    owner = recommendation_owner(headers)
+    if owner is None:
+        raise ValueError(f"{USER_HEADER} is required")
+    return owner
+
+def idempotency_key(headers: Mapping[str, str]) -> Optional[str]:
+    """Read and validate the Idempotency-Key header, or None without one."""
+    key = headers.get(IDEMPOTENCY_HEADER, "").strip()
+    if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise ValueError(f"{IDEMPOTENCY_HEADER} must be at most {MAX_IDEMPOTENCY_KEY_LENGTH} characters")
+    return key or None
+
+def claim_recommendation(
+    headers: Mapping[str, str],
+    endpoint: str,
+    payload: Any
+) -> Optional[Tuple[str, Optional[str], str, str]]:
+    """The ``(user, key, endpoint, fingerprint)`` a request is recorded under.
+
+    Results of anonymous requests are not recorded (None), since nobody could
+    read them back; an Idempotency-Key needs an X-User-Id to be scoped to.
+
+    Raises:
+        ValueError: If the request has an Idempotency-Key but no X-User-Id
+    """
+    owner = recommendation_owner(headers)
+    key = idempotency_key(headers)
+    if owner is None:
+        if key is not None:
+            raise ValueError(f"{USER_HEADER} is required with {IDEMPOTENCY_HEADER}")
+        return None
+    return owner, key, endpoint, fingerprint(endpoint, payload)
+
+def recommendation_headers(record_id: int, replayed: bool) -> Dict[str, str]:
+    """Response headers naming a recorded recommendation and whether it was replayed."""
+    headers = {RECOMMENDATION_ID_HEADER: str(record_id)}
+    if replayed:
+        headers[REPLAYED_HEADER] = "true"
+    return headers
+
+def record_recommendation(
+    endpoint: str,
+    payload: Any,
+    run: Callable[[], Dict[str, Any]]
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Run a recommendation request once per Idempotency-Key and store its result.
+
+    Args:
+        endpoint: Name the result is recorded under
+        payload: Request data a reused key must match
+        run: Produces the result when this request is not a retry
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, str]]: The result (stored, for a
+        retry) and the response headers naming its recommendation id
+    """
+    claim = claim_recommendation(request.headers, endpoint, payload)
+    if claim is None:
+        return run(), {}
+
+    record_id, result, replayed = current_app.extensions['recommendation_store'].record(*claim, run)
+    return result, recommendation_headers(record_id, replayed)
+
+def history_params(args: Mapping[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Parse and validate the ``limit`` and ``before`` history pagination parameters."""
+    max_limit = (config or current_app.config)['RECOMMENDATION_HISTORY_MAX_LIMIT']
+    try:
+        limit = int(args.get('limit', 20))
+        before = int(args['before']) if args.get('before') else None
+    except (TypeError, ValueError):
+        raise ValueError("Limit and before must be integers")
+    if not 1 <= limit <= max_limit:
+        raise ValueError(f"Limit must be between 1 and {max_limit}")
+    return {"limit": limit, "before": before}
+
+@recommendations_bp.route('/recommendations/<int:recommendation_id>', methods=['GET'])
+def get_recommendation(recommendation_id: int):
+    """Return one of the caller's stored recommendations."""
+    owner = require_owner(request.headers)
+    record = current_app.extensions['recommendation_store'].get(recommendation_id)
+    if record is None or record['userId'] != owner:
+        return jsonify({"error": "Recommendation not found"}), HTTPStatus.NOT_FOUND
+    return jsonify(record), HTTPStatus.OK
+
+@recommendations_bp.route('/recommendations', methods=['GET'])
+def recommendation_history():
+    """List the caller's stored recommendations, newest first.
+
+    Pages hold ``limit`` recommendations; pass a page's ``next`` as ``before``
+    to get the following one.
+    """
+    owner = require_owner(request.headers)
+    params = history_params(request.args)
+    records = current_app.extensions['recommendation_store'].history(owner, **params)
+    next_before = records[-1]['id'] if len(records) == params['limit'] else None
+    return jsonify({"recommendations": records, "next": next_before}), HTTPStatus.OK
@@ -1,48 +1,140 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from http import HTTPStatus
 from app.services.polygon_service import PolygonService
-from app.services.openai_service import OpenAIService
+from app.services.tweet_service import TweetService, TRADE_FIELDS
+from app.utils.indicators import parse_indicators
+from app.utils.streaming import wants_event_stream, sse_response
 from logging import getLogger
+from typing import Dict, Any, List, Iterator, Tuple, Optional
 
 logger = getLogger(__name__)
 
 trade_bp = Blueprint('trade', __name__)
 
+def parse_trend_params(params: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Parse and validate the window, limit and indicators trend parameters."""
+    config = config or current_app.config
+    max_window = config['TREND_MAX_WINDOW']
+    max_limit = config['TREND_MAX_LIMIT']
+
+    raw_windows = params.get('window', config['TREND_DEFAULT_WINDOW'])
+    if isinstance(raw_windows, str):
+        raw_windows = [part for part in raw_windows.split(',') if part.strip()]
+    elif not isinstance(raw_windows, list):
+        raw_windows = [raw_windows]
+
+    try:
+        windows = [int(window) for window in raw_windows]
+        limit = int(params.get('limit', config['TREND_DEFAULT_LIMIT']))
+    except (TypeError, ValueError):
+        raise ValueError("Window and limit must be integers")
+
+    if not windows or not all(1 <= window <= max_window for window in windows):
+        raise ValueError(f"Window must be between 1 and {max_window}")
+    if not 1 <= limit <= max_limit:
+        raise ValueError(f"Limit must be between 1 and {max_limit}")
+
+    raw_indicators = params.get('indicators', '')
+    if isinstance(raw_indicators, list):
+        raw_indicators = ','.join(str(name) for name in raw_indicators)
+
+    return {
+        "windows": list(dict.fromkeys(windows)),
+        "limit": limit,
+        "indicators": parse_indicators(raw_indicators)
+    }
+
 @trade_bp.route("/trade", methods=["GET"])
 def analyze_trade():
     """Analyze trade using polygon.io data and trend analysis."""
-    try:
-        ticker = request.args.get("ticker")
-        if not ticker:
-            return jsonify({"error": "Ticker is required"}), HTTPStatus.BAD_REQUEST
+    ticker = request.args.get("ticker")
+    if not ticker:
+        return jsonify({"error": "Ticker is required"}), HTTPStatus.BAD_REQUEST
+
+    polygon_service = PolygonService()
+    trend_analysis = polygon_service.analyze_trend(ticker, **parse_trend_params(request.args))
+    
+    return jsonify(trend_analysis), HTTPStatus.OK
+
+def validate_batch_request(data: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Validate the batch trend request data and return the unique tickers."""
+    if not isinstance(data, dict):
+        raise ValueError("Invalid request body")
+
+    tickers = data.get('tickers')
+    if not isinstance(tickers, list) or not tickers:
+        raise ValueError("Tickers must be a non-empty list")
+
+    if not all(isinstance(ticker, str) and ticker.strip() for ticker in tickers):
+        raise ValueError("Each ticker must be a non-empty string")
+
+    unique_tickers = list(dict.fromkeys(ticker.strip() for ticker in tickers))
+    max_tickers = (config or current_app.config)['TRADE_BATCH_MAX_TICKERS']
+    if len(unique_tickers) > max_tickers:
+        raise ValueError(f"At most {max_tickers} tickers are allowed per batch")
+
+    return unique_tickers
 
-        polygon_service = PolygonService()
-        trend_analysis = polygon_service.analyze_trend(ticker)
-        
-        return jsonify(trend_analysis), HTTPStatus.OK
+@trade_bp.route("/trade/batch", methods=["POST"])
+def analyze_trade_batch():
+    """Analyze trends for several tickers in one request."""
+    data = request.get_json(silent=True)
+    tickers = validate_batch_request(data)
 
-    except Exception as e:
-        logger.error(f"Error in analyze_trade: {str(e)}", exc_info=True)
-        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+    polygon_service = PolygonService()
+    trend_analysis = polygon_service.analyze_trends(tickers, **parse_trend_params(data))
+
+    return jsonify(trend_analysis), HTTPStatus.OK
+
+def stream_tweet(deltas: Iterator[str]) -> Iterator[Tuple[str, Any]]:
+    """Yield each tweet delta as a ``token`` event, then the full tweet."""
+    parts = []
+    for delta in deltas:
+        parts.append(delta)
+        yield "token", {"delta": delta}
+    yield "result", {"response": "".join(parts)}
 
 @trade_bp.route("/tweet", methods=["GET"])
 def generate_tweet():
     """Generate a tweet about a trade."""
-    try:
-        params = ["ticker", "price", "operation", "papers"]
-        if not all(request.args.get(param) for param in params):
-            return jsonify({"error": "Missing required parameters"}), HTTPStatus.BAD_REQUEST
-
-        openai_service = OpenAIService()
-        tweet = openai_service.generate_trade_tweet(
-            ticker=request.args.get("ticker"),
-            price=request.args.get("price"),
-            operation=request.args.get("operation"),
-            papers=request.args.get("papers")
-        )
-        
-        return jsonify({"response": tweet}), HTTPStatus.OK
-
-    except Exception as e:
-        logger.error(f"Error in generate_tweet: {str(e)}", exc_info=True)
-        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR 
\ No newline at end of file
+    if not all(request.args.get(param) for param in TRADE_FIELDS):
+        return jsonify({"error": "Missing required parameters"}), HTTPStatus.BAD_REQUEST
+
+    tweet_service = TweetService()
+    trade = {param: request.args.get(param) for param in TRADE_FIELDS}
+    if wants_event_stream():
+        return sse_response(stream_tweet(tweet_service.tweet_stream(trade)))
+
+    tweet = tweet_service.tweet(trade)
+    
+    return jsonify({"response": tweet}), HTTPStatus.OK
+
+def validate_tweet_batch_request(data: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Validate the batch tweet request data and return its trades."""
+    if not isinstance(data, dict):
+        raise ValueError("Invalid request body")
+
+    trades = data.get('trades')
+    if not isinstance(trades, list) or not trades:
+        raise ValueError("Trades must be a non-empty list")
+
+    max_trades = (config or current_app.config)['TWEET_BATCH_MAX_TRADES']
+    if len(trades) > max_trades:
+        raise ValueError(f"At most {max_trades} trades are allowed per batch")
+
+    for index, trade in enumerate(trades):
+        if not isinstance(trade, dict) or not all(trade.get(field) not in (None, "") for field in TRADE_FIELDS):
+            raise ValueError(f"Trade {index} must have a ticker, price, operation and papers")
+
+    return trades
+
+@trade_bp.route("/tweet/batch", methods=["POST"])
+def generate_tweet_batch():
+    """Generate tweets about several trades with as few OpenAI completions as possible."""
+    data = request.get_json(silent=True)
+    trades = validate_tweet_batch_request(data)
+
+    tweet_service = TweetService()
+    tweets = tweet_service.tweet_batch(trades)
+
+    return jsonify(tweets), HTTPStatus.OK
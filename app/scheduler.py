@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_apscheduler import APScheduler
+from app.services.prewarm_service import PrewarmService
+from app.utils.market_hours import MARKET_CLOSE, MARKET_TIMEZONE
+from app.utils.scripts import check_health
+
+def init_scheduler(app: Flask) -> APScheduler:
+    """Start the background scheduler and register its jobs."""
+    scheduler = APScheduler()
+    scheduler.init_app(app)
+    scheduler.start()
+
+    # Add scheduled job
+    @scheduler.task('interval', id='health_check', minutes=7.5, misfire_grace_time=900)
+    def scheduled_health_check():
+        print("Scheduled health check")
+        check_health()
+
+    if app.config['PREWARM_ENABLED']:
+        # Run once the close's daily bars are final; jitter spreads the workers out
+        start = datetime.combine(datetime.today(), MARKET_CLOSE) + timedelta(
+            minutes=app.config['MARKET_DATA_DELAY_MINUTES'] + app.config['PREWARM_OFFSET_MINUTES'])
+
+        @scheduler.task('cron', id='prewarm_market_data', day_of_week='mon-fri',
+                        hour=start.hour, minute=start.minute, timezone=MARKET_TIMEZONE,
+                        jitter=app.config['PREWARM_JITTER_SECONDS'], max_instances=1,
+                        coalesce=True, misfire_grace_time=3600)
+        def scheduled_prewarm():
+            with app.app_context():
+                PrewarmService(app).run()
+
+    return scheduler
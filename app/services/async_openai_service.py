@@ -0,0 +1,160 @@
+from typing import AsyncIterator, TYPE_CHECKING
+import asyncio
+import httpx
+import os
+import time
+
+from app.services.openai_service import OpenAIService, _completion_flight, _latencies
+from app.utils import circuit_breaker, deadlines, hedging, metrics, rate_limiter
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.llm_cache import cache_key
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+def get_async_client(app) -> "AsyncOpenAI":
+    """Return this worker's shared AsyncOpenAI client, creating it on first use."""
+    entry = app.extensions.get('async_openai_client')
+    if entry is None or entry[0] != os.getpid():
+        from openai import AsyncOpenAI
+
+        config = app.config
+        client = AsyncOpenAI(
+            api_key=config['OPENAI_API_KEY'],
+            base_url=config['OPENAI_BASE_URL'],
+            timeout=httpx.Timeout(config['OPENAI_TIMEOUT'], connect=config['OPENAI_CONNECT_TIMEOUT']),
+            max_retries=config['OPENAI_MAX_RETRIES'],
+        )
+        entry = (os.getpid(), client)
+        app.extensions['async_openai_client'] = entry
+    return entry[1]
+
+class AsyncOpenAIService(OpenAIService):
+    """``OpenAIService`` for the ASGI path, built on ``AsyncOpenAI``.
+
+    Public methods keep their signatures and return awaitables (or async
+    iterators when ``stream=True``). The response cache is read and written
+    on worker threads, off the event loop.
+    """
+
+    @staticmethod
+    def _get_client(app) -> "AsyncOpenAI":
+        return get_async_client(app)
+
+    async def _complete(
+        self,
+        endpoint: str,
+        model: str,
+        system_prompt: str,
+        prompt: str,
+        temperature: float
+    ) -> str:
+        model = self._route_model(endpoint, model, prompt)
+        key = cache_key(model, system_prompt, prompt, temperature)
+        ttl = self._cache_ttls.get(endpoint, 0)
+        cached = await asyncio.to_thread(self._cache.lookup, endpoint, key, ttl, bypass=self._bypass_cache)
+        if cached is not None:
+            return cached
+
+        async def create(model: str) -> str:
+            limiter, cost, level = self._rate_limit(endpoint, model, system_prompt, prompt)
+            with deadlines.enforce(), circuit_breaker.breaker(f"openai:{model}").guard():
+                await limiter.acquire_async(cost, level)
+                started = time.perf_counter()
+                with metrics.upstream("openai", model=model):
+                    completion = await self._client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt},
+                        ],
+                        temperature=temperature,
+                        timeout=self._timeout(),
+                    )
+            _latencies.observe(model, time.perf_counter() - started)
+            self._log_usage(endpoint, model, completion)
+            return completion.choices[0].message.content
+
+        async def hedged() -> str:
+            attempts = self._attempts(endpoint, model)
+            return await hedging.race_async(
+                [(name, delay, lambda m=attempt_model: create(m)) for name, delay, attempt_model in attempts],
+                self._attempt_reporter(endpoint, attempts)
+            )
+
+        content = await _completion_flight.do_async(key, hedged)
+        await asyncio.to_thread(self._store, endpoint, key, content, ttl)
+        return content
+
+    async def _stream(
+        self,
+        endpoint: str,
+        model: str,
+        system_prompt: str,
+        prompt: str,
+        temperature: float
+    ) -> AsyncIterator[str]:
+        model = self._route_model(endpoint, model, prompt)
+        key = cache_key(model, system_prompt, prompt, temperature)
+        ttl = self._cache_ttls.get(endpoint, 0)
+        cached = await asyncio.to_thread(self._cache.lookup, endpoint, key, ttl, bypass=self._bypass_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        limiter, cost, level = self._rate_limit(endpoint, model, system_prompt, prompt)
+        with deadlines.enforce(), circuit_breaker.breaker(f"openai:{model}").guard():
+            await limiter.acquire_async(cost, level)
+            with metrics.upstream("openai", model=model):
+                chunks = await self._client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt},
+                    ],
+                    temperature=temperature,
+                    stream=True,
+                    timeout=self._timeout(),
+                )
+            # The breaker and the deadline stay on while the deltas arrive, so a
+            # stream that breaks off counts against the model and a slow one
+            # cannot outlive the request
+            parts = []
+            async for chunk in chunks:
+                deadlines.check()
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        await asyncio.to_thread(self._store, endpoint, key, "".join(parts), ttl)
+
+    async def assess_risk_and_diversify(self, prompt: str) -> str:
+        """Get diversification recommendations using OpenAI."""
+        try:
+            response_content = await self._complete(
+                "assess_risk_and_diversify",
+                self._model,
+                self._config['ASSESSMENT_AND_DIVERSIFICATION_PROMPT'],
+                prompt,
+                self._assessment_temperature
+            )
+            self._logger.info(f"OpenAI response: {response_content}")
+            return response_content
+        except (rate_limiter.RateLimitTimeout, CircuitOpenError, deadlines.DeadlineExceeded):
+            raise
+        except Exception as e:
+            self._logger.error(f"Error calling OpenAI API: {str(e)}", exc_info=True)
+            raise Exception("Failed to get diversification recommendation from OpenAI")
+
+    def stream_assessment(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the diversification recommendation as content deltas."""
+        return self._stream(
+            "assess_risk_and_diversify",
+            self._model,
+            self._config['ASSESSMENT_AND_DIVERSIFICATION_PROMPT'],
+            prompt,
+            self._assessment_temperature
+        )
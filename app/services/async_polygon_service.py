@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import numpy as np
+from datetime import date, timedelta
+from typing import Dict, Any, List, Sequence, Set, Tuple
+
+from app.services.polygon_service import PolygonService, CALENDAR_DAYS_PER_TRADING_DAY, _trend_flight
+from app.utils import async_http_client, circuit_breaker, metrics, rate_limiter
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.recent_tickers import recent_tickers
+
+logger = logging.getLogger(__name__)
+
+# Background refreshes in flight; the event loop only keeps weak references to tasks
+_refreshes: Set[asyncio.Task] = set()
+
+class AsyncPolygonService(PolygonService):
+    """``PolygonService`` for the ASGI path.
+
+    Reads go through the same bar store and shared cache, on worker threads
+    so their disk I/O never blocks the event loop; network fetches use the
+    async HTTP client and batch fan-out is bounded by a semaphore.
+    """
+
+    async def _request_closes(self, ticker: str, days: int, timespan: str = "day") -> List[float]:
+        """Fetch the last ``days`` closes for a ticker from Polygon.io."""
+        end = date.today()
+        start = end - timedelta(days=int(days * CALENDAR_DAYS_PER_TRADING_DAY) + 10)
+        url = (
+            f"{self.base_url}/v2/aggs/ticker/"
+            f"{ticker}/range/1/{timespan}/{start.isoformat()}/{end.isoformat()}"
+            f"?adjusted=true&sort=asc&limit=50000&apiKey={self.api_key}"
+        )
+
+        with circuit_breaker.breaker("polygon").guard():
+            await rate_limiter.limiter("polygon").acquire_async({"requests": 1})
+            with metrics.upstream("polygon", ticker=ticker):
+                response = await async_http_client.get(url)
+                response.raise_for_status()
+
+        bars = response.json().get("results") or []
+        return [bar["c"] for bar in bars][-days:]
+
+    async def _refresh(self, key: str, ticker: str, days: int, timespan: str) -> None:
+        try:
+            closes = await self._request_closes(ticker, days, timespan)
+            await asyncio.to_thread(self._cache.set, key, closes, self._ttl())
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {str(e)}")
+
+    async def _fetch_closes(self, ticker: str, days: int, timespan: str = "day") -> Sequence[float]:
+        """Return the last ``days`` closes: bar store, then shared cache, then Polygon.io."""
+        if timespan == "day":
+            stored = await asyncio.to_thread(self._stored_closes, ticker, days)
+            if stored is not None:
+                return stored
+
+        key = self._closes_key(ticker, days, timespan)
+        entry = await asyncio.to_thread(self._cache.lookup, key)
+        if entry is not None:
+            closes, is_fresh = entry
+            if not is_fresh and await asyncio.to_thread(self._cache.claim_refresh, key):
+                task = asyncio.create_task(self._refresh(key, ticker, days, timespan))
+                _refreshes.add(task)
+                task.add_done_callback(_refreshes.discard)
+            return closes
+
+        try:
+            closes = await self._request_closes(ticker, days, timespan)
+        except CircuitOpenError as e:
+            return await asyncio.to_thread(self._last_closes, ticker, days, timespan, e)
+        await asyncio.to_thread(self._cache.set, key, closes, self._ttl())
+        return closes
+
+    async def analyze_trend(
+        self,
+        ticker: str,
+        windows: Sequence[int] = (150,),
+        limit: int = 10,
+        indicators: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        """Analyze trend using daily closes from Polygon.io, coalescing identical calls."""
+        recent_tickers.add([ticker])
+        return await _trend_flight.do_async(
+            self._trend_key(ticker, windows, limit, indicators),
+            lambda: self._analyze_trend(ticker, windows, limit, indicators)
+        )
+
+    async def _analyze_trend(
+        self,
+        ticker: str,
+        windows: Sequence[int],
+        limit: int,
+        indicators: Sequence[str]
+    ) -> Dict[str, Any]:
+        with metrics.stage("fetch_closes"):
+            closes = await self._fetch_closes(ticker, self._history_days(windows, limit))
+        with metrics.stage("analyze"):
+            closes = np.asarray(closes, dtype=float).reshape(1, -1)
+            analysis = self._analyze(closes, windows, limit, indicators)[0]
+        if analysis is None:
+            raise ValueError(f"Not enough history for {ticker}")
+        return analysis
+
+    async def analyze_trends(
+        self,
+        tickers: List[str],
+        windows: Sequence[int] = (150,),
+        limit: int = 10,
+        indicators: Sequence[str] = ()
+    ) -> Dict[str, Dict[str, Any]]:
+        """Analyze trends for several tickers at once."""
+        recent_tickers.add(tickers)
+        days = self._history_days(windows, limit)
+        with metrics.stage("fetch_closes"):
+            series, errors = await self.fetch_closes(tickers, days)
+
+        with metrics.stage("analyze"):
+            return self._combine(series, errors, days, windows, limit, indicators)
+
+    async def fetch_closes(self, tickers: List[str], days: int) -> Tuple[Dict[str, Sequence[float]], Dict[str, str]]:
+        """Fetch the last ``days`` daily closes of several tickers concurrently."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(ticker: str) -> Sequence[float]:
+            async with semaphore:
+                return await self._fetch_closes(ticker, days)
+
+        fetched = await asyncio.gather(*(fetch(ticker) for ticker in tickers), return_exceptions=True)
+
+        series: Dict[str, Sequence[float]] = {}
+        errors: Dict[str, str] = {}
+        for ticker, closes in zip(tickers, fetched):
+            if isinstance(closes, Exception):
+                errors[ticker] = str(closes)
+            else:
+                series[ticker] = closes
+        return series, errors
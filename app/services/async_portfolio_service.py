@@ -0,0 +1,185 @@
+import asyncio
+import json
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+
+from app.services.async_openai_service import AsyncOpenAIService
+from app.services.async_polygon_service import AsyncPolygonService
+from app.services.portfolio_service import PortfolioService, _price_cache, _price_flight
+from app.utils import circuit_breaker, metrics
+from app.utils.auth_utils import async_authorized_get
+from app.utils.recent_tickers import recent_tickers
+from app.utils.streaming import JSONArrayStream
+
+class AsyncPortfolioService(PortfolioService):
+    """``PortfolioService`` for the ASGI path.
+
+    Prompt building and the buy/sell math are inherited; the OpenAI call and
+    the throttle-service price lookups are awaited instead of blocking.
+    """
+
+    @staticmethod
+    def _create_openai_service(app, bypass_cache: Optional[bool]) -> AsyncOpenAIService:
+        return AsyncOpenAIService(app, bypass_cache=bypass_cache)
+
+    @staticmethod
+    def _create_polygon_service(app) -> AsyncPolygonService:
+        return AsyncPolygonService(app)
+
+    async def _fetch_price(self, ticker: str) -> Optional[float]:
+        """Fetch the previous close for a ticker from the throttle service."""
+        with circuit_breaker.breaker("throttle").guard(), metrics.upstream("throttle", ticker=ticker):
+            response = await async_authorized_get(f"{self._throttle_url}/throttle?name=prev&ticker={ticker}")
+            if response.status_code >= 500:
+                response.raise_for_status()
+        if response.status_code != 200:
+            self._logger.error("Failed to fetch current price for %s", ticker)
+            return None
+
+        data = response.json()
+        self._logger.info(f"API response for {ticker}: {data}")
+        current_price = data.get('close')
+        if current_price is None:
+            self._logger.error(f"'close' key not found in response for {ticker}")
+        return current_price
+
+    async def _lookup_price(self, ticker: str, ttl: Optional[float] = None) -> Optional[float]:
+        try:
+            current_price = await _price_flight.do_async(ticker, lambda: self._fetch_price(ticker))
+        except Exception as e:
+            return self._last_price(ticker, e)
+        self._remember_price(ticker, current_price, ttl)
+        return current_price
+
+    async def resolve_prices(self, tickers: List[str]) -> Dict[str, Optional[float]]:
+        """Resolve previous-close prices, fetching cache misses concurrently."""
+        recent_tickers.add(tickers)
+        prices = {ticker: _price_cache.get(ticker) for ticker in dict.fromkeys(tickers)}
+        missing = [ticker for ticker, price in prices.items() if price is None]
+        metrics.CACHE_REQUESTS.inc(len(prices) - len(missing), cache="price", result="hit")
+        metrics.CACHE_REQUESTS.inc(len(missing), cache="price", result="miss")
+        semaphore = asyncio.Semaphore(self._price_max_concurrency)
+
+        async def lookup(ticker: str) -> Optional[float]:
+            async with semaphore:
+                return await self._lookup_price(ticker)
+
+        prices.update(zip(missing, await asyncio.gather(*(lookup(ticker) for ticker in missing))))
+        return prices
+
+    async def rebalance_accounts(
+        self,
+        accounts: List[Dict[str, Any]],
+        targets: Optional[Dict[str, float]] = None,
+        prices: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """Rebalance many accounts to target allocations in one pass."""
+        requested = dict(prices or {})
+        prices = self._held_prices(accounts, requested)
+        wanted = {ticker for account in accounts for ticker in (account.get('targets') or targets or {})}
+        prices.update(await self.resolve_prices([ticker for ticker in wanted if ticker not in prices]))
+        return self._rebalance_accounts(accounts, targets or {}, prices, requested)
+
+    async def generate(self, prompt: str = "") -> Dict[str, Any]:
+        """Get portfolio recommendations using OpenAI."""
+        with metrics.stage("openai"):
+            response = await self._openai_service.generate_portfolio(prompt=prompt)
+        with metrics.stage("parse"):
+            return json.loads(response)
+
+    async def _stream_array(self, deltas: AsyncIterator[str], key: str) -> AsyncIterator[Tuple[str, Any]]:
+        parser = JSONArrayStream(key)
+        parts = []
+        async for delta in deltas:
+            parts.append(delta)
+            for element in parser.feed(delta):
+                yield key, element
+        yield "result", json.loads("".join(parts))
+
+    async def generate_stream(self, prompt: str = "") -> AsyncIterator[Tuple[str, Any]]:
+        """Stream portfolio recommendations as ``(event, data)`` pairs."""
+        deltas = self._openai_service.generate_portfolio(prompt=prompt, stream=True)
+        async for event, data in self._stream_array(deltas, "portfolio"):
+            yield event, ({"recommendation": data} if event == "result" else data)
+
+    async def manipulate(
+        self,
+        cash: float,
+        totals: Dict[str, Any],
+        additional_info: str = ""
+    ) -> Dict[str, Any]:
+        """Manipulate existing portfolio based on current holdings and cash."""
+        with metrics.stage("prompt"):
+            prompt = self._manipulation_prompt(cash, totals, additional_info)
+        with metrics.stage("openai"):
+            response = await self._openai_service.manipulate_portfolio(
+                prompt=prompt,
+                system_prompt=self._config['PORTFOLIO_MANIPULATION_PROMPT']
+            )
+        with metrics.stage("parse"):
+            recommendation = json.loads(response)
+        self._logger.info("AI-generated recommendation: %s", recommendation)
+
+        with metrics.stage("prices"):
+            prices = await self.resolve_prices(self._new_tickers(recommendation, totals))
+        with metrics.stage("rebalance"):
+            return self._apply_actions(recommendation, cash, totals, prices)
+
+    async def risk_profile(self, cash: float, totals: Dict[str, Any]) -> Dict[str, Any]:
+        """Compute the holdings' risk figures from daily closes, cached until the next market close."""
+        cached = await asyncio.to_thread(self._market_cache.get, self._risk_key(cash, totals))
+        if cached is not None:
+            return cached
+
+        with metrics.stage("fetch_closes"):
+            series, errors = await self._polygon_service.fetch_closes(
+                self._risk_tickers(totals), self._config['RISK_LOOKBACK_DAYS'] + 1
+            )
+        with metrics.stage("risk"):
+            return await asyncio.to_thread(self._risk, cash, totals, series, errors)
+
+    async def assess_risk_and_diversify(
+        self,
+        cash: float,
+        totals: Dict[str, Any],
+        additional_info: str = "",
+        mode: str = "full"
+    ) -> Dict[str, Any]:
+        """Assess risk and recommend diversification strategies (``fast`` mode skips the AI)."""
+        risk = await self.risk_profile(cash, totals)
+        if mode == "fast":
+            return {"risk": risk}
+
+        with metrics.stage("prompt"):
+            prompt = self._assessment_prompt(cash, totals, additional_info, risk)
+        with metrics.stage("openai"):
+            response = await self._openai_service.assess_risk_and_diversify(prompt=prompt)
+        with metrics.stage("parse"):
+            recommendation = json.loads(response)
+        self._logger.info("AI-generated assessment and diversification recommendation: %s", recommendation)
+
+        return {
+            "assessment": recommendation.get("assessment", ""),
+            "diversify": recommendation.get("diversify", []),
+            "risk": risk
+        }
+
+    async def assess_risk_and_diversify_stream(
+        self,
+        cash: float,
+        totals: Dict[str, Any],
+        additional_info: str = ""
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream the assessment as ``(event, data)`` pairs, starting with the ``risk`` figures."""
+        risk = await self.risk_profile(cash, totals)
+        yield "risk", risk
+        deltas = self._openai_service.stream_assessment(
+            prompt=self._assessment_prompt(cash, totals, additional_info, risk)
+        )
+        async for event, data in self._stream_array(deltas, "diversify"):
+            if event == "result":
+                data = {
+                    "assessment": data.get("assessment", ""),
+                    "diversify": data.get("diversify", []),
+                    "risk": risk
+                }
+            yield event, data
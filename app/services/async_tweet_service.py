@@ -0,0 +1,86 @@
+import asyncio
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+
+from app.services.async_openai_service import AsyncOpenAIService
+from app.services.async_polygon_service import AsyncPolygonService
+from app.services.tweet_service import TweetService, TRADE_FIELDS
+from app.utils import deadlines, metrics, rate_limiter
+from app.utils.circuit_breaker import CircuitOpenError
+
+class AsyncTweetService(TweetService):
+    """``TweetService`` for the ASGI path.
+
+    Packing and parsing are inherited; the trend lookups and completions are
+    awaited, and a batch's completions run on the event loop.
+    """
+
+    @staticmethod
+    def _create_openai_service(app, bypass_cache: Optional[bool]) -> AsyncOpenAIService:
+        return AsyncOpenAIService(app, bypass_cache=bypass_cache)
+
+    @staticmethod
+    def _create_polygon_service(app) -> AsyncPolygonService:
+        return AsyncPolygonService(app)
+
+    async def analyses(self, tickers: List[str]) -> Dict[str, str]:
+        """One-line trend summary per ticker; tickers without a trend are left out."""
+        with metrics.stage("trends"):
+            return self._summaries(await self._polygon_service.analyze_trends(tickers, **self._trend_params()))
+
+    async def tweet(self, trade: Dict[str, Any]) -> str:
+        """Tweet about one trade (``ticker``, ``price``, ``operation``, ``papers``)."""
+        analysis = (await self.analyses([trade['ticker']])).get(trade['ticker'])
+        with metrics.stage("openai"):
+            return await self._openai_service.generate_trade_tweet(**trade, analysis=analysis)
+
+    async def tweet_stream(self, trade: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the tweet about one trade as content deltas."""
+        analysis = (await self.analyses([trade['ticker']])).get(trade['ticker'])
+        async for delta in self._openai_service.generate_trade_tweet(**trade, analysis=analysis, stream=True):
+            yield delta
+
+    async def _complete_chunk(self, chunk: List[Tuple[int, str]]) -> Dict[int, str]:
+        ids = [index for index, _ in chunk]
+        content = await self._openai_service.generate_trade_tweets("\n".join(line for _, line in chunk))
+        tweets = self.parse_tweets(content, ids)
+        if len(tweets) < len(ids):
+            self._logger.warning("Batch tweet completion answered %d of %d trades", len(tweets), len(ids))
+        return tweets
+
+    async def _complete_one(self, trade: Dict[str, Any], analysis: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            return await self._openai_service.generate_trade_tweet(**trade, analysis=analysis), None
+        except (rate_limiter.RateLimitTimeout, CircuitOpenError, deadlines.DeadlineExceeded):
+            raise
+        except Exception as e:
+            self._logger.error("Tweet for %s failed: %s", trade['ticker'], str(e))
+            return None, str(e)
+
+    async def tweet_batch(self, trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Tweet about several trades with as few completions as fit the token budget."""
+        trades = [{field: trade[field] for field in TRADE_FIELDS} for trade in trades]
+        analyses = await self.analyses(list(dict.fromkeys(trade['ticker'] for trade in trades)))
+        chunks = self._pack(trades, analyses)
+        semaphore = asyncio.Semaphore(self._config['TWEET_BATCH_MAX_CONCURRENCY'])
+
+        async def bounded(completion):
+            async with semaphore:
+                return await completion
+
+        tweets: Dict[int, str] = {}
+        with metrics.stage("openai"):
+            # Let every chunk settle before a failure propagates, so none is left running unawaited
+            answers = await asyncio.gather(*(bounded(self._complete_chunk(chunk)) for chunk in chunks),
+                                           return_exceptions=True)
+            for answered in answers:
+                if isinstance(answered, BaseException):
+                    raise answered
+                tweets.update(answered)
+
+            missing = [index for index in range(len(trades)) if index not in tweets]
+            fallbacks = await asyncio.gather(*(
+                bounded(self._complete_one(trades[index], analyses.get(trades[index]['ticker'])))
+                for index in missing
+            ))
+
+        return self._results(trades, tweets, dict(zip(missing, fallbacks)), len(chunks) + len(missing))
@@ -0,0 +1,192 @@
+import logging
+import time
+from datetime import date
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from flask import current_app, Flask
+
+from app.utils.backtest import backtest, first_decisions, summarize
+
+logger = logging.getLogger(__name__)
+
+class BacktestService:
+    """Replay recorded target allocations over the bar store's daily closes.
+
+    Decisions are what ``PortfolioService.manipulate`` returns (a
+    ``portfolio`` list of tickers and percentages) or plain ``targets``
+    percentages by ticker, each with the date it was made. Every portfolio
+    is compared with buying and holding its first allocation under the same
+    costs.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        app = app or current_app
+        self._config = app.config
+        self._bar_store = app.extensions.get('bar_store')
+
+    @staticmethod
+    def parse_portfolios(data: Any) -> List[Dict[str, Any]]:
+        """Validate recorded decisions and normalize them to weights by ticker.
+
+        Args:
+            data: ``{"portfolios": [...]}`` or the list itself; each portfolio
+                has ``decisions`` with a ``date`` and either ``portfolio`` or
+                ``targets``, and optionally an ``id`` and starting ``cash``
+
+        Raises:
+            ValueError: If the decisions are malformed
+        """
+        portfolios = data.get('portfolios') if isinstance(data, dict) else data
+        if not isinstance(portfolios, list) or not portfolios:
+            raise ValueError("Decisions must be a non-empty list of portfolios")
+
+        parsed = []
+        for index, portfolio in enumerate(portfolios):
+            if not isinstance(portfolio, dict) or not isinstance(portfolio.get('decisions'), list):
+                raise ValueError(f"Portfolio {index} must have a list of decisions")
+            cash = portfolio.get('cash', 100000)
+            if not isinstance(cash, (int, float)) or cash <= 0:
+                raise ValueError(f"Portfolio {index} cash must be a positive number")
+
+            decisions = []
+            for decision in portfolio['decisions']:
+                try:
+                    day = date.fromisoformat(decision['date'])
+                    if 'targets' in decision:
+                        targets = decision['targets']
+                    else:
+                        targets = {
+                            stock['ticker']: stock.get('percentage', stock.get('desiredPercentage'))
+                            for stock in decision['portfolio']
+                        }
+                    weights = {ticker.upper(): float(percentage) / 100 for ticker, percentage in targets.items()}
+                except (KeyError, TypeError, ValueError, AttributeError) as e:
+                    raise ValueError(f"Portfolio {index} has a malformed decision: {decision!r}") from e
+                if any(weight < 0 for weight in weights.values()) or sum(weights.values()) > 1 + 1e-9:
+                    raise ValueError(f"Portfolio {index} decision on {day} must have non-negative "
+                                     f"percentages adding up to at most 100")
+                decisions.append((day, weights))
+
+            if not decisions:
+                raise ValueError(f"Portfolio {index} has no decisions")
+            parsed.append({
+                "id": portfolio.get('id', index),
+                "cash": float(cash),
+                "decisions": sorted(decisions, key=lambda item: item[0])
+            })
+        return parsed
+
+    def closes(self, tickers: List[str], start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+        """Daily closes of ``tickers`` between ``start`` and ``end`` from the bar store.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Trading days with a close for any
+            ticker, and the ``(days x tickers)`` closes, NaN where a ticker has none
+        """
+        if self._bar_store is None:
+            raise ValueError("Bar store is not configured")
+
+        first, last = np.datetime64(start, "D"), np.datetime64(end, "D")
+        columns = []
+        for ticker in tickers:
+            bars = self._bar_store.read(ticker)
+            keep = (bars["date"] >= first) & (bars["date"] <= last)
+            columns.append((bars["date"][keep], bars["close"][keep]))
+
+        calendar = np.unique(np.concatenate([dates for dates, _ in columns])) if columns \
+            else np.empty(0, dtype="<M8[D]")
+        matrix = np.full((len(calendar), len(tickers)), np.nan)
+        for column, (dates, closes) in enumerate(columns):
+            matrix[np.searchsorted(calendar, dates), column] = closes
+        return calendar, matrix
+
+    def run(
+        self,
+        portfolios: List[Dict[str, Any]],
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        cost_bps: Optional[float] = None,
+        fixed_cost: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Backtest parsed portfolios against buy-and-hold of their first allocation.
+
+        A decision takes effect at the close of the first trading day on or
+        after its date. Tickers missing from the bar store cannot be bought,
+        so their weight stays in cash.
+
+        Args:
+            portfolios: Output of ``parse_portfolios``
+            start: First day (default: the earliest decision)
+            end: Last day (default: the latest close in the bar store)
+            cost_bps: Cost per trade in basis points of its value (default: BACKTEST_COST_BPS)
+            fixed_cost: Cost per trade in currency (default: BACKTEST_FIXED_COST)
+
+        Returns:
+            Dict[str, Any]: Period, tickers without closes, and ``strategy`` and
+            ``buy_and_hold`` figures per portfolio
+        """
+        started = time.perf_counter()
+        cost_bps = self._config['BACKTEST_COST_BPS'] if cost_bps is None else cost_bps
+        fixed_cost = self._config['BACKTEST_FIXED_COST'] if fixed_cost is None else fixed_cost
+        tickers = sorted({ticker for p in portfolios for _, weights in p['decisions'] for ticker in weights})
+        start = start or min(day for p in portfolios for day, _ in p['decisions'])
+        end = end or date.today()
+
+        calendar, closes = self.closes(tickers, start, end)
+        if not len(calendar):
+            raise ValueError(f"No closes in the bar store between {start} and {end}; run `flask ingest-bars`")
+
+        # Decision dates to calendar rows; later decisions landing on the same day win
+        column = {ticker: index for index, ticker in enumerate(tickers)}
+        rows = [np.searchsorted(calendar, np.array([day for day, _ in p['decisions']], dtype="<M8[D]"))
+                for p in portfolios]
+        days = np.unique(np.concatenate(rows))
+        days = days[days < len(calendar)]
+        targets = np.full((len(portfolios), len(days), len(tickers)), np.nan)
+        for index, (portfolio, decided) in enumerate(zip(portfolios, rows)):
+            for row, (_, weights) in zip(decided, portfolio['decisions']):
+                if row < len(calendar):
+                    decision = np.searchsorted(days, row)
+                    targets[index, decision] = 0.0
+                    for ticker, weight in weights.items():
+                        targets[index, decision, column[ticker]] = weight
+
+        cash = np.array([p['cash'] for p in portfolios])
+        settings = {
+            "cost_rate": cost_bps / 10000,
+            "fixed_cost": fixed_cost,
+            "min_trade_value": self._config['REBALANCE_MIN_TRADE_VALUE'],
+        }
+        strategy = summarize(backtest(closes, days, targets, cash, **settings), cash)
+        held = summarize(backtest(closes, days, first_decisions(targets), cash, **settings), cash)
+
+        def figures(summary: Dict[str, np.ndarray], index: int) -> Dict[str, Any]:
+            return {
+                name: None if not np.isfinite(values[index]) else round(float(values[index]), 4)
+                for name, values in summary.items()
+            }
+
+        report = {
+            "start": str(calendar[0]),
+            "end": str(calendar[-1]),
+            "days": len(calendar),
+            "tickers": len(tickers),
+            "missing": [ticker for ticker in tickers if np.isnan(closes[:, column[ticker]]).all()],
+            "cost_bps": cost_bps,
+            "fixed_cost": fixed_cost,
+            "portfolios": [
+                {
+                    "id": portfolio['id'],
+                    "decisions": len(portfolio['decisions']),
+                    "strategy": figures(strategy, index),
+                    "buy_and_hold": figures(held, index),
+                    "excess_return": round(float(strategy["total_return"][index] - held["total_return"][index]), 4)
+                }
+                for index, portfolio in enumerate(portfolios)
+            ],
+        }
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info("Backtested %d portfolios over %d days in %.3fs",
+                    len(portfolios), len(calendar), report["seconds"])
+        return report
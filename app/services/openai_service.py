@@ -1,23 +1,316 @@
-from flask import current_app
-from openai import OpenAI
-from typing import Dict, Any, Optional
-from openai.types.chat import ChatCompletion
+from flask import current_app, Flask
+from typing import Dict, Any, Optional, Iterator, Union, Callable, List, Tuple, TYPE_CHECKING
+import httpx
+import json
 import logging
+import os
+import threading
+import time
+
+from app.utils.cache import SharedCache
+from app.utils.llm_cache import LLMCache, cache_key, bypass_requested
+from app.utils import circuit_breaker, deadlines, hedging, metrics, rate_limiter, singleflight
+from app.utils.circuit_breaker import CircuitOpenError
+
+if TYPE_CHECKING:
+    # The SDK takes most of a worker's import time; it is imported when the first client is built
+    from openai import OpenAI
+    from openai.types.chat import ChatCompletion
+
+_client_lock = threading.Lock()
+_completion_flight = singleflight.group("openai.completion")
+# Recent completion latencies per model, for picking hedge delays
+_latencies = hedging.LatencyTracker()
+
+# Endpoints whose completions yield to interactive work under rate limiting
+_ENDPOINT_PRIORITIES = {
+    "generate_trade_tweet": rate_limiter.BACKGROUND,
+    "generate_trade_tweets": rate_limiter.BACKGROUND,
+}
+
+def _is_json(content: str) -> bool:
+    try:
+        json.loads(content)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+# Endpoints whose callers parse the completion; only completions that parse are cached
+_ENDPOINT_VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    "generate_portfolio": _is_json,
+    "manipulate_portfolio": _is_json,
+    "assess_risk_and_diversify": _is_json,
+}
+
+def init_app(app: Flask) -> None:
+    """Register the application-scoped OpenAI client slot.
+
+    The client itself is built on first use in each worker process, so a
+    preloading master never hands its connection pool to forked workers.
+    """
+    app.extensions['openai_client'] = None
+
+    disk = None
+    if app.config['LLM_CACHE_PATH']:
+        disk = SharedCache(
+            path=app.config['LLM_CACHE_PATH'],
+            max_entries=app.config['LLM_CACHE_DISK_MAX_ENTRIES'],
+            stale_seconds=0
+        )
+    app.extensions['llm_cache'] = LLMCache(maxsize=app.config['LLM_CACHE_MAX_ENTRIES'], disk=disk)
+
+def get_client(app: Optional[Flask] = None) -> "OpenAI":
+    """Return this worker's shared OpenAI client, creating it on first use."""
+    app = app or current_app
+    extensions = app.extensions
+    entry = extensions.get('openai_client')
+    if entry is None or entry[0] != os.getpid():
+        with _client_lock:
+            entry = extensions.get('openai_client')
+            if entry is None or entry[0] != os.getpid():
+                from openai import OpenAI
+
+                config = app.config
+                client = OpenAI(
+                    api_key=config['OPENAI_API_KEY'],
+                    base_url=config['OPENAI_BASE_URL'],
+                    timeout=httpx.Timeout(config['OPENAI_TIMEOUT'], connect=config['OPENAI_CONNECT_TIMEOUT']),
+                    max_retries=config['OPENAI_MAX_RETRIES'],
+                )
+                entry = (os.getpid(), client)
+                extensions['openai_client'] = entry
+    return entry[1]
 
 class OpenAIService:
-    def __init__(self):
-        self._client = OpenAI(api_key=current_app.config['OPENAI_API_KEY'])
-        self._model = "gpt-4o"  # Move to config if it changes frequently
+    """Stateless façade over the application-scoped OpenAI client."""
+
+    def __init__(self, app: Optional[Flask] = None, bypass_cache: Optional[bool] = None):
+        app = app or current_app
+        self._config = app.config
+        self._client = self._get_client(app)
+        self._model = self._config['OPENAI_MODEL']
+        self._tweet_model = self._config['OPENAI_TWEET_MODEL']
+        self._temperature = self._config['OPENAI_TEMPERATURE']
+        self._assessment_temperature = self._config['OPENAI_ASSESSMENT_TEMPERATURE']
+        self._cache = app.extensions['llm_cache']
+        self._cache_ttls = self._config['LLM_CACHE_TTLS']
+        self._bypass_cache = bypass_requested() if bypass_cache is None else bypass_cache
+        self._completion_tokens_estimate = self._config['OPENAI_COMPLETION_TOKENS_ESTIMATE']
+        self._fast_model = self._config['OPENAI_FAST_MODEL']
+        self._policies = self._config['OPENAI_LATENCY_POLICIES']
+        self._hedge_default_delay = self._config['OPENAI_HEDGE_DEFAULT_DELAY']
+        self._hedge_min_samples = self._config['OPENAI_HEDGE_MIN_SAMPLES']
         self._logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _get_client(app: Flask) -> "OpenAI":
+        return get_client(app)
+
+    def _log_usage(self, endpoint: str, model: str, completion: "ChatCompletion") -> None:
+        usage = completion.usage
+        if usage is not None:
+            labels = {"endpoint": metrics.current_endpoint(), "operation": endpoint, "model": model}
+            metrics.TOKENS.inc(usage.prompt_tokens, kind="prompt", **labels)
+            metrics.TOKENS.inc(usage.completion_tokens, kind="completion", **labels)
+            self._logger.info(
+                "OpenAI %s usage: %d prompt + %d completion tokens",
+                endpoint, usage.prompt_tokens, usage.completion_tokens
+            )
+
+    def _rate_limit(self, endpoint: str, model: str, system_prompt: str, prompt: str):
+        """Limiter, request cost and priority for one completion."""
+        cost = {
+            "requests": 1,
+            "tokens": rate_limiter.estimate_tokens(
+                system_prompt, prompt, completion_tokens=self._completion_tokens_estimate)
+        }
+        return rate_limiter.limiter(f"openai:{model}"), cost, _ENDPOINT_PRIORITIES.get(endpoint)
+
+    def _timeout(self) -> httpx.Timeout:
+        """Client timeouts capped at the time left before the request deadline."""
+        return httpx.Timeout(
+            deadlines.timeout(self._config['OPENAI_TIMEOUT']),
+            connect=deadlines.timeout(self._config['OPENAI_CONNECT_TIMEOUT'])
+        )
+
+    def _route_model(self, endpoint: str, model: str, prompt: str) -> str:
+        """Model for one completion under the method's latency policy."""
+        policy = self._policies.get(endpoint, {})
+        if policy.get("model"):
+            return policy["model"]
+        small_prompt_tokens = policy.get("small_prompt_tokens", 0)
+        if small_prompt_tokens and rate_limiter.estimate_tokens(prompt) <= small_prompt_tokens:
+            return self._fast_model
+        return model
+
+    def _attempts(self, endpoint: str, model: str) -> List[Tuple[str, float, str]]:
+        """Attempts to race for one completion: (name, start delay, model)."""
+        policy = self._policies.get(endpoint, {})
+        attempts = [("primary", 0.0, model)]
+
+        if policy.get("hedge_percentile"):
+            delay = _latencies.percentile(model, policy["hedge_percentile"], self._hedge_min_samples)
+            attempts.append(("hedge", self._hedge_default_delay if delay is None else delay, model))
+
+        fallback_model = policy.get("fallback_model")
+        if policy.get("deadline") and fallback_model and fallback_model != model:
+            attempts.append(("fallback", policy["deadline"], fallback_model))
+
+        return sorted(attempts, key=lambda attempt: attempt[1])
+
+    def _attempt_reporter(self, endpoint: str, attempts: List[Tuple[str, float, str]]) -> Callable[[str, str], None]:
+        models = {name: model for name, _, model in attempts}
+
+        def report(name: str, outcome: str) -> None:
+            metrics.OPENAI_ATTEMPTS.inc(operation=endpoint, model=models[name], attempt=name, outcome=outcome)
+            if outcome == "won" and name != "primary":
+                self._logger.info("OpenAI %s answered by the %s attempt (%s)", endpoint, name, models[name])
+
+        return report
+
+    def _validator(self, endpoint: str) -> Optional[Callable[[str], bool]]:
+        validate = _ENDPOINT_VALIDATORS.get(endpoint)
+        if validate is None:
+            return None
+
+        def logged(content: str) -> bool:
+            if validate(content):
+                return True
+            self._logger.warning("Not caching malformed %s completion", endpoint)
+            return False
+
+        return logged
+
+    def _store(self, endpoint: str, key: str, content: str, ttl: float) -> None:
+        """Cache a completion fetched outside ``get_or_create``, if it passes the endpoint's validator."""
+        validate = self._validator(endpoint)
+        if ttl > 0 and (validate is None or validate(content)):
+            self._cache.store(key, content, ttl)
+
+    def _complete(
+        self,
+        endpoint: str,
+        model: str,
+        system_prompt: str,
+        prompt: str,
+        temperature: float
+    ) -> str:
+        """Run a chat completion through the response cache.
+
+        Identical completions already in flight in this process are shared
+        rather than requested again; new ones queue on the model's rate limit.
+        The method's latency policy picks the model and may race a hedge or
+        fallback request against the first one.
+
+        Args:
+            endpoint: Service method name, used to pick the cache TTL
+            model: OpenAI model name
+            system_prompt: System message content
+            prompt: User message content
+            temperature: Sampling temperature
+
+        Returns:
+            str: Completion content
+        """
+        model = self._route_model(endpoint, model, prompt)
+
+        def create(model: str) -> str:
+            limiter, cost, level = self._rate_limit(endpoint, model, system_prompt, prompt)
+            with deadlines.enforce(), circuit_breaker.breaker(f"openai:{model}").guard():
+                limiter.acquire(cost, level)
+                started = time.perf_counter()
+                with metrics.upstream("openai", model=model):
+                    completion = self._client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt},
+                        ],
+                        temperature=temperature,
+                        timeout=self._timeout(),
+                    )
+            _latencies.observe(model, time.perf_counter() - started)
+            self._log_usage(endpoint, model, completion)
+            return completion.choices[0].message.content
+
+        def hedged() -> str:
+            attempts = self._attempts(endpoint, model)
+            return hedging.race(
+                [(name, delay, lambda m=attempt_model: create(m)) for name, delay, attempt_model in attempts],
+                self._attempt_reporter(endpoint, attempts)
+            )
+
+        key = cache_key(model, system_prompt, prompt, temperature)
+        return self._cache.get_or_create(
+            endpoint,
+            key,
+            self._cache_ttls.get(endpoint, 0),
+            lambda: _completion_flight.do(key, hedged),
+            bypass=self._bypass_cache,
+            validate=self._validator(endpoint)
+        )
+
+    def _stream(
+        self,
+        endpoint: str,
+        model: str,
+        system_prompt: str,
+        prompt: str,
+        temperature: float
+    ) -> Iterator[str]:
+        """Stream a chat completion as content deltas.
+
+        A cached completion is replayed as a single delta; a streamed one is
+        stored in the cache once it has fully arrived.
+        """
+        model = self._route_model(endpoint, model, prompt)
+        key = cache_key(model, system_prompt, prompt, temperature)
+        ttl = self._cache_ttls.get(endpoint, 0)
+        cached = self._cache.lookup(endpoint, key, ttl, bypass=self._bypass_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        limiter, cost, level = self._rate_limit(endpoint, model, system_prompt, prompt)
+        with deadlines.enforce(), circuit_breaker.breaker(f"openai:{model}").guard():
+            limiter.acquire(cost, level)
+            # Times the wait for the response headers; the deltas arrive while streaming
+            with metrics.upstream("openai", model=model):
+                chunks = self._client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt},
+                    ],
+                    temperature=temperature,
+                    stream=True,
+                    timeout=self._timeout(),
+                )
+            # The breaker and the deadline stay on while the deltas arrive, so a
+            # stream that breaks off counts against the model and a slow one
+            # cannot outlive the request
+            parts = []
+            for chunk in chunks:
+                deadlines.check()
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        self._store(endpoint, key, "".join(parts), ttl)
     
     def generate_portfolio(
         self, 
         prompt: str,
-    ) -> str:
+        stream: bool = False
+    ) -> Union[str, Iterator[str]]:
         """Get recommendations using OpenAI.
         
         Args:
             prompt: The formatted prompt to send to OpenAI
+            stream: Return an iterator of content deltas instead of the full text
             
         Returns:
             str: AI-generated recommendation
@@ -25,51 +318,71 @@ class OpenAIService:
         Raises:
             OpenAIError: If API call fails
         """
-        completion = self._client.chat.completions.create(
-            model=self._model,
-            messages=[
-                {"role": "system", "content": current_app.config['PORTFOLIO_SYSTEM_PROMPT']},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.8,
+        complete = self._stream if stream else self._complete
+        return complete(
+            "generate_portfolio",
+            self._model,
+            self._config['PORTFOLIO_SYSTEM_PROMPT'],
+            prompt,
+            self._temperature
         )
-        
-        return completion.choices[0].message.content 
     
     def generate_trade_tweet(
         self, 
         ticker: str, 
         price: float, 
         operation: str, 
-        papers: int
-    ) -> str:
-        """Generate a tweet about a trade using OpenAI."""
-        system_content = """
-        You are a financial analyst that write tweets about your trades.
-        """
-        
-        user_content = f"""
-        I just made this operation:
-        {operation} {papers} stocks of {ticker} at {price}
-        this was my analysis: 
-        The recent trend in {ticker} shows a recovery after a period of decline, marked by higher 
-        highs and higher lows in the latter candles. The volume shows a consistent level of activity, 
-        indicating strong interest in the stock. The recent pullback offers a potential buy opportunity 
-        if the trend continues.
-        --
-        Your mission is to make a tweet about the trade. (optional) consider adding a short explanation about the trade.
+        papers: int,
+        stream: bool = False,
+        analysis: Optional[str] = None
+    ) -> Union[str, Iterator[str]]:
+        """Generate a tweet about a trade using OpenAI.
+
+        Args:
+            analysis: The ticker's trend (see ``TweetService.analyses``), if known
         """
+        system_content = self._config['TWEET_SYSTEM_PROMPT']
+        analysis_line = f"this was my analysis: {analysis}\n" if analysis else ""
         
-        completion = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_content},
-                {"role": "user", "content": user_content},
-            ],
-            temperature=0.8,
+        user_content = (
+            f"I just made this operation:\n"
+            f"{operation} {papers} stocks of {ticker} at {price}\n"
+            f"{analysis_line}"
+            f"--\n"
+            f"Your mission is to make a tweet about the trade. "
+            f"(optional) consider adding a short explanation about the trade."
         )
         
-        return completion.choices[0].message.content 
+        complete = self._stream if stream else self._complete
+        return complete(
+            "generate_trade_tweet",
+            self._tweet_model,
+            system_content,
+            user_content,
+            self._temperature
+        )
+
+    def generate_trade_tweets(self, trades: str) -> str:
+        """Generate tweets for several trades in one completion.
+
+        Args:
+            trades: Numbered trade lines (see ``TweetService``)
+
+        Returns:
+            str: JSON array of ``{"id", "tweet"}`` objects as returned by OpenAI
+        """
+        prompt = (
+            f"Write one tweet for each of these trades I just made. Each line is "
+            f"id. operation shares ticker @ price | trend analysis:\n"
+            f"{trades}"
+        )
+        return self._complete(
+            "generate_trade_tweets",
+            self._tweet_model,
+            self._config['TWEET_BATCH_SYSTEM_PROMPT'],
+            prompt,
+            self._temperature
+        )
     
     def manipulate_portfolio(
         self, 
@@ -89,36 +402,43 @@ class OpenAIService:
             OpenAIError: If API call fails
         """
         if system_prompt is None:
-            system_prompt = current_app.config['PORTFOLIO_MANIPULATION_PROMPT']
+            system_prompt = self._config['PORTFOLIO_MANIPULATION_PROMPT']
         
-        completion = self._client.chat.completions.create(
-            model=self._model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.8,
+        return self._complete(
+            "manipulate_portfolio",
+            self._model,
+            system_prompt,
+            prompt,
+            self._temperature
         )
-        
-        return completion.choices[0].message.content 
     
     def assess_risk_and_diversify(
         self, 
-        prompt: str
-    ) -> str:
+        prompt: str,
+        stream: bool = False
+    ) -> Union[str, Iterator[str]]:
         """Get diversification recommendations using OpenAI."""
+        if stream:
+            return self._stream(
+                "assess_risk_and_diversify",
+                self._model,
+                self._config['ASSESSMENT_AND_DIVERSIFICATION_PROMPT'],
+                prompt,
+                self._assessment_temperature
+            )
+
         try:
-            completion = self._client.chat.completions.create(
-                model=self._model,
-                messages=[
-                    {"role": "system", "content": current_app.config['ASSESSMENT_AND_DIVERSIFICATION_PROMPT']},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.7,
+            response_content = self._complete(
+                "assess_risk_and_diversify",
+                self._model,
+                self._config['ASSESSMENT_AND_DIVERSIFICATION_PROMPT'],
+                prompt,
+                self._assessment_temperature
             )
-            response_content = completion.choices[0].message.content
             self._logger.info(f"OpenAI response: {response_content}")
             return response_content
+        except (rate_limiter.RateLimitTimeout, CircuitOpenError, deadlines.DeadlineExceeded):
+            raise
         except Exception as e:
             self._logger.error(f"Error calling OpenAI API: {str(e)}", exc_info=True)
             raise Exception("Failed to get diversification recommendation from OpenAI")
\ No newline at end of file
@@ -1,46 +1,422 @@
-from flask import current_app
-import requests
+import logging
+from flask import current_app, Flask
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Sequence, Optional, Tuple
+
+from app.utils import circuit_breaker, http_client, indicators as ind, metrics, rate_limiter, singleflight
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.market_hours import MARKET_TIMEZONE, seconds_until_next_close, last_market_close
+from app.utils.recent_tickers import recent_tickers
+
+# Calendar days per trading day, used to size the history request
+CALENDAR_DAYS_PER_TRADING_DAY = 365 / 252
+
+_trend_flight = singleflight.group("polygon.analyze_trend")
+
+logger = logging.getLogger(__name__)
 
 class PolygonService:
-    def __init__(self):
-        self.api_key = current_app.config['POLYGON_API_KEY']
+    def __init__(self, app: Optional[Flask] = None):
+        app = app or current_app
+        self.api_key = app.config['POLYGON_API_KEY']
+        self.base_url = app.config['POLYGON_BASE_URL']
+        self.max_concurrency = app.config['POLYGON_MAX_CONCURRENCY']
+        self.data_delay_minutes = app.config['MARKET_DATA_DELAY_MINUTES']
+        self._cache = app.extensions['market_data_cache']
+        self._bar_store = app.extensions.get('bar_store')
+
+    def _ttl(self) -> float:
+        """Daily bars stay fresh until the next market close."""
+        return seconds_until_next_close(delay_minutes=self.data_delay_minutes)
+
+    def _stored_closes(self, ticker: str, days: int) -> Optional[np.ndarray]:
+        """Closes from the local bar store, if it is current and holds enough history.
+
+        Both the store and the ticker must be current: a ticker without a bar
+        for the last ingested session (halted, delisted, or never ingested)
+        is left to Polygon.io.
+        """
+        if self._bar_store is None:
+            return None
+
+        through = self._bar_store.ingested_through()
+        if through is None or through < last_market_close(delay_minutes=self.data_delay_minutes).date():
+            return None
+
+        bars = self._bar_store.read(ticker)
+        session = self._bar_store.last_session() or through
+        if not bars["date"].size or bars["date"][-1].astype(date) < session:
+            metrics.CACHE_REQUESTS.inc(cache="bar_store", result="stale")
+            return None
+
+        closes = bars["close"][-days:]
+        if len(closes) < days:
+            metrics.CACHE_REQUESTS.inc(cache="bar_store", result="miss")
+            return None
+        metrics.CACHE_REQUESTS.inc(cache="bar_store", result="hit")
+        return closes
+
+    def _fetch_closes(self, ticker: str, days: int, timespan: str = "day") -> Sequence[float]:
+        """Return the last ``days`` closes for a ticker.
+
+        Daily closes come from the local bar store when it is current, then
+        from the shared cache, and only then from Polygon.io. While Polygon's
+        circuit breaker is open the last closes on hand are served instead.
+        """
+        if timespan == "day":
+            stored = self._stored_closes(ticker, days)
+            if stored is not None:
+                return stored
+
+        try:
+            return self._cache.get_or_fetch(
+                self._closes_key(ticker, days, timespan),
+                lambda: self._request_closes(ticker, days, timespan),
+                self._ttl
+            )
+        except CircuitOpenError as e:
+            return self._last_closes(ticker, days, timespan, e)
+
+    def _last_closes(self, ticker: str, days: int, timespan: str, error: CircuitOpenError) -> Sequence[float]:
+        """Closes to fall back on while Polygon.io is unavailable, flagging the request stale.
+
+        Uses an expired cache entry, or else the bar store even if it is
+        behind. Raises ``error`` if neither has them.
+        """
+        closes = self._cache.last(self._closes_key(ticker, days, timespan))
+        if closes is None and timespan == "day" and self._bar_store is not None:
+            stored = self._bar_store.closes(ticker, days)
+            closes = stored if len(stored) == days else None
+        if closes is None:
+            raise error
+        circuit_breaker.mark_stale("polygon")
+        return closes
+
+    @staticmethod
+    def _closes_key(ticker: str, days: int, timespan: str = "day") -> str:
+        return f"polygon:aggs:{ticker}:{timespan}:{days}"
+
+    def warm_closes(self, ticker: str, windows: Sequence[int] = (150,), limit: int = 10) -> bool:
+        """Make sure the closes ``analyze_trend`` needs are fresh without a request waiting on them.
 
-    def analyze_trend(self, ticker: str) -> Dict[str, Any]:
-        """Analyze trend using SMA data from Polygon.io."""
+        Unlike ``_fetch_closes``, a stale cache entry is refetched in the
+        foreground rather than served.
+
+        Returns:
+            bool: True if Polygon.io had to be called
+        """
+        days = self._history_days(windows, limit)
+        if self._stored_closes(ticker, days) is not None:
+            return False
+
+        key = self._closes_key(ticker, days)
+        entry = self._cache.lookup(key)
+        if entry is not None and entry[1]:
+            return False
+
+        self._cache.set(key, self._request_closes(ticker, days), self._ttl())
+        return True
+
+    def _request_closes(self, ticker: str, days: int, timespan: str = "day") -> List[float]:
+        """Fetch the last ``days`` closes for a ticker from Polygon.io."""
+        end = date.today()
+        start = end - timedelta(days=int(days * CALENDAR_DAYS_PER_TRADING_DAY) + 10)
         url = (
-            f"https://api.polygon.io/v1/indicators/sma/"
-            f"{ticker}?timespan=day&adjusted=true&window=150&series_type=close&order=asc&limit=10&apiKey"
-            f"={self.api_key}"
+            f"{self.base_url}/v2/aggs/ticker/"
+            f"{ticker}/range/1/{timespan}/{start.isoformat()}/{end.isoformat()}"
+            f"?adjusted=true&sort=asc&limit=50000&apiKey={self.api_key}"
         )
 
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        data = response.json()["results"]
-        data_values = data["values"]
-        values = np.array([point["value"] for point in data_values])
-        indices = np.arange(len(values))
-
-        # Fit linear regression
-        X = indices.reshape(-1, 1)
-        model = LinearRegression()
-        model.fit(X, values)
-        slope = model.coef_[0]
-
-        # Classify trend
+        bars = self._get(url, ticker=ticker).get("results") or []
+        return [bar["c"] for bar in bars][-days:]
+
+    @staticmethod
+    def _classify(slope: float) -> str:
+        """Classify a slope as a trend label."""
         epsilon = 0.01
         if slope < -epsilon:
-            trend = "Declining"
+            return "Declining"
         elif slope > epsilon:
-            trend = "Incline"
-        else:
-            trend = "Parallel"
+            return "Incline"
+        return "Parallel"
+
+    @staticmethod
+    def _history_days(windows: Sequence[int], limit: int) -> int:
+        """Trading days of closes needed to produce ``limit`` points for every window."""
+        return max(windows) + limit
+
+    def _analyze(
+        self,
+        closes: np.ndarray,
+        windows: Sequence[int],
+        limit: int,
+        indicators: Sequence[str]
+    ) -> List[Dict[str, Any]]:
+        """Run trend analysis for every row of a right-aligned closes matrix."""
+        trend_key = f"sma_{windows[0]}"
+        names = list(dict.fromkeys(["sma", *indicators]))
+        computed = ind.compute(closes, windows, names)
+
+        trend_values = computed[trend_key][:, -limit:]
+        slopes = ind.linear_slope(trend_values)
+
+        analyses = []
+        for row, slope in enumerate(slopes):
+            values = trend_values[row]
+            values = values[~np.isnan(values)]
+            if not values.size:
+                analyses.append(None)
+                continue
+
+            analysis = {
+                "trend": self._classify(slope),
+                "slope": float(slope),
+                "values": values.tolist()
+            }
+            if indicators:
+                analysis["indicators"] = {
+                    key: [None if np.isnan(value) else float(value) for value in matrix[row, -limit:]]
+                    for key, matrix in computed.items()
+                    if key.split("_")[0] in indicators
+                }
+            analyses.append(analysis)
+
+        return analyses
+
+    def analyze_trend(
+        self,
+        ticker: str,
+        windows: Sequence[int] = (150,),
+        limit: int = 10,
+        indicators: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        """Analyze trend using daily closes from Polygon.io.
+
+        Args:
+            ticker: Ticker symbol to analyze
+            windows: SMA windows; the first one drives the trend classification
+            limit: Number of trailing points to fit and return
+            indicators: Extra indicators from ``app.utils.indicators.INDICATORS``
+
+        Concurrent calls with identical arguments share a single fetch and
+        analysis (and its result).
+
+        Raises:
+            ValueError: If there is not enough history for the first window
+        """
+        recent_tickers.add([ticker])
+        return _trend_flight.do(
+            self._trend_key(ticker, windows, limit, indicators),
+            lambda: self._analyze_trend(ticker, windows, limit, indicators)
+        )
+
+    @staticmethod
+    def _trend_key(ticker: str, windows: Sequence[int], limit: int, indicators: Sequence[str]) -> tuple:
+        return ticker, tuple(windows), limit, tuple(indicators)
+
+    def _analyze_trend(
+        self,
+        ticker: str,
+        windows: Sequence[int],
+        limit: int,
+        indicators: Sequence[str]
+    ) -> Dict[str, Any]:
+        with metrics.stage("fetch_closes"):
+            closes = self._fetch_closes(ticker, self._history_days(windows, limit))
+        with metrics.stage("analyze"):
+            closes = np.asarray(closes, dtype=float).reshape(1, -1)
+            analysis = self._analyze(closes, windows, limit, indicators)[0]
+        if analysis is None:
+            raise ValueError(f"Not enough history for {ticker}")
+        return analysis
+
+    def analyze_trends(
+        self,
+        tickers: List[str],
+        windows: Sequence[int] = (150,),
+        limit: int = 10,
+        indicators: Sequence[str] = ()
+    ) -> Dict[str, Dict[str, Any]]:
+        """Analyze trends for several tickers at once.
+
+        Closes are fetched concurrently (bounded by POLYGON_MAX_CONCURRENCY)
+        and every indicator is computed in a single pass over a
+        (tickers x days) matrix.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: ``results`` keyed by ticker with the same
+            shape as ``analyze_trend``, and ``errors`` keyed by ticker
+        """
+        recent_tickers.add(tickers)
+        days = self._history_days(windows, limit)
+        with metrics.stage("fetch_closes"):
+            series, errors = self.fetch_closes(tickers, days)
+
+        with metrics.stage("analyze"):
+            return self._combine(series, errors, days, windows, limit, indicators)
+
+    def fetch_closes(self, tickers: List[str], days: int) -> Tuple[Dict[str, Sequence[float]], Dict[str, str]]:
+        """Fetch the last ``days`` daily closes of several tickers concurrently.
+
+        Returns:
+            Tuple[Dict[str, Sequence[float]], Dict[str, str]]: Closes and fetch errors, keyed by ticker
+        """
+        series: Dict[str, Sequence[float]] = {}
+        errors: Dict[str, str] = {}
+
+        workers = max(1, min(self.max_concurrency, len(tickers)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            fetch = metrics.bind_context(self._fetch_closes)
+            futures = {ticker: executor.submit(fetch, ticker, days) for ticker in tickers}
+            for ticker, future in futures.items():
+                try:
+                    series[ticker] = future.result()
+                except Exception as e:
+                    errors[ticker] = str(e)
+
+        return series, errors
+
+    def _combine(
+        self,
+        series: Dict[str, Sequence[float]],
+        errors: Dict[str, str],
+        days: int,
+        windows: Sequence[int],
+        limit: int,
+        indicators: Sequence[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Analyze fetched close series together and merge them with fetch errors."""
+        results: Dict[str, Dict[str, Any]] = {}
+        if series:
+            # Right-align so the latest close of every ticker shares a column
+            matrix = np.full((len(series), days), np.nan)
+            for row, closes in enumerate(series.values()):
+                if len(closes):
+                    matrix[row, -len(closes):] = closes
+
+            analyses = self._analyze(matrix, windows, limit, indicators)
+            for ticker, analysis in zip(series, analyses):
+                if analysis is None:
+                    errors[ticker] = f"Not enough history for {ticker}"
+                else:
+                    results[ticker] = analysis
+
+        return {"results": results, "errors": errors}
+
+    def fetch_grouped_daily(self, day: date) -> Dict[str, Dict[str, float]]:
+        """Fetch one day of bars for the whole US stock market from Polygon.io."""
+        url = (
+            f"{self.base_url}/v2/aggs/grouped/locale/us/market/stocks/"
+            f"{day.isoformat()}?adjusted=true&apiKey={self.api_key}"
+        )
 
         return {
-            "trend": trend,
-            "slope": float(slope),
-            "values": values.tolist()
-        } 
\ No newline at end of file
+            bar["T"]: {
+                "open": bar["o"],
+                "high": bar["h"],
+                "low": bar["l"],
+                "close": bar["c"],
+                "volume": bar.get("v", 0.0)
+            }
+            for bar in self._get(url).get("results") or []
+        }
+
+    def _get(self, url: str, **labels: str) -> Dict[str, Any]:
+        with circuit_breaker.breaker("polygon").guard():
+            rate_limiter.limiter("polygon").acquire({"requests": 1})
+            with metrics.upstream("polygon", **labels):
+                response = http_client.get(url)
+                response.raise_for_status()
+        return response.json()
+
+    def fetch_splits(self, start: date, end: date) -> Dict[str, date]:
+        """Latest split execution date in [start, end] per ticker, from Polygon.io."""
+        url = (
+            f"{self.base_url}/v3/reference/splits?execution_date.gte={start.isoformat()}"
+            f"&execution_date.lte={end.isoformat()}&limit=1000&apiKey={self.api_key}"
+        )
+        splits: Dict[str, date] = {}
+        while url:
+            page = self._get(url)
+            for split in page.get("results") or []:
+                executed = date.fromisoformat(split["execution_date"])
+                splits[split["ticker"]] = max(executed, splits.get(split["ticker"], executed))
+            url = page.get("next_url") and f"{page['next_url']}&apiKey={self.api_key}"
+        return splits
+
+    def fetch_daily_bars(self, ticker: str, start: date, end: date) -> Dict[str, List[Any]]:
+        """Fetch a ticker's daily bars in [start, end] from Polygon.io, split-adjusted as of today."""
+        url = (
+            f"{self.base_url}/v2/aggs/ticker/{ticker}/range/1/day/{start.isoformat()}/{end.isoformat()}"
+            f"?adjusted=true&sort=asc&limit=50000&apiKey={self.api_key}"
+        )
+        results = self._get(url, ticker=ticker).get("results") or []
+        return {
+            "date": [np.datetime64(datetime.fromtimestamp(bar["t"] / 1000, MARKET_TIMEZONE).date(), "D")
+                     for bar in results],
+            "open": [bar["o"] for bar in results],
+            "high": [bar["h"] for bar in results],
+            "low": [bar["l"] for bar in results],
+            "close": [bar["c"] for bar in results],
+            "volume": [bar.get("v", 0.0) for bar in results],
+        }
+
+    def readjust_splits(self, start: date, end: date) -> List[str]:
+        """Re-backfill stored tickers that split in [start, end], through ``end``.
+
+        Stored bars are adjusted as of the day they were ingested, so a split
+        leaves a ticker's earlier history on the pre-split scale. Its whole
+        stored history is fetched again, adjusted as of today, and replaces
+        the old one.
+
+        Returns:
+            List[str]: The tickers re-backfilled
+        """
+        readjusted = []
+        for ticker, executed in sorted(self.fetch_splits(start, end).items()):
+            first = self._bar_store.first_date(ticker)
+            if first is None or first >= executed:
+                continue
+            self._bar_store.replace(ticker, self.fetch_daily_bars(ticker, first, end))
+            readjusted.append(ticker)
+        return readjusted
+
+    def ingest_bars(self, start: date, end: date) -> Dict[str, int]:
+        """Ingest grouped-daily bars for every weekday in [start, end] into the bar store.
+
+        Tickers that split in the range are re-backfilled first (see
+        ``readjust_splits``); days are then fetched concurrently but
+        appended in date order. Grouped-daily bars fetched now are already
+        adjusted for those splits, so they continue the rewritten history.
+        Every Polygon.io call queues at background priority, so a long
+        backfill waits out the rate limit instead of timing out.
+
+        Returns:
+            Dict[str, int]: Number of bars appended, keyed by ISO date
+        """
+        if self._bar_store is None:
+            raise ValueError("Bar store is not configured")
+
+        days = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                days.append(day)
+            day += timedelta(days=1)
+
+        appended: Dict[str, int] = {}
+        with rate_limiter.priority(rate_limiter.BACKGROUND):
+            readjusted = self.readjust_splits(start, end)
+            if readjusted:
+                logger.info("Re-backfilled %d tickers split since they were ingested: %s",
+                            len(readjusted), ", ".join(readjusted))
+
+            workers = max(1, min(self.max_concurrency, len(days)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                fetched = executor.map(metrics.bind_context(self.fetch_grouped_daily), days)
+                for day, bars in zip(days, fetched):
+                    appended[day.isoformat()] = self._bar_store.append_day(day, bars)
+
+        return appended
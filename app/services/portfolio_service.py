@@ -1,22 +1,118 @@
+import hashlib
 import json
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Iterator, Sequence, Tuple, Callable
 import logging
-import requests
+import numpy as np
 
-from flask import current_app
+from flask import current_app, Flask
 from .openai_service import OpenAIService
-from app.utils.auth_utils import get_auth_token
+from .polygon_service import PolygonService
+from app.utils import circuit_breaker, metrics, singleflight
+from app.utils.auth_utils import authorized_get
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.market_hours import last_market_close, seconds_until_next_close
+from app.utils.prompt_builder import count_tokens, fit_holdings, risk_summary
+from app.utils.risk import portfolio_risk
+from app.utils.rebalance import rebalance, trade_cash
+from app.utils.recent_tickers import recent_tickers
+from app.utils.streaming import JSONArrayStream
+from app.utils.ttl_cache import TTLCache
+
+# Previous-close prices shared by every request in this process
+_price_cache = TTLCache(maxsize=2048, ttl=60)
+# Last known prices, served flagged as stale while the throttle service's breaker is open
+_last_prices = TTLCache(maxsize=2048, ttl=86400)
+_price_flight = singleflight.group("throttle.price")
+
+# ``full`` asks the LLM for an assessment; ``fast`` returns only the computed risk figures
+ASSESSMENT_MODES = ("full", "fast")
 
 class PortfolioService:
-    def __init__(self):
-        self._openai_service = OpenAIService()
+    def __init__(self, app: Optional[Flask] = None, bypass_cache: Optional[bool] = None):
+        app = app or current_app
+        self._config = app.config
+        self._openai_service = self._create_openai_service(app, bypass_cache)
         self._logger = logging.getLogger(__name__)  # Initialize logger
-        self._token = None
-    
-    def _get_token(self):
-        if not self._token:
-            self._token = get_auth_token()
-        return self._token
+        self._price_cache_ttl = self._config['PRICE_CACHE_TTL_SECONDS']
+        self._price_max_concurrency = self._config['PRICE_LOOKUP_MAX_CONCURRENCY']
+        self._throttle_url = self._config['THROTTLE_SERVICE_URL']
+        self._price_stale_seconds = self._config['CACHE_STALE_SECONDS']
+        self._polygon_service = self._create_polygon_service(app)
+        self._market_cache = app.extensions['market_data_cache']
+
+    @staticmethod
+    def _create_openai_service(app: Flask, bypass_cache: Optional[bool]) -> OpenAIService:
+        return OpenAIService(app, bypass_cache=bypass_cache)
+
+    @staticmethod
+    def _create_polygon_service(app: Flask) -> PolygonService:
+        return PolygonService(app)
+
+    def _fetch_price(self, ticker: str) -> Optional[float]:
+        """Fetch the previous close for a ticker from the throttle service."""
+        with circuit_breaker.breaker("throttle").guard(), metrics.upstream("throttle", ticker=ticker):
+            response = authorized_get(f"{self._throttle_url}/throttle?name=prev&ticker={ticker}")
+            if response.status_code >= 500:
+                response.raise_for_status()
+        if response.status_code != 200:
+            self._logger.error("Failed to fetch current price for %s", ticker)
+            return None
+
+        data = response.json()
+        self._logger.info(f"API response for {ticker}: {data}")
+        current_price = data.get('close')
+        if current_price is None:
+            self._logger.error(f"'close' key not found in response for {ticker}")
+        return current_price
+
+    def _lookup_price(self, ticker: str, ttl: Optional[float] = None) -> Optional[float]:
+        try:
+            current_price = _price_flight.do(ticker, lambda: self._fetch_price(ticker))
+        except Exception as e:
+            return self._last_price(ticker, e)
+        self._remember_price(ticker, current_price, ttl)
+        return current_price
+
+    def _remember_price(self, ticker: str, price: Optional[float], ttl: Optional[float]) -> None:
+        if price is not None:
+            ttl = ttl or self._price_cache_ttl
+            _price_cache.set(ticker, price, ttl)
+            _last_prices.set(ticker, price, ttl + self._price_stale_seconds)
+
+    def _last_price(self, ticker: str, error: Exception) -> Optional[float]:
+        """Last known price after a failed lookup, if the throttle service's breaker is open."""
+        if isinstance(error, CircuitOpenError):
+            price = _last_prices.get(ticker)
+            if price is not None:
+                circuit_breaker.mark_stale("throttle")
+                return price
+        self._logger.error(f"Failed to fetch current price for {ticker}: {str(error)}")
+        return None
+
+    def warm_price(self, ticker: str, ttl: float) -> Optional[float]:
+        """Fetch a previous close and keep it cached for ``ttl`` seconds."""
+        return self._lookup_price(ticker, ttl)
+
+    def resolve_prices(self, tickers: List[str]) -> Dict[str, Optional[float]]:
+        """Resolve previous-close prices for several tickers.
+
+        Cached prices are used first; the rest are fetched concurrently,
+        bounded by PRICE_LOOKUP_MAX_CONCURRENCY. Tickers whose price could
+        not be resolved map to None.
+        """
+        recent_tickers.add(tickers)
+        prices = {ticker: _price_cache.get(ticker) for ticker in dict.fromkeys(tickers)}
+        missing = [ticker for ticker, price in prices.items() if price is None]
+        metrics.CACHE_REQUESTS.inc(len(prices) - len(missing), cache="price", result="hit")
+        metrics.CACHE_REQUESTS.inc(len(missing), cache="price", result="miss")
+        if not missing:
+            return prices
+
+        workers = min(self._price_max_concurrency, len(missing))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            prices.update(zip(missing, executor.map(metrics.bind_context(self._lookup_price), missing)))
+        return prices
     
     def generate(
         self,
@@ -35,8 +131,30 @@ class PortfolioService:
             json.JSONDecodeError: If AI response is not valid JSON
         """
             
-        response = self._openai_service.generate_portfolio(prompt=prompt)
-        return json.loads(response)  # Parse string response into JSON directly 
+        with metrics.stage("openai"):
+            response = self._openai_service.generate_portfolio(prompt=prompt)
+        with metrics.stage("parse"):
+            return json.loads(response)  # Parse string response into JSON directly
+
+    def _stream_array(self, deltas: Iterator[str], key: str) -> Iterator[Tuple[str, Any]]:
+        """Yield ``(key, element)`` for each completed array element, then ``("result", parsed)``."""
+        parser = JSONArrayStream(key)
+        parts = []
+        for delta in deltas:
+            parts.append(delta)
+            for element in parser.feed(delta):
+                yield key, element
+        yield "result", json.loads("".join(parts))
+
+    def generate_stream(self, prompt: str = "") -> Iterator[Tuple[str, Any]]:
+        """Stream portfolio recommendations as ``(event, data)`` pairs.
+
+        Each position is yielded as a ``portfolio`` event as soon as it is
+        complete, followed by a ``result`` event with the whole recommendation.
+        """
+        deltas = self._openai_service.generate_portfolio(prompt=prompt, stream=True)
+        for event, data in self._stream_array(deltas, "portfolio"):
+            yield event, ({"recommendation": data} if event == "result" else data)
     
     def manipulate(
         self,
@@ -58,89 +176,294 @@ class PortfolioService:
             ValueError: If input parameters are invalid
             json.JSONDecodeError: If AI response is not valid JSON
         """
-        user_preferences = (
+        with metrics.stage("prompt"):
+            prompt = self._manipulation_prompt(cash, totals, additional_info)
+
+        # Get AI-generated recommendation
+        with metrics.stage("openai"):
+            response = self._openai_service.manipulate_portfolio(
+                prompt=prompt,
+                system_prompt=self._config['PORTFOLIO_MANIPULATION_PROMPT']
+            )
+        with metrics.stage("parse"):
+            recommendation = json.loads(response)
+        
+        # Log the recommendation
+        self._logger.info("AI-generated recommendation: %s", recommendation)
+
+        # Resolve prices for recommended stocks we don't hold yet
+        with metrics.stage("prices"):
+            prices = self.resolve_prices(self._new_tickers(recommendation, totals))
+
+        with metrics.stage("rebalance"):
+            return self._apply_actions(recommendation, cash, totals, prices)
+
+    def _holdings_prompt(self, name: str, render: Callable[[str], str], cash: float, totals: Dict[str, Any]) -> str:
+        """Render a prompt with a compact holdings table that fits PROMPT_TOKEN_BUDGET."""
+        model = self._config['OPENAI_MODEL']
+        prompt, tokens, listed = fit_holdings(render, cash, totals, self._config['PROMPT_TOKEN_BUDGET'], model)
+        self._logger.info(
+            "%s prompt: %d tokens (%d with raw holdings), %d of %d positions listed",
+            name, tokens, count_tokens(render(str(totals)), model), listed, len(totals)
+        )
+        return prompt
+
+    def _manipulation_prompt(self, cash: float, totals: Dict[str, Any], additional_info: str = "") -> str:
+        """Prepare the portfolio manipulation prompt for OpenAI."""
+        return self._holdings_prompt("Manipulation", lambda holdings: (
             f"I want you to decide after analyzing of the market if and how to change my portfolio. "
             f"This is my current portfolio:\n"
-            f"{totals}\n"
+            f"{holdings}\n"
             f"i also have liquid cash: {cash}\n"
             f"{additional_info}\n"
             f"your mission is decide how my portfolio should look today after your analyze."
-        )
-        
+        ), cash, totals)
+
+    @staticmethod
+    def _new_tickers(recommendation: Dict[str, Any], totals: Dict[str, Any]) -> List[str]:
+        """Recommended tickers that are not held yet and need a price lookup."""
+        return [stock['ticker'] for stock in recommendation['portfolio'] if stock['ticker'] not in totals]
+
+    def _apply_actions(
+        self,
+        recommendation: Dict[str, Any],
+        cash: float,
+        totals: Dict[str, Any],
+        prices: Dict[str, Optional[float]]
+    ) -> Dict[str, Any]:
+        """Add buy/sell/hold actions and quantities to every recommended position.
+
+        Recommended positions are moved to their target percentage by the
+        rebalance engine, so an over-weight holding is trimmed rather than
+        sold outright. Holdings the recommendation leaves out are kept as is.
+        """
         # Calculate total current portfolio value
         total_value = cash + sum(stock['currentValue'] for stock in totals.values())
 
-        # Get AI-generated recommendation
-        response = self._openai_service.manipulate_portfolio(
-            prompt=user_preferences,
-            system_prompt=current_app.config['PORTFOLIO_MANIPULATION_PROMPT']
+        recommended = recommendation['portfolio']
+        kept = [ticker for ticker in totals if ticker not in {stock['ticker'] for stock in recommended}]
+        tickers = [stock['ticker'] for stock in recommended] + kept
+
+        positions = np.array([totals[t]['position'] if t in totals else 0 for t in tickers], dtype=float)
+        current_prices = np.array([
+            totals[t]['currentPrice'] if t in totals else (prices.get(t) or np.nan) for t in tickers
+        ], dtype=float)
+        weights = np.array(
+            [stock['percentage'] / 100 for stock in recommended]
+            + [totals[t]['currentValue'] / total_value if total_value else 0 for t in kept],
+            dtype=float
         )
-        recommendation = json.loads(response)
-        
-        # Log the recommendation
-        self._logger.info("AI-generated recommendation: %s", recommendation)
+        deltas = rebalance(
+            positions[None, :], current_prices, weights, np.array([cash]),
+            min_trade_value=self._config['REBALANCE_MIN_TRADE_VALUE']
+        )[0]
 
-        # Obtain authentication token
-        token = self._get_token()
-        self._logger.info(f"Using token: {token}")
-        
-        # Calculate buy/sell actions and add additional information
-        for stock in recommendation['portfolio']:
+        for stock, delta in zip(recommended, deltas):
             ticker = stock['ticker']
-            desired_percentage = stock.pop('percentage') / 100  # Change key to desiredPercentage
-            stock['desiredPercentage'] = desired_percentage * 100  # Store as percentage
-
-            desired_value = total_value * desired_percentage
+            desired_percentage = stock.pop('percentage')  # Change key to desiredPercentage
+            stock['desiredPercentage'] = desired_percentage
 
             if ticker in totals:
                 current_value = totals[ticker]['currentValue']
-                current_price = totals[ticker]['currentPrice']
-                current_percentage = (current_value / total_value) * 100
-
+                stock['currentPrice'] = totals[ticker]['currentPrice']
+                stock['currentPercentage'] = (current_value / total_value) * 100
+            else:
+                current_price = prices.get(ticker)
                 stock['currentPrice'] = current_price
-                stock['currentPercentage'] = current_percentage
+                if current_price is None:
+                    stock['action'] = 'hold'
+                    stock['papers'] = 0
+                    continue
+                stock['currentPercentage'] = 0
 
-                difference = desired_value - current_value
+            # The engine's trade decides the action, so a position within the
+            # minimum trade value is a hold rather than a buy or sell of 0 papers
+            stock['action'] = ('sell', 'hold', 'buy')[int(np.sign(delta)) + 1]
+            stock['papers'] = abs(float(delta))
 
-                if desired_percentage == 0 or desired_value < current_value:
-                    # Sell all shares if desired percentage is zero or less than current
-                    stock['action'] = 'sell'
-                    stock['papers'] = totals[ticker]['position']
-                else:
-                    stock['action'] = 'buy' if difference > 0 else 'sell'
-                    stock['papers'] = abs(difference) // current_price
-            else:
-                # Fetch current price for new stocks
-                headers = {'Authorization': f'Bearer {token}'}
-                response = requests.get(f"http://localhost:3030/throttle?name=prev&ticker={ticker}", headers=headers)
-                if response.status_code == 200:
-                    data = response.json()
-                    self._logger.info(f"API response for {ticker}: {data}")
-                    current_price = data.get('close')
-                    if current_price is None:
-                        self._logger.error(f"'close' key not found in response for {ticker}")
-                        stock['currentPrice'] = None
-                        stock['papers'] = 0
-                        continue
-
-                    stock['currentPrice'] = current_price
-                    stock['currentPercentage'] = 0
-
-                    # Calculate papers to buy
-                    stock['action'] = 'buy'
-                    stock['papers'] = desired_value // current_price
-                else:
-                    self._logger.error("Failed to fetch current price for %s", ticker)
-                    stock['currentPrice'] = None
-                    stock['papers'] = 0
+        return recommendation
+
+    def rebalance_accounts(
+        self,
+        accounts: List[Dict[str, Any]],
+        targets: Optional[Dict[str, float]] = None,
+        prices: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """Rebalance many accounts to target allocations in one pass.
+
+        Args:
+            accounts: Accounts with ``id``, ``cash``, ``totals`` and optionally
+                their own ``targets``
+            targets: Default target percentages by ticker, for accounts without their own
+            prices: Known prices by ticker; tickers that are neither here nor
+                held by any account are looked up
+
+        Returns:
+            Dict[str, Any]: ``results`` with the trades per account, in request order
+        """
+        requested = dict(prices or {})
+        prices = self._held_prices(accounts, requested)
+        wanted = {ticker for account in accounts for ticker in (account.get('targets') or targets or {})}
+        prices.update(self.resolve_prices([ticker for ticker in wanted if ticker not in prices]))
+        return self._rebalance_accounts(accounts, targets or {}, prices, requested)
+
+    @staticmethod
+    def _held_prices(accounts: List[Dict[str, Any]], requested: Dict[str, float]) -> Dict[str, float]:
+        """Request prices, then the first holding's ``currentPrice`` for held tickers without one."""
+        prices: Dict[str, float] = {}
+        for account in accounts:
+            for ticker, holding in account['totals'].items():
+                prices.setdefault(ticker, holding['currentPrice'])
+        prices.update(requested)
+        return prices
+
+    def _rebalance_accounts(
+        self,
+        accounts: List[Dict[str, Any]],
+        targets: Dict[str, float],
+        prices: Dict[str, Optional[float]],
+        requested: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """Rebalance at ``prices``; an account's own holding price applies unless the request priced the ticker."""
+        requested = requested or {}
+        # Held tickers missing from an account's targets are sold off
+        tickers = list(dict.fromkeys(
+            [ticker for account in accounts for ticker in account['totals']]
+            + [ticker for account in accounts for ticker in (account.get('targets') or targets)]
+        ))
+        column = {ticker: index for index, ticker in enumerate(tickers)}
+
+        shape = (len(accounts), len(tickers))
+        positions = np.zeros(shape)
+        weights = np.zeros(shape)
+        account_prices = np.tile(
+            np.array([np.nan if prices.get(t) is None else prices[t] for t in tickers], dtype=float),
+            (len(accounts), 1)
+        )
+        cash = np.array([account['cash'] for account in accounts], dtype=float)
+        for row, account in enumerate(accounts):
+            for ticker, holding in account['totals'].items():
+                positions[row, column[ticker]] = holding['position']
+                if ticker not in requested:
+                    account_prices[row, column[ticker]] = holding['currentPrice']
+            for ticker, percentage in (account.get('targets') or targets).items():
+                weights[row, column[ticker]] = percentage / 100
+
+        deltas = rebalance(positions, account_prices, weights, cash,
+                           min_trade_value=self._config['REBALANCE_MIN_TRADE_VALUE'])
+        remaining_cash = cash + trade_cash(deltas, account_prices)
+
+        results = []
+        for row, account in enumerate(accounts):
+            traded = np.nonzero(deltas[row])[0]
+            results.append({
+                "id": account.get('id', row),
+                "trades": [
+                    {
+                        "ticker": tickers[col],
+                        "action": "buy" if deltas[row, col] > 0 else "sell",
+                        "papers": abs(float(deltas[row, col])),
+                        "currentPrice": float(account_prices[row, col])
+                    }
+                    for col in traded
+                ],
+                "remainingCash": round(float(remaining_cash[row]), 2),
+                "unpriced": [
+                    tickers[col] for col in np.nonzero(np.isnan(account_prices[row]) & (weights[row] > 0))[0]
+                ]
+            })
+
+        return {"results": results}
+
+    def _risk_key(self, cash: float, totals: Dict[str, Any]) -> str:
+        """Cache key for the holdings' risk figures on the latest trading day."""
+        payload = json.dumps([
+            cash,
+            sorted((ticker, holding.get('currentValue', 0)) for ticker, holding in totals.items()),
+            self._config['RISK_LOOKBACK_DAYS'],
+            self._config['RISK_BENCHMARK'],
+            self._config['RISK_VAR_CONFIDENCE']
+        ])
+        return f"risk:{self._risk_day()}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def _risk_day(self) -> str:
+        """ISO date of the latest final daily close."""
+        return last_market_close(delay_minutes=self._config['MARKET_DATA_DELAY_MINUTES']).date().isoformat()
+
+    def _risk_tickers(self, totals: Dict[str, Any]) -> List[str]:
+        return list(dict.fromkeys([*totals, self._config['RISK_BENCHMARK']]))
+
+    def _risk(
+        self,
+        cash: float,
+        totals: Dict[str, Any],
+        series: Dict[str, Sequence[float]],
+        errors: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Compute risk figures from fetched closes and cache them until the next market close."""
+        days = self._config['RISK_LOOKBACK_DAYS'] + 1
+        tickers = list(totals)
+        # Right-align so the latest close of every ticker shares a column
+        closes = np.full((len(tickers), days), np.nan)
+        for row, ticker in enumerate(tickers):
+            history = series.get(ticker)
+            if history is not None and len(history):
+                closes[row, -len(history):] = history[-days:]
+
+        benchmark = None
+        benchmark_closes = series.get(self._config['RISK_BENCHMARK'])
+        if benchmark_closes is not None and len(benchmark_closes):
+            benchmark = np.full(days, np.nan)
+            benchmark[-len(benchmark_closes):] = benchmark_closes[-days:]
+
+        risk = portfolio_risk(
+            tickers,
+            closes,
+            [holding.get('currentValue', 0) for holding in totals.values()],
+            cash,
+            benchmark,
+            confidence=self._config['RISK_VAR_CONFIDENCE'],
+            min_observations=self._config['RISK_MIN_OBSERVATIONS']
+        )
+        risk["asOf"] = self._risk_day()
+        risk["benchmark"] = self._config['RISK_BENCHMARK']
+        if errors:
+            risk["errors"] = errors
+        else:
+            # Partial figures are not cached, so the next request retries the missing tickers
+            ttl = seconds_until_next_close(delay_minutes=self._config['MARKET_DATA_DELAY_MINUTES'])
+            self._market_cache.set(self._risk_key(cash, totals), risk, ttl)
+        return risk
+
+    def risk_profile(self, cash: float, totals: Dict[str, Any]) -> Dict[str, Any]:
+        """Compute the holdings' risk figures from daily closes.
+
+        Volatility, beta against RISK_BENCHMARK, max drawdown, VaR,
+        concentration and correlations over the last RISK_LOOKBACK_DAYS
+        trading days (see ``app.utils.risk``). Closes come through
+        ``PolygonService``; the figures are cached per holdings until the
+        next market close.
+
+        Returns:
+            Dict[str, Any]: Risk figures, with fetch ``errors`` keyed by ticker if any
+        """
+        cached = self._market_cache.get(self._risk_key(cash, totals))
+        if cached is not None:
+            return cached
+
+        with metrics.stage("fetch_closes"):
+            series, errors = self._polygon_service.fetch_closes(
+                self._risk_tickers(totals), self._config['RISK_LOOKBACK_DAYS'] + 1
+            )
+        with metrics.stage("risk"):
+            return self._risk(cash, totals, series, errors)
 
-        return recommendation 
-    
     def assess_risk_and_diversify(
         self,
         cash: float,
         totals: Dict[str, Any],
-        additional_info: str = ""
+        additional_info: str = "",
+        mode: str = "full"
     ) -> Dict[str, Any]:
         """Assess risk and recommend diversification strategies.
         
@@ -148,26 +471,73 @@ class PortfolioService:
             cash: Available liquid cash
             totals: Current portfolio holdings
             additional_info: Optional context for the recommendation
+            mode: ``full`` for the AI assessment, ``fast`` for the risk figures alone
             
         Returns:
-            Dict[str, Any]: AI-generated assessment and diversification recommendation
+            Dict[str, Any]: ``risk`` figures, plus the AI-generated assessment
+            and diversification recommendation in ``full`` mode
         """
-        # Prepare the prompt for OpenAI
-        user_preferences = (
-            f"Assess the risk profile of the following portfolio and suggest diversification strategies:\n"
-            f"Current portfolio:\n{totals}\n"
-            f"Available cash: {cash}\n"
-            f"{additional_info}\n"
-            f"Provide an assessment of the risk and recommendations for balancing the portfolio across sectors, asset classes, and geographies."
-        )
-        print('portfolio_service.assess_risk_and_diversify')
+        risk = self.risk_profile(cash, totals)
+        if mode == "fast":
+            return {"risk": risk}
+
+        with metrics.stage("prompt"):
+            user_preferences = self._assessment_prompt(cash, totals, additional_info, risk)
         # Get AI-generated diversification recommendation
-        response = self._openai_service.assess_risk_and_diversify(prompt=user_preferences)
-        recommendation = json.loads(response)
+        with metrics.stage("openai"):
+            response = self._openai_service.assess_risk_and_diversify(prompt=user_preferences)
+        with metrics.stage("parse"):
+            recommendation = json.loads(response)
         # Log the recommendation
         self._logger.info("AI-generated assessment and diversification recommendation: %s", recommendation)
 
         return {
             "assessment": recommendation.get("assessment", ""),
-            "diversify": recommendation.get("diversify", [])
-        } 
\ No newline at end of file
+            "diversify": recommendation.get("diversify", []),
+            "risk": risk
+        }
+
+    def assess_risk_and_diversify_stream(
+        self,
+        cash: float,
+        totals: Dict[str, Any],
+        additional_info: str = ""
+    ) -> Iterator[Tuple[str, Any]]:
+        """Stream the assessment as ``(event, data)`` pairs.
+
+        The computed figures are yielded first as a ``risk`` event, then each
+        strategy as a ``diversify`` event once complete, followed by a
+        ``result`` event shaped like ``assess_risk_and_diversify``.
+        """
+        risk = self.risk_profile(cash, totals)
+        yield "risk", risk
+        deltas = self._openai_service.assess_risk_and_diversify(
+            prompt=self._assessment_prompt(cash, totals, additional_info, risk),
+            stream=True
+        )
+        for event, data in self._stream_array(deltas, "diversify"):
+            if event == "result":
+                data = {
+                    "assessment": data.get("assessment", ""),
+                    "diversify": data.get("diversify", []),
+                    "risk": risk
+                }
+            yield event, data
+
+    def _assessment_prompt(
+        self,
+        cash: float,
+        totals: Dict[str, Any],
+        additional_info: str = "",
+        risk: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Prepare the risk assessment prompt for OpenAI."""
+        figures = f"Risk figures from daily closes:\n{risk_summary(risk)}\n" if risk else ""
+        return self._holdings_prompt("Assessment", lambda holdings: (
+            f"Assess the risk profile of the following portfolio and suggest diversification strategies:\n"
+            f"Current portfolio:\n{holdings}\n"
+            f"Available cash: {cash}\n"
+            f"{figures}"
+            f"{additional_info}\n"
+            f"Provide an assessment of the risk and recommendations for balancing the portfolio across sectors, asset classes, and geographies."
+        ), cash, totals)
@@ -0,0 +1,82 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from flask import current_app, Flask
+from .polygon_service import PolygonService
+from .portfolio_service import PortfolioService
+from app.utils import rate_limiter
+from app.utils.market_hours import seconds_until_next_close
+from app.utils.recent_tickers import recent_tickers
+
+logger = logging.getLogger(__name__)
+
+class PrewarmService:
+    """Precompute the data first-of-day requests need, right after the close.
+
+    For every watchlist ticker the closes behind ``analyze_trend`` (default
+    window and limit) are refreshed in the shared market data cache, and the
+    previous-close price is cached until the next close.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        app = app or current_app
+        self._app = app
+        self._config = app.config
+        self._polygon_service = PolygonService(app)
+        self._portfolio_service = PortfolioService(app)
+
+    def watchlist(self) -> List[str]:
+        """Configured watchlist, or the most recently requested tickers."""
+        return self._config['PREWARM_WATCHLIST'] or recent_tickers.most_recent(
+            self._config['PREWARM_RECENT_TICKERS'])
+
+    def _warm_ticker(self, ticker: str, price_ttl: float) -> Dict[str, Any]:
+        started = time.perf_counter()
+        outcome: Dict[str, Any] = {}
+        with rate_limiter.priority(rate_limiter.BACKGROUND):
+            try:
+                outcome["fetched_closes"] = self._polygon_service.warm_closes(
+                    ticker, (self._config['TREND_DEFAULT_WINDOW'],), self._config['TREND_DEFAULT_LIMIT'])
+            except Exception as e:
+                outcome["error"] = str(e)
+            outcome["price"] = self._portfolio_service.warm_price(ticker, price_ttl)
+        outcome["seconds"] = round(time.perf_counter() - started, 3)
+        return outcome
+
+    def run(self, tickers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Warm every ticker, bounded by PREWARM_MAX_CONCURRENCY.
+
+        Returns:
+            Dict[str, Any]: Timing report for the run, also kept in
+            ``app.extensions['prewarm_report']``
+        """
+        tickers = tickers if tickers is not None else self.watchlist()
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        price_ttl = seconds_until_next_close(delay_minutes=self._config['MARKET_DATA_DELAY_MINUTES'])
+
+        outcomes: Dict[str, Dict[str, Any]] = {}
+        if tickers:
+            workers = max(1, min(self._config['PREWARM_MAX_CONCURRENCY'], len(tickers)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = dict(zip(tickers, executor.map(lambda t: self._warm_ticker(t, price_ttl), tickers)))
+
+        report = {
+            "started_at": started_at.isoformat(),
+            "seconds": round(time.perf_counter() - started, 3),
+            "tickers": len(tickers),
+            "closes_fetched": sum(1 for o in outcomes.values() if o.get("fetched_closes")),
+            "prices_cached": sum(1 for o in outcomes.values() if o["price"] is not None),
+            "errors": {ticker: o["error"] for ticker, o in outcomes.items() if "error" in o},
+            "per_ticker_seconds": {ticker: o["seconds"] for ticker, o in outcomes.items()}
+        }
+        self._app.extensions['prewarm_report'] = report
+        logger.info(
+            "Pre-warmed %d tickers in %.2fs (%d closes fetched, %d prices cached, %d errors)",
+            report["tickers"], report["seconds"], report["closes_fetched"],
+            report["prices_cached"], len(report["errors"])
+        )
+        return report
@@ -0,0 +1,196 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from flask import current_app, Flask
+from .openai_service import OpenAIService
+from .polygon_service import PolygonService
+from app.utils import deadlines, metrics, rate_limiter
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.prompt_builder import count_tokens
+
+TRADE_FIELDS = ("ticker", "price", "operation", "papers")
+
+class TweetService:
+    """Tweets about executed trades, written from each ticker's trend.
+
+    The trend comes from ``PolygonService.analyze_trends`` (default window
+    and limit), so tickers warmed by the post-close pre-warm cost no
+    Polygon.io call. Batches are packed into as few completions as fit
+    TWEET_BATCH_TOKEN_BUDGET. Trades a completion gives no usable tweet for
+    are retried one completion each; a completion that fails outright fails
+    the batch, since retrying its trades would only add load to an upstream
+    that is already failing.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, bypass_cache: Optional[bool] = None):
+        app = app or current_app
+        self._config = app.config
+        self._openai_service = self._create_openai_service(app, bypass_cache)
+        self._polygon_service = self._create_polygon_service(app)
+        self._logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _create_openai_service(app: Flask, bypass_cache: Optional[bool]) -> OpenAIService:
+        return OpenAIService(app, bypass_cache=bypass_cache)
+
+    @staticmethod
+    def _create_polygon_service(app: Flask) -> PolygonService:
+        return PolygonService(app)
+
+    def _trend_params(self) -> Dict[str, Any]:
+        return {"windows": (self._config['TREND_DEFAULT_WINDOW'],), "limit": self._config['TREND_DEFAULT_LIMIT']}
+
+    def _summaries(self, trends: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        for ticker, error in trends["errors"].items():
+            self._logger.warning("No trend for %s tweet: %s", ticker, error)
+        return {ticker: self.trend_summary(analysis) for ticker, analysis in trends["results"].items()}
+
+    def analyses(self, tickers: List[str]) -> Dict[str, str]:
+        """One-line trend summary per ticker; tickers without a trend are left out."""
+        with metrics.stage("trends"):
+            return self._summaries(self._polygon_service.analyze_trends(tickers, **self._trend_params()))
+
+    def trend_summary(self, analysis: Dict[str, Any]) -> str:
+        values = analysis["values"]
+        return (
+            f"{self._config['TREND_DEFAULT_WINDOW']}-day SMA {analysis['trend'].lower()} "
+            f"(slope {analysis['slope']:+.2f}/day), {values[0]:.2f} -> {values[-1]:.2f} "
+            f"over the last {len(values)} sessions"
+        )
+
+    def tweet(self, trade: Dict[str, Any]) -> str:
+        """Tweet about one trade (``ticker``, ``price``, ``operation``, ``papers``)."""
+        analysis = self.analyses([trade['ticker']]).get(trade['ticker'])
+        with metrics.stage("openai"):
+            return self._openai_service.generate_trade_tweet(**trade, analysis=analysis)
+
+    def tweet_stream(self, trade: Dict[str, Any]) -> Iterator[str]:
+        """Stream the tweet about one trade as content deltas."""
+        analysis = self.analyses([trade['ticker']]).get(trade['ticker'])
+        return self._openai_service.generate_trade_tweet(**trade, analysis=analysis, stream=True)
+
+    @staticmethod
+    def _trade_line(index: int, trade: Dict[str, Any], analysis: Optional[str]) -> str:
+        return (f"{index}. {trade['operation']} {trade['papers']} {trade['ticker']} @ {trade['price']} "
+                f"| {analysis or 'no trend data'}")
+
+    def _pack(self, trades: List[Dict[str, Any]], analyses: Dict[str, str]) -> List[List[Tuple[int, str]]]:
+        """Split trades into chunks of (index, line) that each fit one completion.
+
+        A chunk ends when its lines would exceed TWEET_BATCH_TOKEN_BUDGET
+        together with the prompt around them, or when it holds
+        TWEET_BATCH_TRADES_PER_COMPLETION trades.
+        """
+        model = self._config['OPENAI_TWEET_MODEL']
+        budget = self._config['TWEET_BATCH_TOKEN_BUDGET']
+        per_completion = self._config['TWEET_BATCH_TRADES_PER_COMPLETION']
+        overhead = count_tokens(self._config['TWEET_BATCH_SYSTEM_PROMPT'], model) + 40
+
+        chunks: List[List[Tuple[int, str]]] = []
+        chunk: List[Tuple[int, str]] = []
+        used = overhead
+        for index, trade in enumerate(trades):
+            line = self._trade_line(index, trade, analyses.get(trade['ticker']))
+            tokens = count_tokens(line, model) + 1
+            if chunk and (used + tokens > budget or len(chunk) >= per_completion):
+                chunks.append(chunk)
+                chunk, used = [], overhead
+            chunk.append((index, line))
+            used += tokens
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    @staticmethod
+    def parse_tweets(content: str, ids: List[int]) -> Dict[int, str]:
+        """Tweets by trade id from a batch completion; unusable entries are left out.
+
+        Accepts a JSON array (optionally in a markdown fence or under a
+        ``tweets`` key) of ``{"id", "tweet"}`` objects, or of plain strings
+        when there is one per trade.
+        """
+        text = content.strip()
+        if text.startswith("```"):
+            text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+        try:
+            items = json.loads(text)
+        except ValueError:
+            return {}
+        if isinstance(items, dict):
+            items = items.get("tweets")
+        if not isinstance(items, list):
+            return {}
+
+        tweets: Dict[int, str] = {}
+        for position, item in enumerate(items):
+            if isinstance(item, dict):
+                tweet, index = item.get("tweet"), item.get("id")
+            else:
+                tweet, index = item, ids[position] if len(items) == len(ids) else None
+            if isinstance(index, str) and index.isdigit():
+                index = int(index)
+            if index in ids and isinstance(tweet, str) and tweet.strip():
+                tweets[index] = tweet.strip()
+        return tweets
+
+    def _complete_chunk(self, chunk: List[Tuple[int, str]]) -> Dict[int, str]:
+        """Tweets for one packed chunk; trades left out of an unparseable or partial answer fall back."""
+        ids = [index for index, _ in chunk]
+        content = self._openai_service.generate_trade_tweets("\n".join(line for _, line in chunk))
+        tweets = self.parse_tweets(content, ids)
+        if len(tweets) < len(ids):
+            self._logger.warning("Batch tweet completion answered %d of %d trades", len(tweets), len(ids))
+        return tweets
+
+    def _complete_one(self, trade: Dict[str, Any], analysis: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """Tweet about a single trade as ``(tweet, error)``."""
+        try:
+            return self._openai_service.generate_trade_tweet(**trade, analysis=analysis), None
+        except (rate_limiter.RateLimitTimeout, CircuitOpenError, deadlines.DeadlineExceeded):
+            raise
+        except Exception as e:
+            self._logger.error("Tweet for %s failed: %s", trade['ticker'], str(e))
+            return None, str(e)
+
+    def tweet_batch(self, trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Tweet about several trades with as few completions as fit the token budget.
+
+        Args:
+            trades: Trades with ``ticker``, ``price``, ``operation`` and ``papers``
+
+        Returns:
+            Dict[str, Any]: ``results`` in request order, each trade with its
+            ``tweet`` or an ``error``, and the number of ``completions`` made
+        """
+        trades = [{field: trade[field] for field in TRADE_FIELDS} for trade in trades]
+        analyses = self.analyses(list(dict.fromkeys(trade['ticker'] for trade in trades)))
+        chunks = self._pack(trades, analyses)
+
+        tweets: Dict[int, str] = {}
+        workers = max(1, min(self._config['TWEET_BATCH_MAX_CONCURRENCY'], len(chunks)))
+        with metrics.stage("openai"), ThreadPoolExecutor(max_workers=workers) as executor:
+            for answered in executor.map(metrics.bind_context(self._complete_chunk), chunks):
+                tweets.update(answered)
+
+            missing = [index for index in range(len(trades)) if index not in tweets]
+            fallbacks = list(executor.map(
+                metrics.bind_context(lambda index: self._complete_one(trades[index], analyses.get(trades[index]['ticker']))),
+                missing
+            ))
+
+        return self._results(trades, tweets, dict(zip(missing, fallbacks)), len(chunks) + len(missing))
+
+    @staticmethod
+    def _results(
+        trades: List[Dict[str, Any]],
+        tweets: Dict[int, str],
+        fallbacks: Dict[int, Tuple[Optional[str], Optional[str]]],
+        completions: int
+    ) -> Dict[str, Any]:
+        results = []
+        for index, trade in enumerate(trades):
+            tweet, error = (tweets[index], None) if index in tweets else fallbacks[index]
+            results.append({**trade, "tweet": tweet} if error is None else {**trade, "error": error})
+        return {"results": results, "completions": completions}
@@ -0,0 +1,27 @@
+"""Bearer-token gates for endpoints that must not be open to every caller."""
+import hmac
+from http import HTTPStatus
+from logging import getLogger
+from typing import Any, Callable, Optional
+
+from flask import current_app, jsonify, request
+
+logger = getLogger(__name__)
+
+def require_token(setting: str) -> Callable[[], Optional[Any]]:
+    """``before_request`` hook admitting only ``Authorization: Bearer <app.config[setting]>``.
+
+    Without the setting the gated endpoints are off (404); a missing or
+    wrong token gets a 401.
+    """
+    def check_token():
+        token = current_app.config[setting]
+        if not token:
+            return jsonify({"error": "Not found"}), HTTPStatus.NOT_FOUND
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            logger.warning("Rejected unauthorized request to %s", request.path)
+            return jsonify({"error": "Unauthorized"}), HTTPStatus.UNAUTHORIZED, {"WWW-Authenticate": "Bearer"}
+        return None
+
+    return check_token
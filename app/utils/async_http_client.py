@@ -0,0 +1,69 @@
+"""Pooled ``httpx.AsyncClient`` for the ASGI request path.
+
+Mirrors ``app.utils.http_client``: one client per event loop, keep-alive
+pools, the same default timeouts, and retries with exponential backoff for
+idempotent requests.
+"""
+import asyncio
+import weakref
+from typing import Any
+
+import httpx
+
+from app.utils import deadlines, http_client
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        settings = http_client._settings
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"]),
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=settings["pool_maxsize"]),
+        )
+        _clients[loop] = client
+    return client
+
+async def request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Send a request through the shared client, retrying idempotent calls.
+
+    Every attempt's timeouts are capped at the time left before the request
+    deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline passes before or during the call
+    """
+    settings = http_client._settings
+    retries = settings["retries"] if method.upper() in IDEMPOTENT_METHODS else 0
+
+    for attempt in range(retries + 1):
+        timeout = kwargs.get("timeout") or httpx.Timeout(
+            deadlines.timeout(settings["read_timeout"]), connect=deadlines.timeout(settings["connect_timeout"]))
+        try:
+            with deadlines.enforce():
+                response = await get_client().request(method, url, **{**kwargs, "timeout": timeout})
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+        await asyncio.sleep(settings["backoff_factor"] * (2 ** attempt))
+
+async def get(url: str, **kwargs: Any) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+async def post(url: str, **kwargs: Any) -> httpx.Response:
+    return await request("POST", url, **kwargs)
+
+async def aclose() -> None:
+    """Close the client bound to the running event loop."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -1,23 +1,54 @@
+import asyncio
 import requests
-import os
-from dotenv import load_dotenv
+import json
+import base64
+import threading
+import time
+from http import HTTPStatus
+from typing import Any, Callable, Optional, Tuple
 
-load_dotenv()
+from app.utils import http_client, async_http_client, metrics
 
-AGENT_EMAIL = os.getenv("SERVICE_AGENT_EMAIL")
-AGENT_PASSWORD = os.getenv("SERVICE_AGENT_PASSWORD")
+# Throttle service credentials and token lifetimes, set from the app config by ``init_app``
+_settings = {
+    "throttle_service_url": "http://localhost:3030",
+    "email": None,
+    "password": None,
+    # Refresh this many seconds before the token's `exp` claim
+    "refresh_margin": 60.0,
+    # Lifetime assumed when the token carries no readable `exp` claim
+    "default_ttl": 3600.0,
+}
+
+def configure(**settings: Any) -> None:
+    """Override the authentication settings; the cached token is dropped."""
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown auth settings: {', '.join(sorted(unknown))}")
+    _settings.update(settings)
+    token_manager.clear()
+
+def init_app(app) -> None:
+    """Authenticate against the app's throttle service with its service agent credentials."""
+    configure(
+        throttle_service_url=app.config['THROTTLE_SERVICE_URL'],
+        email=app.config['SERVICE_AGENT_EMAIL'],
+        password=app.config['SERVICE_AGENT_PASSWORD'],
+        refresh_margin=app.config['AUTH_TOKEN_REFRESH_MARGIN_SECONDS'],
+        default_ttl=app.config['AUTH_TOKEN_DEFAULT_TTL_SECONDS'],
+    )
 
 def get_auth_token():
     """Authenticate and obtain a token for API access."""
-    auth_url = "http://localhost:3030/authentication"
+    auth_url = f"{_settings['throttle_service_url']}/authentication"
     credentials = {
         "strategy": "local",
-        "email": AGENT_EMAIL,
-        "password": AGENT_PASSWORD
+        "email": _settings['email'],
+        "password": _settings['password']
     }
     
     try:
-        response = requests.post(auth_url, json=credentials)
+        response = http_client.post(auth_url, json=credentials)
         response.raise_for_status()  # Raise an error for bad responses
         token = response.json().get('accessToken')
         if not token:
@@ -28,4 +59,102 @@ def get_auth_token():
         raise Exception("Failed to authenticate and obtain token")
     except Exception as e:
         print(f"Error: {e}")
-        raise 
\ No newline at end of file
+        raise
+
+def decode_token_expiry(token: str) -> Optional[float]:
+    """Return the `exp` claim of a JWT as a Unix timestamp, without verifying it."""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+        return float(exp) if exp is not None else None
+    except (IndexError, ValueError, TypeError):
+        return None
+
+class TokenManager:
+    """Process-wide cache of the service token, shared across requests and threads.
+
+    The token is refreshed ``refresh_margin`` seconds before it expires.
+    Concurrent callers that find it missing or expiring wait on a single
+    in-flight refresh instead of each authenticating. Settings left as None
+    follow the configured ones (see ``configure``).
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], str] = get_auth_token,
+        refresh_margin: Optional[float] = None,
+        default_ttl: Optional[float] = None
+    ):
+        self._fetch = fetch
+        self._refresh_margin = refresh_margin
+        self._default_ttl = default_ttl
+        self._lock = threading.Lock()
+        # Token and expiry replaced together, so a lock-free reader never
+        # pairs one token with another's expiry or sees it cleared midway
+        self._cached: Tuple[Optional[str], float] = (None, 0.0)
+
+    def _is_valid(self, token: Optional[str], expires_at: float) -> bool:
+        margin = _settings['refresh_margin'] if self._refresh_margin is None else self._refresh_margin
+        return token is not None and time.time() < expires_at - margin
+
+    def get_token(self) -> str:
+        """Return a valid token, refreshing it if it is missing or about to expire."""
+        token, expires_at = self._cached
+        if self._is_valid(token, expires_at):
+            return token
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            token, expires_at = self._cached
+            if not self._is_valid(token, expires_at):
+                with metrics.upstream("auth"):
+                    token = self._fetch()
+                default_ttl = _settings['default_ttl'] if self._default_ttl is None else self._default_ttl
+                self._cached = (token, decode_token_expiry(token) or time.time() + default_ttl)
+            return token
+
+    def clear(self) -> None:
+        """Drop the cached token, whatever it is (e.g. after the credentials changed)."""
+        with self._lock:
+            self._cached = (None, 0.0)
+
+    def invalidate(self, token: str) -> None:
+        """Drop ``token`` if it is still the cached one (e.g. after a 401)."""
+        with self._lock:
+            if self._cached[0] == token:
+                self._cached = (None, 0.0)
+
+token_manager = TokenManager()
+
+def authorized_get(url: str, **kwargs: Any) -> requests.Response:
+    """GET ``url`` with the service token, re-authenticating once on a 401."""
+    with metrics.stage("auth"):
+        token = token_manager.get_token()
+    headers = {**kwargs.pop('headers', {}), 'Authorization': f'Bearer {token}'}
+    response = http_client.get(url, headers=headers, **kwargs)
+
+    if response.status_code == HTTPStatus.UNAUTHORIZED:
+        token_manager.invalidate(token)
+        headers['Authorization'] = f'Bearer {token_manager.get_token()}'
+        response = http_client.get(url, headers=headers, **kwargs)
+
+    return response
+
+async def async_authorized_get(url: str, **kwargs: Any):
+    """Async variant of ``authorized_get`` for the ASGI request path.
+
+    The shared token manager is consulted on a worker thread so a refresh
+    never blocks the event loop.
+    """
+    with metrics.stage("auth"):
+        token = await asyncio.to_thread(metrics.bind_context(token_manager.get_token))
+    headers = {**kwargs.pop('headers', {}), 'Authorization': f'Bearer {token}'}
+    response = await async_http_client.get(url, headers=headers, **kwargs)
+
+    if response.status_code == HTTPStatus.UNAUTHORIZED:
+        token_manager.invalidate(token)
+        headers['Authorization'] = f'Bearer {await asyncio.to_thread(token_manager.get_token)}'
+        response = await async_http_client.get(url, headers=headers, **kwargs)
+
+    return response
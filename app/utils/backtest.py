@@ -0,0 +1,150 @@
+"""Vectorized backtesting of target allocations.
+
+Closes are a ``(days x assets)`` matrix with NaN where an asset has no close.
+Portfolios are simulated together: on every decision day all portfolios
+with a decision trade to their targets in one ``rebalance`` call (whole
+shares, cash, transaction costs). Between decision days, holdings are
+valued for every day of the stretch with one matrix product. Positions are
+valued at the last known close, also when sizing a rebalance, and an asset
+can only be traded on days it has one.
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+
+from app.utils.rebalance import rebalance, trade_cash
+from app.utils.risk import TRADING_DAYS, max_drawdown
+
+def forward_fill(closes: np.ndarray) -> np.ndarray:
+    """Carry each column's last close forward over NaN days (leading NaN stay NaN)."""
+    closes = np.asarray(closes, dtype=float)
+    rows = np.where(np.isnan(closes), 0, np.arange(closes.shape[0])[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return closes[rows, np.arange(closes.shape[1])]
+
+def _charge_costs(
+    deltas: np.ndarray,
+    prices: np.ndarray,
+    cash: np.ndarray,
+    cost_rate: float,
+    fixed_cost: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Scale buys down so trades plus costs stay within cash; returns deltas and costs.
+
+    A portfolio's buys are scaled by the same factor, as ``rebalance`` does
+    for cost-free trades.
+    """
+    prices = np.where(deltas != 0, prices, 0.0)
+
+    def costs(deltas: np.ndarray) -> np.ndarray:
+        return cost_rate * (np.abs(deltas) * prices).sum(axis=1) + fixed_cost * (deltas != 0).sum(axis=1)
+
+    charged = costs(deltas)
+    over = cash + trade_cash(deltas, prices) - charged < -1e-9
+    if over.any():
+        buy_value = (np.maximum(deltas, 0.0) * prices).sum(axis=1)
+        sell_value = (np.maximum(-deltas, 0.0) * prices).sum(axis=1)
+        budget = cash + sell_value * (1 - cost_rate) - fixed_cost * (deltas != 0).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.clip(budget / (buy_value * (1 + cost_rate)), 0.0, 1.0)
+        scale = np.where(over, np.nan_to_num(scale), 1.0)
+        deltas = np.where(deltas > 0, np.floor(deltas * scale[:, None]), deltas)
+        charged = costs(deltas)
+    return deltas, charged
+
+def backtest(
+    closes: np.ndarray,
+    days: np.ndarray,
+    targets: np.ndarray,
+    cash: np.ndarray,
+    cost_rate: float = 0.0,
+    fixed_cost: float = 0.0,
+    min_trade_value: float = 0.0
+) -> Dict[str, np.ndarray]:
+    """Simulate portfolios trading to target weights on decision days.
+
+    Args:
+        closes: Daily closes, shape (days, assets)
+        days: Row of ``closes`` for each decision day, ascending, shape (decisions,)
+        targets: Target weights per portfolio and decision day, shape
+            (portfolios, decisions, assets); an all-NaN row means the
+            portfolio holds that day, and NaN in other rows means 0
+        cash: Starting cash per portfolio, shape (portfolios,)
+        cost_rate: Transaction cost as a fraction of traded value
+        fixed_cost: Transaction cost per trade, in currency
+        min_trade_value: Smallest trade worth placing, in currency
+
+    Returns:
+        Dict[str, np.ndarray]: ``equity``, ``traded`` (value traded) and
+        ``costs`` per portfolio and day, shape (portfolios, days), and the
+        final ``positions`` and ``cash``
+    """
+    closes = np.asarray(closes, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    cash = np.array(cash, dtype=float)
+    valuation = np.nan_to_num(forward_fill(closes))
+    portfolios, (length, assets) = targets.shape[0], closes.shape
+
+    positions = np.zeros((portfolios, assets))
+    equity = np.empty((portfolios, length))
+    traded = np.zeros((portfolios, length))
+    costs = np.zeros((portfolios, length))
+    decides = ~np.all(np.isnan(targets), axis=2)
+
+    bounds = [*days, length]
+    equity[:, :bounds[0]] = cash[:, None]
+    for index, day in enumerate(days):
+        rows = decides[:, index]
+        if rows.any():
+            prices = closes[day]
+            value = cash[rows] + positions[rows] @ valuation[day]
+            deltas = rebalance(positions[rows], prices, np.nan_to_num(targets[rows, index]), cash[rows],
+                               min_trade_value=min_trade_value, value=value)
+            deltas, charged = _charge_costs(deltas, prices, cash[rows], cost_rate, fixed_cost)
+            positions[rows] += deltas
+            cash[rows] += trade_cash(deltas, prices) - charged
+            traded[rows, day] = (np.abs(deltas) * np.where(deltas != 0, prices, 0.0)).sum(axis=1)
+            costs[rows, day] = charged
+
+        stretch = slice(day, bounds[index + 1])
+        equity[:, stretch] = cash[:, None] + positions @ valuation[stretch].T
+
+    return {"equity": equity, "traded": traded, "costs": costs, "positions": positions, "cash": cash}
+
+def first_decisions(targets: np.ndarray) -> np.ndarray:
+    """Targets with only each portfolio's first decision kept: buy and hold."""
+    targets = np.asarray(targets, dtype=float)
+    decides = ~np.all(np.isnan(targets), axis=2)
+    first = np.argmax(decides, axis=1)
+    held = np.full_like(targets, np.nan)
+    rows = np.nonzero(decides.any(axis=1))[0]
+    held[rows, first[rows]] = targets[rows, first[rows]]
+    return held
+
+def summarize(result: Dict[str, np.ndarray], initial: np.ndarray) -> Dict[str, np.ndarray]:
+    """Performance figures per portfolio from a ``backtest`` result.
+
+    Returns are from the starting cash; volatility, Sharpe ratio (no
+    risk-free rate) and turnover (value traded over mean equity) are
+    annualized over TRADING_DAYS.
+    """
+    equity = result["equity"]
+    initial = np.asarray(initial, dtype=float)
+    years = max(equity.shape[1] - 1, 1) / TRADING_DAYS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(equity, axis=1) / equity[:, :-1]
+        growth = equity[:, -1] / initial
+        volatility = np.zeros(len(equity))
+        if returns.shape[1] > 1:
+            volatility = returns.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+        return {
+            "total_return": growth - 1,
+            "cagr": np.maximum(growth, 0.0) ** (1 / years) - 1,
+            "volatility": volatility,
+            "sharpe": returns.mean(axis=1) * TRADING_DAYS / volatility,
+            "max_drawdown": max_drawdown(equity),
+            "turnover": result["traded"].sum(axis=1) / equity.mean(axis=1) / years,
+            "costs": result["costs"].sum(axis=1),
+            "rebalance_days": (result["traded"] > 0).sum(axis=1),
+            "final_value": equity[:, -1],
+        }
@@ -0,0 +1,177 @@
+"""Memory-mapped columnar store of daily OHLCV bars.
+
+Each ticker owns a directory holding one raw little-endian binary file per
+column (``date``, ``open``, ``high``, ``low``, ``close``, ``volume``). Reads
+map the files with ``np.memmap`` so slicing a ticker's history copies nothing;
+appends write to the end of every column under an exclusive file lock so
+several workers can share one store. Bars are stored split-adjusted as of
+when they were ingested; a ticker that splits later has its history
+rewritten with ``replace``.
+"""
+import fcntl
+import os
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+COLUMNS = {
+    "date": np.dtype("<M8[D]"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+
+# Market-wide record of the days ingested through the grouped-daily endpoint
+_INGESTED_DAYS = "_ingested_days.bin"
+# The subset of those days that had bars, i.e. were not exchange holidays
+_SESSIONS = "_sessions.bin"
+
+class BarStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def _ticker_dir(self, ticker: str) -> str:
+        return os.path.join(self.root, ticker.upper())
+
+    @contextmanager
+    def _locked(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _map(path: str, dtype: np.dtype, length: Optional[int] = None) -> np.ndarray:
+        """Map a column file read-only; missing or empty files map to an empty array."""
+        size = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        length = size if length is None else min(length, size)
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(length,))
+
+    def _length(self, directory: str) -> int:
+        """Rows present in every column (guards against a torn append)."""
+        sizes = []
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(directory, f"{name}.bin")
+            sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def read(self, ticker: str) -> Dict[str, np.ndarray]:
+        """Return every column of a ticker as read-only memory maps."""
+        directory = self._ticker_dir(ticker)
+        length = self._length(directory)
+        return {
+            name: self._map(os.path.join(directory, f"{name}.bin"), dtype, length)
+            for name, dtype in COLUMNS.items()
+        }
+
+    def closes(self, ticker: str, days: int) -> np.ndarray:
+        """Zero-copy view of a ticker's last ``days`` closes."""
+        return self.read(ticker)["close"][-days:]
+
+    def first_date(self, ticker: str) -> Optional[date]:
+        dates = self.read(ticker)["date"]
+        return dates[0].astype(date) if dates.size else None
+
+    def last_date(self, ticker: str) -> Optional[date]:
+        dates = self.read(ticker)["date"]
+        return dates[-1].astype(date) if dates.size else None
+
+    def append(self, ticker: str, bars: Dict[str, Iterable]) -> int:
+        """Append bars newer than the last stored date.
+
+        Args:
+            ticker: Ticker symbol
+            bars: Column name to values, one entry per bar, dates ascending
+
+        Returns:
+            int: Number of rows appended
+        """
+        columns = {name: np.asarray(bars[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+        directory = self._ticker_dir(ticker)
+
+        with self._locked(directory):
+            length = self._length(directory)
+            dates = self._map(os.path.join(directory, "date.bin"), COLUMNS["date"], length)
+            keep = columns["date"] > dates[-1] if length else np.ones(columns["date"].shape, dtype=bool)
+            if not keep.any():
+                return 0
+
+            for name, values in columns.items():
+                path = os.path.join(directory, f"{name}.bin")
+                with open(path, "r+b" if os.path.exists(path) else "wb") as column:
+                    # Truncate any partial tail before appending
+                    column.truncate(length * COLUMNS[name].itemsize)
+                    column.seek(0, os.SEEK_END)
+                    column.write(values[keep].tobytes())
+
+        return int(keep.sum())
+
+    def replace(self, ticker: str, bars: Dict[str, Iterable]) -> int:
+        """Rewrite a ticker's whole history (e.g. re-adjusted after a split).
+
+        Each column is written to a temporary file and renamed into place, so
+        readers see either the old history or the new one; maps opened before
+        the rename keep the old one.
+
+        Returns:
+            int: Number of rows stored
+        """
+        columns = {name: np.asarray(bars[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+        directory = self._ticker_dir(ticker)
+
+        with self._locked(directory):
+            for name, values in columns.items():
+                path = os.path.join(directory, f"{name}.bin")
+                with open(f"{path}.tmp", "wb") as column:
+                    column.write(values.tobytes())
+                os.replace(f"{path}.tmp", path)
+
+        return int(columns["date"].size)
+
+    def ingested_through(self) -> Optional[date]:
+        """Latest day ingested market-wide, or None if nothing was ingested."""
+        days = self._map(os.path.join(self.root, _INGESTED_DAYS), COLUMNS["date"])
+        return days[-1].astype(date) if days.size else None
+
+    def last_session(self) -> Optional[date]:
+        """Latest ingested day that had bars, or None if none was recorded."""
+        days = self._map(os.path.join(self.root, _SESSIONS), COLUMNS["date"])
+        return days[-1].astype(date) if days.size else None
+
+    def append_day(self, day: date, bars_by_ticker: Dict[str, Dict[str, float]]) -> int:
+        """Append one market-wide day of bars (e.g. from Polygon's grouped-daily endpoint).
+
+        Days with no bars (exchange holidays) are still recorded so that the
+        store is known to be current through ``day``; only days with bars
+        count as sessions.
+
+        Returns:
+            int: Number of tickers that received a new bar
+        """
+        appended = 0
+        stamp = np.datetime64(day, "D")
+        for ticker, bar in bars_by_ticker.items():
+            row = {name: [bar[name]] for name in COLUMNS if name != "date"}
+            row["date"] = [stamp]
+            appended += self.append(ticker, row)
+
+        with self._locked(self.root):
+            last = self.ingested_through()
+            if last is None or day > last:
+                with open(os.path.join(self.root, _INGESTED_DAYS), "ab") as days:
+                    days.write(np.asarray([stamp], dtype=COLUMNS["date"]).tobytes())
+            session = self.last_session()
+            if bars_by_ticker and (session is None or day > session):
+                with open(os.path.join(self.root, _SESSIONS), "ab") as sessions:
+                    sessions.write(np.asarray([stamp], dtype=COLUMNS["date"]).tobytes())
+
+        return appended
@@ -0,0 +1,150 @@
+"""SQLite-backed cache shared by every worker process on the host.
+
+Entries carry two deadlines: ``fresh_until`` and ``stale_until``. Between the
+two an entry is served immediately while a single worker (the one that wins
+the refresh lease) refetches it in a background thread.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    fresh_until REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    refreshing_until REAL NOT NULL DEFAULT 0
+)
+"""
+
+class SharedCache:
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        stale_seconds: float = 86400,
+        refresh_lease_seconds: float = 30,
+        name: Optional[str] = None
+    ):
+        self.name = name
+        self.path = path
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self.refresh_lease_seconds = refresh_lease_seconds
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection, opened lazily so forked workers never share one."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self.lookup(key, time.time())
+        if entry is None:
+            return None
+        value, is_fresh = entry
+        return value if is_fresh or allow_stale else None
+
+    def lookup(self, key: str, now: Optional[float] = None) -> Optional[Tuple[Any, bool]]:
+        """Return ``(value, is_fresh)`` for a live entry, or None if missing or expired."""
+        now = time.time() if now is None else now
+        row = self._connection().execute(
+            "SELECT value, fresh_until, stale_until FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[2] <= now:
+            self._count("miss")
+            return None
+
+        self._connection().execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        is_fresh = row[1] > now
+        self._count("hit" if is_fresh else "stale")
+        return json.loads(row[0]), is_fresh
+
+    def last(self, key: str) -> Optional[Any]:
+        """Return whatever is stored for ``key``, even past its stale deadline, until it is evicted."""
+        row = self._connection().execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _count(self, result: str) -> None:
+        if self.name:
+            metrics.CACHE_REQUESTS.inc(cache=self.name, result=result)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a JSON-serializable value that stays fresh for ``ttl`` seconds."""
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO entries "
+            "(key, value, fresh_until, stale_until, accessed_at, refreshing_until) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            (key, json.dumps(value), now + ttl, now + ttl + self.stale_seconds, now)
+        )
+        self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Drop expired entries, then least-recently-used ones above ``max_entries``."""
+        connection.execute("DELETE FROM entries WHERE stale_until <= ?", (time.time(),))
+        connection.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def claim_refresh(self, key: str, now: Optional[float] = None) -> bool:
+        """Take the refresh lease for ``key``; only one worker on the host wins."""
+        now = time.time() if now is None else now
+        cursor = self._connection().execute(
+            "UPDATE entries SET refreshing_until = ? WHERE key = ? AND refreshing_until < ?",
+            (now + self.refresh_lease_seconds, key, now)
+        )
+        return cursor.rowcount == 1
+
+    def _refresh(self, key: str, fetch: Callable[[], Any], ttl: Callable[[], float]) -> None:
+        try:
+            self.set(key, fetch(), ttl())
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {str(e)}")
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any], ttl: Callable[[], float]) -> Any:
+        """Return the cached value for ``key``, fetching it on a miss.
+
+        Stale entries are returned right away; if this worker wins the refresh
+        lease it refetches the value on a background thread.
+
+        Args:
+            key: Cache key
+            fetch: Callable producing a fresh, JSON-serializable value
+            ttl: Callable returning the freshness lifetime in seconds
+        """
+        now = time.time()
+        entry = self.lookup(key, now)
+        if entry is not None:
+            value, is_fresh = entry
+            if not is_fresh and self.claim_refresh(key, now):
+                threading.Thread(target=self._refresh, args=(key, fetch, ttl), daemon=True).start()
+            return value
+
+        value = fetch()
+        self.set(key, value, ttl())
+        return value
@@ -0,0 +1,207 @@
+"""Circuit breakers per upstream (``polygon``, ``throttle``, ``openai:<model>``).
+
+A breaker opens after ``failure_threshold`` consecutive failed calls:
+timeouts, connection errors, 5xx and 429 responses. While it is open,
+calls fail fast with ``CircuitOpenError``. After ``reset_seconds`` it goes
+half-open and lets ``half_open_calls`` trial calls through: one success
+closes it, and a failure opens it again.
+
+Callers that can answer from old data catch ``CircuitOpenError``, serve
+their last cached value and ``mark_stale`` the request, which then carries
+an ``X-Stale-Data`` header naming the upstreams it fell back for.
+"""
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Set
+
+from app.utils import deadlines, metrics
+from app.utils.rate_limiter import RateLimitTimeout
+
+STALE_HEADER = "X-Stale-Data"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_lock = threading.Lock()
+_breakers: Dict[str, "CircuitBreaker"] = {}
+_settings: Dict[str, Any] = {"failure_threshold": 5, "reset_seconds": 30.0, "half_open_calls": 1}
+
+_stale: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("stale", default=None)
+
+class CircuitOpenError(Exception):
+    """An upstream's breaker is open, so the call was not attempted."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"{name} is unavailable (circuit open); retry after {self.retry_after}s")
+
+_NOT_JUDGED = (RateLimitTimeout, deadlines.DeadlineExceeded, asyncio.CancelledError, GeneratorExit)
+
+def _outcome(error: BaseException) -> str:
+    """Whether an exception says the upstream is unhealthy ("failure"), healthy ("success") or neither."""
+    if isinstance(error, _NOT_JUDGED) or deadlines.expired():
+        # Our own queueing, deadline or cancellation (including a consumer closing a
+        # stream early); the upstream was never judged
+        return "ignored"
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None and status < 500 and status != 429:
+        return "success"
+    return "failure"
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float, half_open_calls: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._opened_wall: Optional[float] = None
+        self._probes = 0
+        self._stats = Counter()
+
+    def _transition(self, state: str, now: float) -> None:
+        self._state = state
+        if state == OPEN:
+            self._opened_at, self._opened_wall = now, time.time()
+        if state == CLOSED:
+            self._failures = 0
+        metrics.BREAKER_TRANSITIONS.inc(breaker=self.name, state=state)
+
+    def _current(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.reset_seconds:
+            self._transition(HALF_OPEN, now)
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current(time.monotonic())
+
+    def _admit(self) -> bool:
+        """Let a call through or raise CircuitOpenError; returns True for a half-open trial."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current(now)
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                self._stats["probes"] += 1
+                return True
+            self._stats["rejected"] += 1
+            retry_after = self._opened_at + self.reset_seconds - now if state == OPEN else 1
+            raise CircuitOpenError(self.name, retry_after)
+
+    def _record(self, probe: bool, outcome: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if probe:
+                self._probes -= 1
+            self._stats[outcome] += 1
+            if outcome == "success":
+                if self._state == HALF_OPEN:
+                    self._transition(CLOSED, now)
+                self._failures = 0
+            elif outcome == "failure":
+                self._failures += 1
+                if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                    self._transition(OPEN, now)
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Run one upstream call under the breaker.
+
+        Raises:
+            CircuitOpenError: Before the call, if the breaker is open
+        """
+        probe = self._admit()
+        try:
+            yield
+        except BaseException as e:
+            self._record(probe, _outcome(e))
+            raise
+        self._record(probe, "success")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current(now)
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "opened_at": datetime.fromtimestamp(self._opened_wall, timezone.utc).isoformat()
+                if self._opened_wall else None,
+                "retry_after": round(max(0.0, self._opened_at + self.reset_seconds - now), 1)
+                if state == OPEN else 0,
+                **self._stats
+            }
+
+def configure(**settings: Any) -> None:
+    """Override the breaker settings; breakers are rebuilt on next use."""
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown circuit breaker settings: {', '.join(sorted(unknown))}")
+    with _lock:
+        _settings.update(settings)
+        _breakers.clear()
+
+def breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker for upstream ``name``."""
+    entry = _breakers.get(name)
+    if entry is None:
+        with _lock:
+            entry = _breakers.get(name)
+            if entry is None:
+                entry = _breakers[name] = CircuitBreaker(name, **_settings)
+    return entry
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """State and call outcomes of every breaker in use."""
+    return {name: entry.stats() for name, entry in list(_breakers.items())}
+
+def mark_stale(name: str) -> None:
+    """Record that the current request was answered with old ``name`` data."""
+    sources = _stale.get()
+    if sources is not None:
+        sources.add(name)
+
+def _add_stale_header(response):
+    sources = _stale.get()
+    if sources:
+        response.headers[STALE_HEADER] = ", ".join(sorted(sources))
+    return response
+
+def init_app(app) -> None:
+    """Configure the breakers and flag stale answers on the Flask app's responses."""
+    configure(
+        failure_threshold=app.config['CIRCUIT_BREAKER_FAILURE_THRESHOLD'],
+        reset_seconds=app.config['CIRCUIT_BREAKER_RESET_SECONDS'],
+        half_open_calls=app.config['CIRCUIT_BREAKER_HALF_OPEN_CALLS'],
+    )
+
+    @app.before_request
+    def track_stale():
+        _stale.set(set())
+
+    app.after_request(_add_stale_header)
+
+def init_async_app(app) -> None:
+    """Flag stale answers on the Quart app's responses (coroutine hooks, see ``metrics.init_async_app``)."""
+    @app.before_request
+    async def track_stale():
+        _stale.set(set())
+
+    @app.after_request
+    async def add_stale_header(response):
+        return _add_stale_header(response)
@@ -0,0 +1,87 @@
+"""Per-request deadlines inherited by every upstream call.
+
+Each request gets a deadline when it starts: ``REQUEST_DEADLINE_SECONDS``,
+or less if the caller sends a shorter ``X-Request-Timeout``. The HTTP
+clients, the OpenAI calls and the rate limiter queues cap their timeouts
+at the time left, so one hung upstream cannot hold a worker past the
+request's deadline. Work outside a request (CLI, scheduler) has no
+deadline and keeps the default timeouts.
+"""
+import contextvars
+import math
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+TIMEOUT_HEADER = "X-Request-Timeout"
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """The current request ran out of time before an upstream call finished."""
+
+def start(seconds: Optional[float]) -> None:
+    """Give the current request ``seconds`` to finish; None or <= 0 means no deadline."""
+    _deadline.set(time.monotonic() + seconds if seconds and seconds > 0 else None)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+def check() -> None:
+    """Raise DeadlineExceeded if the current request is out of time."""
+    if expired():
+        raise DeadlineExceeded("Request deadline exceeded")
+
+def timeout(default: float) -> float:
+    """``default`` capped at the time left; raises DeadlineExceeded if none is."""
+    check()
+    left = remaining()
+    return default if left is None else min(default, left)
+
+@contextmanager
+def enforce() -> Iterator[None]:
+    """Report an upstream timeout caused by the request deadline as DeadlineExceeded."""
+    try:
+        yield
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        if expired():
+            raise DeadlineExceeded("Request deadline exceeded") from e
+        raise
+
+def _request_seconds(config, headers) -> Optional[float]:
+    """REQUEST_DEADLINE_SECONDS, shortened by a positive, finite X-Request-Timeout.
+
+    Other header values are ignored, so a caller can never lift the server's bound.
+    """
+    seconds = config['REQUEST_DEADLINE_SECONDS']
+    try:
+        requested = float(headers.get(TIMEOUT_HEADER, ""))
+    except ValueError:
+        return seconds
+    if not math.isfinite(requested) or requested <= 0:
+        return seconds
+    return min(seconds, requested) if seconds > 0 else requested
+
+def init_app(app) -> None:
+    """Start a deadline for every request of the Flask app."""
+    from flask import request
+
+    @app.before_request
+    def start_deadline():
+        start(_request_seconds(app.config, request.headers))
+
+def init_async_app(app) -> None:
+    """``init_app`` for the Quart app (coroutine hooks, see ``metrics.init_async_app``)."""
+    from quart import request
+
+    @app.before_request
+    async def start_deadline():
+        start(_request_seconds(app.config, request.headers))
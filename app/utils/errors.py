@@ -0,0 +1,66 @@
+"""JSON error responses shared by the Flask and Quart routes.
+
+Views raise and this module maps the exception to a status code:
+ValueError is a bad request, reused or in-flight Idempotency-Keys are 422
+and 409, a throttled or tripped upstream is 503 and an exhausted request
+deadline is 504. Anything else is logged and answered with a 500. HTTP
+errors Flask or Quart raise themselves (404, 405, ...) keep their response.
+"""
+from http import HTTPStatus
+from logging import getLogger
+from typing import Any, Dict, Tuple
+
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.deadlines import DeadlineExceeded
+from app.utils.rate_limiter import RateLimitTimeout
+from app.utils.recommendation_store import IdempotencyConflict, IdempotencyInFlight
+
+logger = getLogger(__name__)
+
+def error_response(error: Exception, endpoint: str) -> Tuple[Dict[str, Any], int, Dict[str, str]]:
+    """Map an exception raised by ``endpoint`` to a JSON body, status and headers."""
+    if isinstance(error, ValueError):
+        logger.warning(f"Invalid request: {str(error)}")
+        return {"error": str(error)}, HTTPStatus.BAD_REQUEST, {}
+    if isinstance(error, IdempotencyConflict):
+        logger.warning(f"Idempotency key reused: {str(error)}")
+        return {"error": str(error)}, HTTPStatus.UNPROCESSABLE_ENTITY, {}
+    if isinstance(error, IdempotencyInFlight):
+        logger.warning(f"Idempotent request in flight: {str(error)}")
+        return {"error": str(error)}, HTTPStatus.CONFLICT, {"Retry-After": str(error.retry_after)}
+    if isinstance(error, (RateLimitTimeout, CircuitOpenError)):
+        logger.warning(f"Upstream unavailable: {str(error)}")
+        return {"error": str(error)}, HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": str(error.retry_after)}
+    if isinstance(error, DeadlineExceeded):
+        logger.warning(f"Deadline exceeded: {str(error)}")
+        return {"error": str(error)}, HTTPStatus.GATEWAY_TIMEOUT, {}
+
+    logger.error(f"Error in {endpoint}: {str(error)}", exc_info=error)
+    return {"error": "Internal server error", "details": str(error)}, HTTPStatus.INTERNAL_SERVER_ERROR, {}
+
+def _endpoint_name(endpoint: Any) -> str:
+    return (endpoint or "unknown").rsplit(".", 1)[-1]
+
+def init_app(app) -> None:
+    """Answer every exception a Flask view raises with ``error_response``."""
+    from flask import jsonify, request
+    from werkzeug.exceptions import HTTPException
+
+    @app.errorhandler(Exception)
+    def handle_error(error: Exception):
+        if isinstance(error, HTTPException):
+            return error
+        body, status, headers = error_response(error, _endpoint_name(request.endpoint))
+        return jsonify(body), status, headers
+
+def init_async_app(app) -> None:
+    """``init_app`` for the Quart app (coroutine handler, see ``metrics.init_async_app``)."""
+    from quart import jsonify, request
+    from werkzeug.exceptions import HTTPException
+
+    @app.errorhandler(Exception)
+    async def handle_error(error: Exception):
+        if isinstance(error, HTTPException):
+            return error
+        body, status, headers = error_response(error, _endpoint_name(request.endpoint))
+        return jsonify(body), status, headers
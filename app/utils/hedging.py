@@ -0,0 +1,125 @@
+"""Hedged and fallback calls: race staggered attempts, first success wins.
+
+An attempt starts at its scheduled delay, or as soon as every attempt
+already running has failed. The first attempt to succeed supplies the
+result. Attempts that lose keep running to completion on the sync path
+(an HTTP call cannot be interrupted) and are cancelled on the async path.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.utils import metrics
+
+# Attempt name, seconds after the start it launches at, and the call itself
+Attempt = Tuple[str, float, Callable[[], Any]]
+AsyncAttempt = Tuple[str, float, Callable[[], Awaitable[Any]]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+class LatencyTracker:
+    """Rolling window of recent call latencies per key."""
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, key: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """``percentile`` of the latencies seen for ``key``, or None with fewer than ``min_samples``."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+    return _executor
+
+def race(attempts: List[Attempt], on_result: Optional[Callable[[str, str], None]] = None) -> Any:
+    """Run ``attempts`` staggered on worker threads and return the first success.
+
+    Args:
+        attempts: (name, start delay, call) in launch order
+        on_result: Called with (attempt name, "won" / "lost" / "error") as attempts settle
+
+    Raises:
+        Exception: The first attempt's error, once every attempt has failed
+    """
+    if len(attempts) == 1:
+        return attempts[0][2]()
+
+    report = on_result or (lambda name, outcome: None)
+    executor = _get_executor()
+    started = time.monotonic()
+    pending = list(attempts)
+    running: Dict[Future, str] = {}
+    errors: List[BaseException] = []
+
+    while pending or running:
+        while pending and (not running or time.monotonic() - started >= pending[0][1]):
+            name, _, call = pending.pop(0)
+            running[executor.submit(metrics.bind_context(call))] = name
+
+        timeout = max(0.0, pending[0][1] - (time.monotonic() - started)) if pending else None
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            if future.exception() is None:
+                report(name, "won")
+                for loser in running.values():
+                    report(loser, "lost")
+                return future.result()
+            report(name, "error")
+            errors.append(future.exception())
+
+    raise errors[0]
+
+async def race_async(attempts: List[AsyncAttempt], on_result: Optional[Callable[[str, str], None]] = None) -> Any:
+    """``race`` on the running event loop; losing attempts are cancelled."""
+    if len(attempts) == 1:
+        return await attempts[0][2]()
+
+    report = on_result or (lambda name, outcome: None)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    pending = list(attempts)
+    running: Dict[asyncio.Task, str] = {}
+    errors: List[BaseException] = []
+
+    try:
+        while pending or running:
+            while pending and (not running or loop.time() - started >= pending[0][1]):
+                name, _, call = pending.pop(0)
+                running[asyncio.ensure_future(call())] = name
+
+            timeout = max(0.0, pending[0][1] - (loop.time() - started)) if pending else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                if task.exception() is None:
+                    report(name, "won")
+                    for loser in running.values():
+                        report(loser, "lost")
+                    return task.result()
+                report(name, "error")
+                errors.append(task.exception())
+    finally:
+        for task in running:
+            task.cancel()
+
+    raise errors[0]
@@ -0,0 +1,100 @@
+"""Process-wide pooled HTTP client for every outbound call.
+
+A single ``requests.Session`` per process keeps connections alive in
+per-host pools, applies default connect/read timeouts and retries
+idempotent requests with exponential backoff. The session is rebuilt after
+a fork so gunicorn workers never share sockets with the master.
+"""
+import os
+import threading
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.utils import deadlines
+
+_settings = {
+    "connect_timeout": 3.05,
+    "read_timeout": 30.0,
+    "retries": 3,
+    "backoff_factor": 0.3,
+    "pool_connections": 10,
+    "pool_maxsize": 20,
+}
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+
+def configure(**settings: Any) -> None:
+    """Override client settings; the session is rebuilt on next use."""
+    global _session
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown HTTP client settings: {', '.join(sorted(unknown))}")
+
+    with _lock:
+        _settings.update(settings)
+        _session = None
+
+def init_app(app) -> None:
+    """Configure the client from the Flask app config."""
+    configure(
+        connect_timeout=app.config['HTTP_CONNECT_TIMEOUT'],
+        read_timeout=app.config['HTTP_READ_TIMEOUT'],
+        retries=app.config['HTTP_RETRIES'],
+        backoff_factor=app.config['HTTP_BACKOFF_FACTOR'],
+        pool_connections=app.config['HTTP_POOL_CONNECTIONS'],
+        pool_maxsize=app.config['HTTP_POOL_MAXSIZE'],
+    )
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=_settings["retries"],
+        backoff_factor=_settings["backoff_factor"],
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=_settings["pool_connections"],
+        pool_maxsize=_settings["pool_maxsize"],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_session() -> requests.Session:
+    """Return this process's shared session."""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _build_session()
+                _session_pid = os.getpid()
+    return _session
+
+def request(method: str, url: str, **kwargs: Any) -> requests.Response:
+    """Send a request through the shared session with the default timeouts.
+
+    The timeouts are capped at the time left before the request deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline passes before or during the call
+    """
+    kwargs.setdefault("timeout", (
+        deadlines.timeout(_settings["connect_timeout"]), deadlines.timeout(_settings["read_timeout"])
+    ))
+    with deadlines.enforce():
+        return get_session().request(method, url, **kwargs)
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return request("POST", url, **kwargs)
@@ -0,0 +1,177 @@
+"""Vectorized technical indicators.
+
+Every function takes a ``(tickers x days)`` matrix of floats (a 1-D series is
+treated as a single row) and returns a matrix of the same shape, so many
+symbols are computed at once. Missing history is represented by NaN on the
+left of a row; windows that do not contain ``window`` observed values are NaN
+in the output.
+"""
+import numpy as np
+from typing import Dict, Iterable, List
+
+INDICATORS = ("sma", "ema", "rsi", "slope")
+
+def _as_matrix(values) -> np.ndarray:
+    matrix = np.asarray(values, dtype=float)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return matrix
+
+def _window_sums(cumulative: np.ndarray, window: int) -> np.ndarray:
+    """Sum of the trailing ``window`` columns from a zero-prefixed cumulative sum."""
+    sums = np.full((cumulative.shape[0], cumulative.shape[1] - 1), np.nan)
+    if window <= sums.shape[1]:
+        sums[:, window - 1:] = cumulative[:, window:] - cumulative[:, :-window]
+    return sums
+
+def _prefixed_cumsum(values: np.ndarray) -> np.ndarray:
+    zeros = np.zeros((values.shape[0], 1))
+    return np.concatenate([zeros, np.cumsum(values, axis=1)], axis=1)
+
+class _Prefix:
+    """Cumulative sums shared by every window computed over the same matrix."""
+
+    def __init__(self, closes: np.ndarray):
+        observed = ~np.isnan(closes)
+        filled = np.where(observed, closes, 0.0)
+        positions = np.arange(closes.shape[1], dtype=float)
+        self.counts = _prefixed_cumsum(observed.astype(float))
+        self.values = _prefixed_cumsum(filled)
+        self.weighted = _prefixed_cumsum(filled * positions)
+        self.positions = positions
+
+    def complete(self, window: int) -> np.ndarray:
+        return _window_sums(self.counts, window) == window
+
+def sma(closes, window: int) -> np.ndarray:
+    """Simple moving average in O(n) using cumulative sums."""
+    return _sma(_Prefix(_as_matrix(closes)), window)
+
+def _sma(prefix: _Prefix, window: int) -> np.ndarray:
+    averages = _window_sums(prefix.values, window) / window
+    return np.where(prefix.complete(window), averages, np.nan)
+
+def rolling_slope(closes, window: int) -> np.ndarray:
+    """Closed-form least-squares slope of the trailing ``window`` points."""
+    return _rolling_slope(_Prefix(_as_matrix(closes)), window)
+
+def _rolling_slope(prefix: _Prefix, window: int) -> np.ndarray:
+    if window < 2:
+        return np.full(prefix.values[:, 1:].shape, np.nan)
+
+    sum_y = _window_sums(prefix.values, window)
+    # Re-base the absolute column index to 0..window-1 inside each window
+    start = prefix.positions - (window - 1)
+    sum_xy = _window_sums(prefix.weighted, window) - start * sum_y
+
+    sum_x = window * (window - 1) / 2
+    sum_xx = (window - 1) * window * (2 * window - 1) / 6
+    slopes = (window * sum_xy - sum_x * sum_y) / (window * sum_xx - sum_x ** 2)
+    return np.where(prefix.complete(window), slopes, np.nan)
+
+def _smooth(values: np.ndarray, alpha: float, seed: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """Exponential smoothing, vectorized across rows and seeded per row."""
+    smoothed = np.full(values.shape, np.nan)
+    current = np.full(values.shape[0], np.nan)
+    for column in range(values.shape[1]):
+        seeding = start == column
+        current = np.where(seeding, seed, current)
+        update = start < column
+        current = np.where(update, alpha * values[:, column] + (1 - alpha) * current, current)
+        smoothed[:, column] = current
+    return smoothed
+
+def _first_complete(prefix: _Prefix, window: int) -> np.ndarray:
+    """Column at which each row first has ``window`` observations (or -1)."""
+    complete = prefix.complete(window)
+    first = complete.argmax(axis=1)
+    return np.where(complete.any(axis=1), first, -1)
+
+def ema(closes, window: int) -> np.ndarray:
+    """Exponential moving average seeded with the first full-window SMA."""
+    return _ema(_Prefix(_as_matrix(closes)), _as_matrix(closes), window)
+
+def _ema(prefix: _Prefix, closes: np.ndarray, window: int) -> np.ndarray:
+    start = _first_complete(prefix, window)
+    seeds = _sma(prefix, window)[np.arange(closes.shape[0]), np.maximum(start, 0)]
+    return _smooth(closes, 2 / (window + 1), seeds, start)
+
+def rsi(closes, window: int = 14) -> np.ndarray:
+    """Relative strength index with Wilder smoothing."""
+    closes = _as_matrix(closes)
+    changes = np.full(closes.shape, np.nan)
+    changes[:, 1:] = np.diff(closes, axis=1)
+    gains = np.where(changes > 0, changes, 0.0)
+    losses = np.where(changes < 0, -changes, 0.0)
+    gains[np.isnan(changes)] = np.nan
+    losses[np.isnan(changes)] = np.nan
+
+    gain_prefix = _Prefix(gains)
+    start = _first_complete(gain_prefix, window)
+    rows = np.arange(closes.shape[0])
+    column = np.maximum(start, 0)
+    average_gain = _smooth(gains, 1 / window, _sma(gain_prefix, window)[rows, column], start)
+    average_loss = _smooth(losses, 1 / window, _sma(_Prefix(losses), window)[rows, column], start)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative_strength = average_gain / average_loss
+        values = 100 - 100 / (1 + relative_strength)
+    return np.where((average_loss == 0) & ~np.isnan(average_gain), 100.0, values)
+
+def linear_slope(values) -> np.ndarray:
+    """Least-squares slope of every row, ignoring NaN points."""
+    values = _as_matrix(values)
+    mask = ~np.isnan(values)
+    x = np.where(mask, np.arange(values.shape[1]), 0.0)
+    y = np.where(mask, values, 0.0)
+    n = mask.sum(axis=1)
+
+    sum_x = x.sum(axis=1)
+    sum_y = y.sum(axis=1)
+    sum_xy = (x * y).sum(axis=1)
+    sum_xx = (x * x).sum(axis=1)
+
+    denominator = n * sum_xx - sum_x ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (n * sum_xy - sum_x * sum_y) / denominator
+    return np.where(denominator > 0, slopes, 0.0)
+
+def compute(closes, windows: Iterable[int], indicators: Iterable[str] = ("sma",)) -> Dict[str, np.ndarray]:
+    """Compute several indicators for several windows in one pass.
+
+    The cumulative sums are built once and reused for every window.
+
+    Args:
+        closes: ``(tickers x days)`` matrix of closing prices
+        windows: Window lengths to compute
+        indicators: Names from ``INDICATORS``
+
+    Returns:
+        Dict[str, np.ndarray]: Matrices keyed by ``"<indicator>_<window>"``
+    """
+    closes = _as_matrix(closes)
+    prefix = _Prefix(closes)
+    results: Dict[str, np.ndarray] = {}
+
+    for window in windows:
+        for name in indicators:
+            if name == "sma":
+                results[f"sma_{window}"] = _sma(prefix, window)
+            elif name == "ema":
+                results[f"ema_{window}"] = _ema(prefix, closes, window)
+            elif name == "rsi":
+                results[f"rsi_{window}"] = rsi(closes, window)
+            elif name == "slope":
+                results[f"slope_{window}"] = _rolling_slope(prefix, window)
+            else:
+                raise ValueError(f"Unknown indicator: {name}")
+
+    return results
+
+def parse_indicators(raw: str) -> List[str]:
+    """Parse a comma-separated indicator list, validating every name."""
+    names = [name.strip().lower() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in names if name not in INDICATORS]
+    if unknown:
+        raise ValueError(f"Unknown indicators: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
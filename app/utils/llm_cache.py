@@ -0,0 +1,113 @@
+"""Content-addressed cache for LLM completions.
+
+Completions are keyed by a hash of (model, system prompt, normalized user
+prompt, temperature). A bounded in-memory LRU sits in front of an optional
+on-disk ``SharedCache`` tier that every worker on the host can read.
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, Mapping, Optional
+
+from flask import has_request_context, request
+
+from app.utils import metrics
+from app.utils.cache import SharedCache
+from app.utils.ttl_cache import TTLCache
+
+BYPASS_HEADER = "X-Cache-Bypass"
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace and case so trivially different prompts share a key."""
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+def cache_key(model: str, system_prompt: str, prompt: str, temperature: float) -> str:
+    payload = json.dumps([model, system_prompt.strip(), normalize_prompt(prompt), temperature])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def bypass_requested(headers: Optional[Mapping[str, str]] = None) -> bool:
+    """True when the request headers (default: the current request's) ask for a fresh completion."""
+    if headers is None:
+        if not has_request_context():
+            return False
+        headers = request.headers
+    value = headers.get(BYPASS_HEADER, "")
+    no_cache = "no-cache" in headers.get("Cache-Control", "")
+    return no_cache or value.lower() in ("1", "true", "yes")
+
+class LLMCache:
+    def __init__(self, maxsize: int = 512, disk: Optional[SharedCache] = None):
+        self._memory = TTLCache(maxsize=maxsize)
+        self._disk = disk
+        self._stats: Dict[str, Counter] = {}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, endpoint: str, outcome: str) -> None:
+        with self._stats_lock:
+            self._stats.setdefault(endpoint, Counter())[outcome] += 1
+        metrics.CACHE_REQUESTS.inc(cache="llm", result=outcome)
+
+    def get_or_create(
+        self,
+        endpoint: str,
+        key: str,
+        ttl: float,
+        create: Callable[[], str],
+        bypass: bool = False,
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """Return the cached completion for ``key`` or create and store it.
+
+        Args:
+            endpoint: Name used for per-endpoint TTLs and stats
+            key: Content hash from ``cache_key``
+            ttl: Lifetime in seconds; 0 disables caching for the endpoint
+            create: Callable that performs the completion
+            bypass: Skip the lookup (the fresh result is still stored)
+            validate: Stores the created completion only if this returns True,
+                so a malformed answer is not served for the whole TTL
+        """
+        value = self.lookup(endpoint, key, ttl, bypass)
+        if value is None:
+            value = create()
+            if ttl > 0 and validate is not None and not validate(value):
+                self._count(endpoint, "invalid")
+            else:
+                self.store(key, value, ttl)
+        return value
+
+    def lookup(self, endpoint: str, key: str, ttl: float, bypass: bool = False) -> Optional[str]:
+        """Return the cached completion for ``key``, or None on a miss."""
+        if ttl <= 0:
+            return None
+        if bypass:
+            self._count(endpoint, "bypass")
+            return None
+
+        value = self._memory.get(key)
+        if value is not None:
+            self._count(endpoint, "memory_hit")
+            return value
+        if self._disk is not None:
+            value = self._disk.get(f"llm:{key}")
+            if value is not None:
+                self._count(endpoint, "disk_hit")
+                self._memory.set(key, value, ttl)
+                return value
+        self._count(endpoint, "miss")
+        return None
+
+    def store(self, key: str, value: str, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._memory.set(key, value, ttl)
+        if self._disk is not None:
+            self._disk.set(f"llm:{key}", value, ttl)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counts per endpoint, plus the in-memory entry count."""
+        with self._stats_lock:
+            endpoints = {endpoint: dict(counts) for endpoint, counts in self._stats.items()}
+        return {"endpoints": endpoints, "memory_entries": len(self._memory)}
@@ -0,0 +1,39 @@
+from datetime import datetime, time, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_CLOSE = time(16, 0)
+
+def next_market_close(now: Optional[datetime] = None, delay_minutes: int = 0) -> datetime:
+    """Return the next weekday market close (plus ``delay_minutes``) after ``now``.
+
+    Exchange holidays are not modelled; on a holiday the close simply passes
+    without new data and the next one is used.
+    """
+    local_now = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    close = datetime.combine(local_now.date(), MARKET_CLOSE, tzinfo=MARKET_TIMEZONE)
+    close += timedelta(minutes=delay_minutes)
+
+    while close <= local_now or close.weekday() >= 5:
+        close = datetime.combine(close.date() + timedelta(days=1), MARKET_CLOSE, tzinfo=MARKET_TIMEZONE)
+        close += timedelta(minutes=delay_minutes)
+
+    return close
+
+def seconds_until_next_close(now: Optional[datetime] = None, delay_minutes: int = 0) -> float:
+    """Seconds from ``now`` until the next market close."""
+    now = now or datetime.now(MARKET_TIMEZONE)
+    return (next_market_close(now, delay_minutes) - now).total_seconds()
+
+def last_market_close(now: Optional[datetime] = None, delay_minutes: int = 0) -> datetime:
+    """Return the most recent weekday market close (plus ``delay_minutes``) at or before ``now``."""
+    local_now = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    close = datetime.combine(local_now.date(), MARKET_CLOSE, tzinfo=MARKET_TIMEZONE)
+    close += timedelta(minutes=delay_minutes)
+
+    while close > local_now or close.weekday() >= 5:
+        close = datetime.combine(close.date() - timedelta(days=1), MARKET_CLOSE, tzinfo=MARKET_TIMEZONE)
+        close += timedelta(minutes=delay_minutes)
+
+    return close
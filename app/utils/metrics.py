@@ -0,0 +1,253 @@
+"""Request tracing and Prometheus-format metrics.
+
+Each request gets a trace ID, taken from an ``X-Request-ID`` header of up to
+64 letters, digits, dots, dashes and underscores, or else generated. It goes into every log line and is echoed back in the response.
+Routes and services time their stages and upstream calls with ``stage`` and
+``upstream``. ``render`` serves everything in the Prometheus text exposition
+format.
+
+Metrics are kept per worker process.
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Client request IDs end up in log lines and response headers, so only plain tokens are kept
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry: Dict[str, "_Metric"] = {}
+
+class _Trace:
+    def __init__(self, trace_id: str, endpoint: str):
+        self.trace_id = trace_id
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+
+_trace: contextvars.ContextVar[Optional[_Trace]] = contextvars.ContextVar("trace", default=None)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+        _registry[name] = self
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        with self._lock:
+            samples = list(self._samples())
+        return "\n".join([f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *samples])
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._series.items():
+            yield f"{self.name}{_format_labels(list(zip(self.labels, key)))} {value}"
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        for key, (counts, total, count) in self._series.items():
+            pairs = list(zip(self.labels, key))
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{_format_labels(pairs + [('le', str(bound))])} {bucket_count}"
+            yield f"{self.name}_bucket{_format_labels(pairs + [('le', '+Inf')])} {count}"
+            yield f"{self.name}_sum{_format_labels(pairs)} {total}"
+            yield f"{self.name}_count{_format_labels(pairs)} {count}"
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("endpoint", "method", "status"))
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds", "Time spent in one stage of handling a request.", ("endpoint", "stage"))
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_duration_seconds", "Upstream call latency.",
+    ("upstream", "endpoint", "model", "ticker_class"))
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Failed upstream calls.",
+    ("upstream", "endpoint", "model", "ticker_class", "error"))
+TOKENS = Counter(
+    "openai_tokens_total", "OpenAI tokens used, by prompt or completion.",
+    ("endpoint", "operation", "model", "kind"))
+OPENAI_ATTEMPTS = Counter(
+    "openai_attempts_total", "OpenAI completion attempts (primary, hedge, fallback) by outcome.",
+    ("operation", "model", "attempt", "outcome"))
+BREAKER_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes, by the state entered.", ("breaker", "state"))
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by outcome.", ("cache", "result"))
+IDEMPOTENT_REQUESTS = Counter(
+    "idempotent_requests_total", "Requests with an Idempotency-Key, by whether they ran, replayed or waited.",
+    ("endpoint", "result"))
+QUEUE_WAIT_SECONDS = Histogram(
+    "rate_limit_wait_seconds", "Time upstream calls queued on a rate limiter.", ("limiter", "priority", "outcome"))
+
+def ticker_class(ticker: Optional[str]) -> str:
+    """Polygon.io market of a ticker, keeping per-ticker cardinality out of labels."""
+    if not ticker:
+        return ""
+    prefixes = {"I:": "index", "X:": "crypto", "C:": "fx", "O:": "option"}
+    return prefixes.get(ticker[:2], "stock")
+
+def current_endpoint() -> str:
+    trace = _trace.get()
+    return trace.endpoint if trace else "background"
+
+def current_trace_id() -> str:
+    trace = _trace.get()
+    return trace.trace_id if trace else "-"
+
+def bind_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap ``fn`` to run in a copy of the caller's context on a worker thread.
+
+    Keeps the trace, endpoint label and rate limit priority of the request
+    that submitted the work.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time one stage of the current request."""
+    with STAGE_SECONDS.time(endpoint=current_endpoint(), stage=name):
+        yield
+
+@contextmanager
+def upstream(name: str, model: str = "", ticker: Optional[str] = None) -> Iterator[None]:
+    """Time an upstream call and count it as an error if it raises."""
+    labels = {"upstream": name, "endpoint": current_endpoint(), "model": model, "ticker_class": ticker_class(ticker)}
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(error=type(e).__name__, **labels)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, **labels)
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in _registry.values()) + "\n"
+
+def start_request(endpoint: str, request_id: Optional[str] = None) -> str:
+    """Open a trace for the current request and return its ID (``request_id`` if it is well-formed)."""
+    trace_id = request_id if request_id and _REQUEST_ID.fullmatch(request_id) else uuid.uuid4().hex[:16]
+    _trace.set(_Trace(trace_id, endpoint))
+    return trace_id
+
+def finish_request(method: str, status: int) -> None:
+    trace = _trace.get()
+    if trace is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - trace.started,
+                                endpoint=trace.endpoint, method=method, status=status)
+
+def _install_log_trace_ids(level: str) -> None:
+    """Add ``trace_id`` to every log record and log with it if nothing else configured logging."""
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "adds_trace_id", False):
+        return
+
+    def record_factory(*args, **kwargs) -> logging.LogRecord:
+        record = factory(*args, **kwargs)
+        record.trace_id = current_trace_id()
+        return record
+
+    record_factory.adds_trace_id = True
+    logging.setLogRecordFactory(record_factory)
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=level, format=LOG_FORMAT)
+
+def init_app(app) -> None:
+    """Trace and time every request of the Flask app."""
+    from flask import request
+
+    _install_log_trace_ids(app.config['LOG_LEVEL'])
+
+    @app.before_request
+    def open_trace():
+        rule = request.url_rule.rule if request.url_rule else "unmatched"
+        start_request(rule, request.headers.get(REQUEST_ID_HEADER))
+
+    @app.after_request
+    def close_trace(response):
+        finish_request(request.method, response.status_code)
+        response.headers[REQUEST_ID_HEADER] = current_trace_id()
+        return response
+
+def init_async_app(app) -> None:
+    """``init_app`` for the Quart app.
+
+    The hooks are coroutines so they run in the request's own context;
+    Quart runs plain functions on a thread with a copied one.
+    """
+    from quart import request
+
+    _install_log_trace_ids(app.config['LOG_LEVEL'])
+
+    @app.before_request
+    async def open_trace():
+        rule = request.url_rule.rule if request.url_rule else "unmatched"
+        start_request(rule, request.headers.get(REQUEST_ID_HEADER))
+
+    @app.after_request
+    async def close_trace(response):
+        finish_request(request.method, response.status_code)
+        response.headers[REQUEST_ID_HEADER] = current_trace_id()
+        return response
@@ -0,0 +1,161 @@
+"""Compact, token-budgeted rendering of portfolio holdings for LLM prompts."""
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.utils.rate_limiter import estimate_tokens
+
+OTHER = "OTHER"
+
+@lru_cache(maxsize=None)
+def _encoding(model: Optional[str]):
+    """tiktoken encoding for ``model``, or None when tiktoken is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Encodings are downloaded on first use; fall back when offline
+        return None
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count ``text``'s tokens with tiktoken if installed, else estimate them."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text))
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value if isinstance(value, str) else json.dumps(value, separators=(",", ":"))
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    if abs(value) >= 1000:
+        return f"{value:.0f}"
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+def holdings_table(cash: float, totals: Dict[str, Dict[str, Any]], keep: Optional[int] = None) -> str:
+    """Render holdings as a pipe-separated table, largest position first.
+
+    Every field present in the holdings becomes a column, numbers are
+    rounded and a ``weight%`` column (share of holdings plus cash) is added.
+    Only the ``keep`` largest positions are listed; the rest are merged into
+    one ``OTHER(<count>)`` row carrying their combined value and weight.
+    """
+    total_value = cash + sum(holding.get('currentValue', 0) for holding in totals.values())
+    rows = sorted(totals.items(), key=lambda item: item[1].get('currentValue', 0), reverse=True)
+    columns = list(dict.fromkeys(key for _, holding in rows for key in holding))
+
+    def weight(value: float) -> str:
+        return _format_value(round(100 * value / total_value, 2) if total_value else 0)
+
+    lines = ["|".join(["ticker", *columns, "weight%"])]
+    listed, merged = (rows, []) if keep is None else (rows[:keep], rows[keep:])
+    for ticker, holding in listed:
+        lines.append("|".join(
+            [ticker, *(_format_value(holding.get(column)) for column in columns),
+             weight(holding.get('currentValue', 0))]
+        ))
+
+    if merged:
+        value = sum(holding.get('currentValue', 0) for _, holding in merged)
+        lines.append("|".join(
+            [f"{OTHER}({len(merged)})",
+             *(_format_value(value) if column == 'currentValue' else "" for column in columns),
+             weight(value)]
+        ))
+
+    return "\n".join(lines)
+
+def _percent(value: Optional[float]) -> str:
+    return "" if value is None else _format_value(round(100 * value, 1))
+
+def risk_summary(risk: Dict[str, Any], keep: int = 10, pairs: int = 3) -> str:
+    """Render ``PortfolioService.risk_profile`` figures as a few compact lines.
+
+    Lists the ``keep`` largest positions and the ``pairs`` most correlated
+    pairs of tickers.
+    """
+    figures = risk["portfolio"]
+    var = figures["valueAtRisk"]
+    lines = ["|".join([
+        f"portfolio vol%:{_percent(figures['volatility'])}",
+        f"beta:{_format_value(figures['beta'])}",
+        f"maxDrawdown%:{_percent(figures['maxDrawdown'])}",
+        f"VaR{_format_value(100 * var['confidence'])}(1d):{_format_value(var['historical'])}",
+        f"HHI:{_format_value(figures['hhi'])}",
+        f"cash%:{_percent(figures['cashWeight'])}"
+    ])]
+
+    positions = sorted(risk["positions"].items(), key=lambda item: item[1]["weight"] or 0, reverse=True)
+    if positions:
+        lines.append("ticker|weight%|vol%|beta|maxDrawdown%")
+        for ticker, position in positions[:keep]:
+            lines.append("|".join([
+                ticker, _percent(position["weight"]), _percent(position["volatility"]),
+                _format_value(position["beta"]), _percent(position["maxDrawdown"])
+            ]))
+
+    tickers, matrix = risk["correlation"]["tickers"], risk["correlation"]["matrix"]
+    correlated = sorted(
+        ((matrix[i][j], tickers[i], tickers[j])
+         for i in range(len(tickers)) for j in range(i + 1, len(tickers)) if matrix[i][j] is not None),
+        reverse=True
+    )[:pairs]
+    if correlated:
+        lines.append("most correlated: " + ", ".join(f"{a}/{b} {value:.2f}" for value, a, b in correlated))
+    if risk["unanalyzed"]:
+        lines.append("no price history: " + ", ".join(risk["unanalyzed"]))
+    return "\n".join(lines)
+
+def fit_holdings(
+    render: Callable[[str], str],
+    cash: float,
+    totals: Dict[str, Dict[str, Any]],
+    budget: int,
+    model: Optional[str] = None
+) -> Tuple[str, int, int]:
+    """Render a prompt around the holdings table within ``budget`` tokens.
+
+    Lists as many of the largest positions as fit and merges the rest into
+    the ``OTHER`` bucket. If even a fully merged table is over budget, that
+    prompt is returned anyway.
+
+    Args:
+        render: Builds the full prompt from a holdings table
+        cash: Available cash
+        totals: Holdings by ticker
+        budget: Maximum prompt tokens
+        model: Model whose tokenizer to count with
+
+    Returns:
+        Tuple[str, int, int]: Prompt, its token count, positions listed individually
+    """
+    def build(keep: Optional[int]) -> Tuple[str, int]:
+        prompt = render(holdings_table(cash, totals, keep))
+        return prompt, count_tokens(prompt, model)
+
+    prompt, tokens = build(None)
+    if tokens <= budget or not totals:
+        return prompt, tokens, len(totals)
+
+    # Largest number of listed positions that still fits
+    best: List[Any] = [*build(0), 0]
+    low, high = 1, len(totals) - 1
+    while low <= high:
+        keep = (low + high) // 2
+        candidate, candidate_tokens = build(keep)
+        if candidate_tokens <= budget:
+            best = [candidate, candidate_tokens, keep]
+            low = keep + 1
+        else:
+            high = keep - 1
+
+    return best[0], best[1], best[2]
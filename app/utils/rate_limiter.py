@@ -0,0 +1,232 @@
+"""Client-side token-bucket rate limiting for upstream APIs.
+
+Every upstream call acquires from a named limiter before it is sent. A
+limiter keeps one token bucket per budget (``requests``, and for OpenAI
+estimated ``tokens``) refilling at the provider's per-minute limit. Callers
+that cannot be served right away queue in priority order for at most the
+wait allowed for their priority class, instead of failing on a 429.
+
+Limits are enforced per worker process.
+"""
+import asyncio
+import bisect
+import contextvars
+import itertools
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+from app.utils import deadlines, metrics
+
+INTERACTIVE, NORMAL, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {"interactive": INTERACTIVE, "normal": NORMAL, "background": BACKGROUND}
+_PRIORITY_LABELS = {level: name for name, level in PRIORITY_NAMES.items()}
+
+# How often a queued caller rechecks while someone ahead of it is served
+_POLL_SECONDS = 0.05
+# Rough characters-per-token ratio for English prompts
+_CHARS_PER_TOKEN = 4
+
+_priority = contextvars.ContextVar("rate_limit_priority", default=NORMAL)
+
+_settings: Dict[str, Any] = {
+    "limits": {},
+    "max_wait": {INTERACTIVE: 20.0, NORMAL: 30.0, BACKGROUND: 600.0},
+}
+_limiters: Dict[str, "RateLimiter"] = {}
+_lock = threading.Lock()
+
+class RateLimitTimeout(Exception):
+    """Raised when a call could not be admitted within its allowed wait."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        # Whole seconds, ready for a Retry-After header
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Rate limit for {name} exceeded; retry in {self.retry_after}s")
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Run upstream calls made in this context at priority ``level``."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> int:
+    return _priority.get()
+
+def estimate_tokens(*texts: str, completion_tokens: int = 0) -> int:
+    """Rough token count for a request's prompt text plus its expected completion."""
+    return sum(len(text) for text in texts) // _CHARS_PER_TOKEN + completion_tokens
+
+class TokenBucket:
+    """Bucket holding up to one minute of budget, refilled continuously."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` is available; requests over capacity wait for a full bucket."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+class RateLimiter:
+    def __init__(self, name: str, limits: Mapping[str, float], max_wait: Mapping[int, float]):
+        self.name = name
+        self._buckets = {budget: TokenBucket(limit) for budget, limit in limits.items() if limit > 0}
+        self._max_wait = max_wait
+        self._cond = threading.Condition()
+        self._queue: list = []
+        self._sequence = itertools.count()
+        self._stats = Counter()
+
+    def _try_acquire(self, ticket: Tuple[int, int], cost: Mapping[str, float], now: float) -> float:
+        """Take ``cost`` if ``ticket`` is first in line and every bucket covers it.
+
+        Returns 0 on success, otherwise the seconds to wait before retrying.
+        """
+        if self._queue[0] != ticket:
+            return _POLL_SECONDS
+
+        wait = max((bucket.wait_time(cost.get(budget, 0), now) for budget, bucket in self._buckets.items()),
+                   default=0.0)
+        if wait > 0:
+            return wait
+
+        for budget, bucket in self._buckets.items():
+            bucket.take(cost.get(budget, 0))
+        return 0.0
+
+    def _enqueue(self, level: Optional[int]) -> Tuple[Tuple[int, int], float]:
+        level = current_priority() if level is None else level
+        ticket = (level, next(self._sequence))
+        bisect.insort(self._queue, ticket)
+        self._stats["max_queue"] = max(self._stats["max_queue"], len(self._queue))
+        # Never queue past the request's own deadline
+        max_wait = self._max_wait.get(level, 0)
+        left = deadlines.remaining()
+        return ticket, time.monotonic() + (max_wait if left is None else max(0.0, min(max_wait, left)))
+
+    def _leave(self, ticket: Tuple[int, int], waited: float, admitted: bool) -> None:
+        self._queue.remove(ticket)
+        self._stats["admitted" if admitted else "timeouts"] += 1
+        self._stats["waited_ms"] += int(waited * 1000)
+        self._cond.notify_all()
+        metrics.QUEUE_WAIT_SECONDS.observe(
+            waited, limiter=self.name, priority=_PRIORITY_LABELS.get(ticket[0], ticket[0]),
+            outcome="admitted" if admitted else "timeout"
+        )
+
+    def acquire(self, cost: Mapping[str, float], level: Optional[int] = None) -> float:
+        """Block until ``cost`` fits the budgets, queueing behind higher priorities.
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If the call is not admitted within its priority's max wait
+        """
+        if not self._buckets:
+            return 0.0
+
+        started = time.monotonic()
+        with self._cond:
+            ticket, deadline = self._enqueue(level)
+            while True:
+                now = time.monotonic()
+                wait = self._try_acquire(ticket, cost, now)
+                if wait == 0:
+                    self._leave(ticket, now - started, True)
+                    return now - started
+                if now + min(wait, _POLL_SECONDS) > deadline:
+                    self._leave(ticket, now - started, False)
+                    raise RateLimitTimeout(self.name, wait)
+                self._cond.wait(min(wait, deadline - now))
+
+    async def acquire_async(self, cost: Mapping[str, float], level: Optional[int] = None) -> float:
+        """``acquire`` for coroutines; waits without blocking the event loop."""
+        if not self._buckets:
+            return 0.0
+
+        started = time.monotonic()
+        with self._cond:
+            ticket, deadline = self._enqueue(level)
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                wait = self._try_acquire(ticket, cost, now)
+                if wait == 0:
+                    self._leave(ticket, now - started, True)
+                    return now - started
+                if now + min(wait, _POLL_SECONDS) > deadline:
+                    self._leave(ticket, now - started, False)
+                    raise RateLimitTimeout(self.name, wait)
+            await asyncio.sleep(min(wait, _POLL_SECONDS, deadline - now))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "admitted": self._stats["admitted"],
+                "timeouts": self._stats["timeouts"],
+                "waited_ms": self._stats["waited_ms"],
+                "queued": len(self._queue),
+                "max_queue": self._stats["max_queue"],
+                "available": {budget: int(bucket.level) for budget, bucket in self._buckets.items()}
+            }
+
+def configure(limits: Mapping[str, Mapping[str, float]], max_wait: Mapping[int, float]) -> None:
+    """Set per-limiter budgets and per-priority max waits; existing limiters are rebuilt."""
+    with _lock:
+        _settings["limits"] = {name: dict(budgets) for name, budgets in limits.items()}
+        _settings["max_wait"] = dict(max_wait)
+        _limiters.clear()
+
+def init_app(app) -> None:
+    """Configure the OpenAI (per model) and Polygon.io limiters from the app config."""
+    config = app.config
+    openai_default = {
+        "requests": config['OPENAI_REQUESTS_PER_MINUTE'],
+        "tokens": config['OPENAI_TOKENS_PER_MINUTE'],
+    }
+    limits = {
+        f"openai:{model}": {**openai_default, **config['OPENAI_RATE_LIMITS'].get(model, {})}
+        for model in {config['OPENAI_MODEL'], config['OPENAI_TWEET_MODEL'], *config['OPENAI_RATE_LIMITS']}
+    }
+    limits["openai"] = openai_default
+    limits["polygon"] = {"requests": config['POLYGON_REQUESTS_PER_MINUTE']}
+    configure(limits, {
+        PRIORITY_NAMES[name]: seconds for name, seconds in config['RATE_LIMIT_MAX_WAIT_SECONDS'].items()
+    })
+
+def limiter(name: str) -> RateLimiter:
+    """Return the process-wide limiter called ``name``.
+
+    ``openai:<model>`` names without their own limits use the ``openai``
+    defaults; other unknown names are unlimited.
+    """
+    entry = _limiters.get(name)
+    if entry is None:
+        with _lock:
+            entry = _limiters.get(name)
+            if entry is None:
+                limits = _settings["limits"]
+                budgets = limits.get(name) or limits.get(name.split(":")[0], {})
+                entry = _limiters[name] = RateLimiter(name, budgets, _settings["max_wait"])
+    return entry
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Admission counts, waits and queue depth for every limiter in use."""
+    return {name: entry.stats() for name, entry in list(_limiters.items())}
@@ -0,0 +1,76 @@
+"""Vectorized portfolio rebalancing.
+
+Every function works on whole books at once: rows are accounts and columns
+are assets, so thousands of accounts rebalance in a handful of NumPy
+operations.
+"""
+from typing import Optional
+
+import numpy as np
+
+def rebalance(
+    positions: np.ndarray,
+    prices: np.ndarray,
+    weights: np.ndarray,
+    cash: np.ndarray,
+    min_trade_value: float = 0.0,
+    value: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Whole-share trades that move each account toward its target weights.
+
+    Positions above target are sold down and positions below it are bought
+    up, never below zero shares. Buys are paid from cash plus the proceeds of
+    the same rebalance's sells. When they would cost more than that, every
+    buy in the account is scaled down by the same factor. Trades worth less
+    than ``min_trade_value`` are dropped. Assets without a usable price
+    (NaN or <= 0) are left untouched and their weight stays in cash; unless
+    ``value`` says otherwise, their holdings also count for nothing in the
+    account value the weights apply to.
+
+    Args:
+        positions: Shares held, shape (accounts, assets)
+        prices: Price per share, shape (assets,) or (accounts, assets)
+        weights: Target weights as fractions of account value, shape
+            (assets,) or (accounts, assets); any remainder stays in cash
+        cash: Cash per account, shape (accounts,)
+        min_trade_value: Smallest trade worth placing, in currency
+        value: Account value the weights apply to, shape (accounts,); by
+            default cash plus the positions that have a price
+
+    Returns:
+        np.ndarray: Share deltas, shape (accounts, assets); positive buys, negative sells
+    """
+    positions = np.atleast_2d(np.asarray(positions, dtype=float))
+    prices = np.broadcast_to(np.asarray(prices, dtype=float), positions.shape)
+    weights = np.broadcast_to(np.asarray(weights, dtype=float), positions.shape)
+    cash = np.asarray(cash, dtype=float).reshape(-1)
+
+    priced = np.isfinite(prices) & (prices > 0)
+    safe_prices = np.where(priced, prices, 1.0)
+    current = np.where(priced, positions * safe_prices, 0.0)
+    total = cash + current.sum(axis=1) if value is None else np.asarray(value, dtype=float).reshape(-1)
+
+    target = total[:, None] * weights
+    deltas = np.where(priced, np.fix((target - current) / safe_prices), 0.0)
+    # A zero target closes the position outright, fractional shares included
+    deltas = np.where(priced & (weights <= 0), -positions, deltas)
+    deltas = np.maximum(deltas, -positions)
+    deltas[np.abs(deltas) * safe_prices < min_trade_value] = 0.0
+
+    buys = np.maximum(deltas, 0.0)
+    buy_cost = (buys * safe_prices).sum(axis=1)
+    available = np.maximum(cash, 0.0) - (np.minimum(deltas, 0.0) * safe_prices).sum(axis=1)
+    over = buy_cost > available
+    if over.any():
+        scale = np.where(over, available / np.where(over, buy_cost, 1.0), 1.0)
+        scaled = np.floor(buys * scale[:, None])
+        scaled[scaled * safe_prices < min_trade_value] = 0.0
+        deltas = np.where(deltas > 0, scaled, deltas)
+
+    # Normalise -0.0 from truncating small sells
+    return deltas + 0.0
+
+def trade_cash(deltas: np.ndarray, prices: np.ndarray) -> np.ndarray:
+    """Net cash change per account for ``deltas`` (sells add, buys spend)."""
+    prices = np.broadcast_to(np.asarray(prices, dtype=float), deltas.shape)
+    return -(deltas * np.where(deltas != 0, prices, 0.0)).sum(axis=1)
@@ -0,0 +1,27 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, List
+
+class RecentTickers:
+    """Thread-safe, bounded record of the tickers this process was asked about."""
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._tickers: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, tickers: Iterable[str]) -> None:
+        with self._lock:
+            for ticker in tickers:
+                self._tickers[ticker] = None
+                self._tickers.move_to_end(ticker)
+            while len(self._tickers) > self.maxsize:
+                self._tickers.popitem(last=False)
+
+    def most_recent(self, count: int) -> List[str]:
+        """Return up to ``count`` tickers, most recently requested first."""
+        with self._lock:
+            return list(reversed(self._tickers))[:count]
+
+# Tickers requested from the trend and price services in this process
+recent_tickers = RecentTickers()
@@ -0,0 +1,309 @@
+"""SQLite store of recommendations, keyed for idempotent retries.
+
+Every ``/manipulate-portfolio`` and ``/assess-risk-and-diversify`` result is
+appended as a row owned by the ``X-User-Id`` of the request. A request that
+carries an ``Idempotency-Key`` first claims its key with a pending row; a
+retry with the same key and body gets the stored result back, and a
+duplicate arriving while the first is still running polls the row until it
+completes. Completed rows are never changed or deleted; a pending claim is
+dropped when its request fails, or taken over by a retry once its lease
+lapses (e.g. after a worker crash).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.utils import deadlines, metrics
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+USER_HEADER = "X-User-Id"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recommendations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    idempotency_key TEXT,
+    endpoint TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    result TEXT,
+    created_at REAL NOT NULL,
+    completed_at REAL,
+    lease_until REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS recommendations_idempotency_key
+    ON recommendations (user_id, idempotency_key) WHERE idempotency_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS recommendations_user_history
+    ON recommendations (user_id, id) WHERE completed_at IS NOT NULL;
+"""
+
+# Poll interval while waiting for an in-flight duplicate, doubling up to the maximum
+_POLL_SECONDS = 0.05
+_MAX_POLL_SECONDS = 0.5
+
+class IdempotencyConflict(Exception):
+    """The Idempotency-Key was already used for a different request."""
+
+class IdempotencyInFlight(Exception):
+    """The request with this Idempotency-Key is still running; retry later."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def fingerprint(endpoint: str, payload: Any) -> str:
+    """Hash of the endpoint and request payload a key must be reused with."""
+    encoded = json.dumps([endpoint, payload], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+class RecommendationStore:
+    def __init__(self, path: str, lease_seconds: float = 120, wait_seconds: float = 30):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection, opened lazily so forked workers never share one."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _claimed_row(connection: sqlite3.Connection, user_id: str, key: str) -> Optional[Tuple[Any, ...]]:
+        return connection.execute(
+            "SELECT id, endpoint, fingerprint, completed_at, lease_until FROM recommendations "
+            "WHERE user_id = ? AND idempotency_key = ?",
+            (user_id, key)
+        ).fetchone()
+
+    def _try_claim(
+        self,
+        user_id: str,
+        key: Optional[str],
+        endpoint: str,
+        request_fingerprint: str
+    ) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+        """One claim attempt: ``(id, None)`` to run, ``(None, record)`` to replay, ``(None, None)`` to wait."""
+        now = time.time()
+        connection = self._connection()
+        row = None if key is None else self._claimed_row(connection, user_id, key)
+        if row is None:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO recommendations "
+                "(user_id, idempotency_key, endpoint, fingerprint, created_at, lease_until) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, key, endpoint, request_fingerprint, now, now + self.lease_seconds)
+            )
+            if cursor.rowcount == 1:
+                return cursor.lastrowid, None
+            # Another request claimed the key between the two statements
+            row = self._claimed_row(connection, user_id, key)
+            if row is None:
+                return None, None
+
+        record_id, claimed_endpoint, claimed_fingerprint, completed_at, lease_until = row
+        if (claimed_endpoint, claimed_fingerprint) != (endpoint, request_fingerprint):
+            raise IdempotencyConflict(f"{IDEMPOTENCY_HEADER} {key!r} was already used for a different request")
+        if completed_at is not None:
+            return None, self.get(record_id)
+        if lease_until < now:
+            cursor = connection.execute(
+                "UPDATE recommendations SET lease_until = ? "
+                "WHERE id = ? AND completed_at IS NULL AND lease_until < ?",
+                (now + self.lease_seconds, record_id, now)
+            )
+            if cursor.rowcount == 1:
+                return record_id, None
+        return None, None
+
+    def _wait_limit(self) -> float:
+        left = deadlines.remaining()
+        return self.wait_seconds if left is None else min(self.wait_seconds, left)
+
+    def _waited_too_long(self, key: str, endpoint: str) -> Exception:
+        metrics.IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, result="timeout")
+        if deadlines.expired():
+            return deadlines.DeadlineExceeded("Request deadline exceeded")
+        return IdempotencyInFlight(
+            f"A request with {IDEMPOTENCY_HEADER} {key!r} is still in progress", max(1, round(self.wait_seconds))
+        )
+
+    @staticmethod
+    def _claimed(claim: Tuple[Optional[int], Optional[Dict[str, Any]]], endpoint: str, waited: bool) -> None:
+        result = "new" if claim[1] is None else "waited" if waited else "replayed"
+        metrics.IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, result=result)
+
+    def claim(
+        self,
+        user_id: str,
+        key: Optional[str],
+        endpoint: str,
+        request_fingerprint: str
+    ) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+        """Claim the right to run a request, or get the stored result of an earlier one.
+
+        Without a ``key`` the request always runs. With one, a duplicate of a
+        request still in flight waits (up to ``wait_seconds`` and the request
+        deadline) for it to complete or fail.
+
+        Returns:
+            Tuple[Optional[int], Optional[Dict[str, Any]]]: ``(id, None)`` when
+            the caller should run the request and ``complete`` or ``release``
+            the id, or ``(None, record)`` with the stored recommendation
+
+        Raises:
+            IdempotencyConflict: If the key was used with another endpoint or body
+            IdempotencyInFlight: If the original was still running when the wait ended
+        """
+        if key is None:
+            return self._try_claim(user_id, key, endpoint, request_fingerprint)
+
+        waited_until = time.monotonic() + self._wait_limit()
+        delay = _POLL_SECONDS
+        waited = False
+        while True:
+            claim = self._try_claim(user_id, key, endpoint, request_fingerprint)
+            if claim != (None, None):
+                self._claimed(claim, endpoint, waited)
+                return claim
+            if time.monotonic() + delay > waited_until:
+                raise self._waited_too_long(key, endpoint)
+            waited = True
+            time.sleep(delay)
+            delay = min(2 * delay, _MAX_POLL_SECONDS)
+
+    async def claim_async(
+        self,
+        user_id: str,
+        key: Optional[str],
+        endpoint: str,
+        request_fingerprint: str
+    ) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+        """``claim`` for the event loop: SQLite runs on a worker thread and waits are async sleeps."""
+        if key is None:
+            return await asyncio.to_thread(self._try_claim, user_id, key, endpoint, request_fingerprint)
+
+        waited_until = time.monotonic() + self._wait_limit()
+        delay = _POLL_SECONDS
+        waited = False
+        while True:
+            claim = await asyncio.to_thread(self._try_claim, user_id, key, endpoint, request_fingerprint)
+            if claim != (None, None):
+                self._claimed(claim, endpoint, waited)
+                return claim
+            if time.monotonic() + delay > waited_until:
+                raise self._waited_too_long(key, endpoint)
+            waited = True
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, _MAX_POLL_SECONDS)
+
+    def record(
+        self,
+        user_id: str,
+        key: Optional[str],
+        endpoint: str,
+        request_fingerprint: str,
+        run: Callable[[], Any]
+    ) -> Tuple[int, Any, bool]:
+        """Run a request once per key and store its result.
+
+        Claims the request (see ``claim``), then runs it and stores its
+        result, or releases the claim if it fails.
+
+        Returns:
+            Tuple[int, Any, bool]: The recommendation id, its result, and
+            whether the result was replayed rather than produced by ``run``
+        """
+        record_id, record = self.claim(user_id, key, endpoint, request_fingerprint)
+        if record is not None:
+            return record['id'], record['result'], True
+
+        try:
+            result = run()
+        except BaseException:
+            self.release(record_id)
+            raise
+        self.complete(record_id, result)
+        return record_id, result, False
+
+    async def record_async(
+        self,
+        user_id: str,
+        key: Optional[str],
+        endpoint: str,
+        request_fingerprint: str,
+        run: Callable[[], Awaitable[Any]]
+    ) -> Tuple[int, Any, bool]:
+        """``record`` for the event loop, running SQLite on worker threads."""
+        record_id, record = await self.claim_async(user_id, key, endpoint, request_fingerprint)
+        if record is not None:
+            return record['id'], record['result'], True
+
+        try:
+            result = await run()
+        except BaseException:
+            await asyncio.to_thread(self.release, record_id)
+            raise
+        await asyncio.to_thread(self.complete, record_id, result)
+        return record_id, result, False
+
+    def complete(self, record_id: int, result: Any) -> None:
+        """Store the JSON-serializable result of a claimed request."""
+        self._connection().execute(
+            "UPDATE recommendations SET result = ?, completed_at = ? WHERE id = ? AND completed_at IS NULL",
+            (json.dumps(result), time.time(), record_id)
+        )
+
+    def release(self, record_id: int) -> None:
+        """Drop the claim of a request that failed, so a retry can run it again."""
+        self._connection().execute(
+            "DELETE FROM recommendations WHERE id = ? AND completed_at IS NULL", (record_id,)
+        )
+
+    @staticmethod
+    def _record(row: Tuple[Any, ...]) -> Dict[str, Any]:
+        record_id, user_id, endpoint, result, created_at, completed_at = row
+        return {
+            "id": record_id,
+            "userId": user_id,
+            "endpoint": endpoint,
+            "createdAt": _timestamp(created_at),
+            "completedAt": _timestamp(completed_at),
+            "result": json.loads(result),
+        }
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """Return a completed recommendation by id, or None."""
+        row = self._connection().execute(
+            "SELECT id, user_id, endpoint, result, created_at, completed_at FROM recommendations "
+            "WHERE id = ? AND completed_at IS NOT NULL",
+            (record_id,)
+        ).fetchone()
+        return None if row is None else self._record(row)
+
+    def history(self, user_id: str, limit: int = 20, before: Optional[int] = None) -> List[Dict[str, Any]]:
+        """A user's completed recommendations, newest first, with ids below ``before``."""
+        rows = self._connection().execute(
+            "SELECT id, user_id, endpoint, result, created_at, completed_at FROM recommendations "
+            "WHERE user_id = ? AND completed_at IS NOT NULL AND id < ? ORDER BY id DESC LIMIT ?",
+            (user_id, before if before is not None else 2 ** 63 - 1, limit)
+        ).fetchall()
+        return [self._record(row) for row in rows]
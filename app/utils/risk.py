@@ -0,0 +1,166 @@
+"""Vectorized portfolio risk analytics from daily closes.
+
+Closes come as a right-aligned ``(tickers x days)`` matrix with NaN on the
+left of rows with missing history, as in ``app.utils.indicators``. Figures
+between two tickers use the days both have returns for, so one recent
+listing does not shorten every other ticker's window. Volatilities are
+annualized over TRADING_DAYS; VaR is for one day.
+"""
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+TRADING_DAYS = 252
+
+def _as_matrix(values) -> np.ndarray:
+    matrix = np.asarray(values, dtype=float)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return matrix
+
+def daily_returns(closes) -> np.ndarray:
+    """Simple daily returns; one column shorter than ``closes``."""
+    closes = _as_matrix(closes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = closes[:, 1:] / closes[:, :-1] - 1
+    returns[~np.isfinite(returns)] = np.nan
+    return returns
+
+def covariance(returns) -> np.ndarray:
+    """Annualized covariance matrix over pairwise-complete days."""
+    returns = _as_matrix(returns)
+    observed = ~np.isnan(returns)
+    values = np.where(observed, returns, 0.0)
+    mask = observed.astype(float)
+
+    counts = mask @ mask.T
+    # sums[i, j]: sum of ticker i's returns on the days ticker j has one too
+    sums = values @ mask.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (values @ values.T - sums * sums.T / counts) / (counts - 1)
+    cov[counts < 2] = np.nan
+    return cov * TRADING_DAYS
+
+def correlation(cov: np.ndarray) -> np.ndarray:
+    """Correlation matrix from a covariance matrix."""
+    vol = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(vol, vol)
+    return np.clip(corr, -1.0, 1.0)
+
+def max_drawdown(prices) -> np.ndarray:
+    """Largest peak-to-trough decline of every row, as a negative fraction."""
+    prices = _as_matrix(prices)
+    peaks = np.fmax.accumulate(prices, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdowns = prices / peaks - 1
+    return np.fmin.reduce(drawdowns, axis=1)
+
+def hhi(weights) -> float:
+    """Herfindahl-Hirschman index of the weights, normalized to sum to 1."""
+    weights = np.asarray(weights, dtype=float)
+    total = weights.sum()
+    return float(np.sum((weights / total) ** 2)) if total > 0 else 0.0
+
+def value_at_risk(returns: np.ndarray, value: float, confidence: float) -> Dict[str, float]:
+    """One-day VaR of ``value`` from a daily return series: historical and parametric (normal)."""
+    if returns.size < 2 or value <= 0:
+        return {"historical": 0.0, "parametric": 0.0}
+    historical = -np.quantile(returns, 1 - confidence)
+    parametric = NormalDist().inv_cdf(confidence) * returns.std(ddof=1) - returns.mean()
+    return {"historical": max(0.0, float(historical)) * value, "parametric": max(0.0, float(parametric)) * value}
+
+def _round(value: Optional[float], digits: int = 4) -> Optional[float]:
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+def portfolio_risk(
+    tickers: Sequence[str],
+    closes,
+    values: Sequence[float],
+    cash: float = 0.0,
+    benchmark: Optional[Sequence[float]] = None,
+    confidence: float = 0.95,
+    min_observations: int = 20
+) -> Dict[str, Any]:
+    """Risk figures for a portfolio of ``tickers`` held at market ``values``.
+
+    Tickers with fewer than ``min_observations`` daily returns are listed in
+    ``unanalyzed`` and left out of everything but concentration. Cash counts
+    as a riskless position. Portfolio returns assume constant weights, and a
+    ticker's days before its history starts count as flat.
+
+    Args:
+        tickers: Held tickers, one per row of ``closes``
+        closes: Right-aligned ``(tickers x days)`` daily closes
+        values: Current market value of each position
+        cash: Available cash
+        benchmark: Benchmark closes aligned with ``closes``' columns, for beta
+        confidence: VaR confidence level
+        min_observations: Fewest daily returns a ticker needs to be analyzed
+
+    Returns:
+        Dict[str, Any]: ``portfolio`` figures, figures per position, the
+        ``correlation`` matrix of analyzed tickers and ``unanalyzed`` tickers
+    """
+    closes = _as_matrix(closes) if len(tickers) else np.empty((0, 0))
+    values = np.asarray(values, dtype=float)
+    total = float(values.sum() + cash)
+    weights = values / total if total > 0 else np.zeros_like(values)
+
+    returns = daily_returns(closes) if closes.size else np.empty((len(tickers), 0))
+    analyzed = np.sum(~np.isnan(returns), axis=1) >= min_observations
+    names: List[str] = [ticker for ticker, keep in zip(tickers, analyzed) if keep]
+    returns = returns[analyzed]
+    w = weights[analyzed]
+
+    has_benchmark = benchmark is not None and len(benchmark) == closes.shape[1] and bool(names)
+    if has_benchmark:
+        returns = np.vstack([returns, daily_returns(benchmark)])
+    cov = covariance(returns) if returns.size else np.empty((0, 0))
+    betas = np.full(len(names), np.nan)
+    if has_benchmark:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            betas = cov[:-1, -1] / cov[-1, -1]
+        cov, returns = cov[:-1, :-1], returns[:-1]
+
+    vol = np.sqrt(np.diag(cov))
+    filled_cov = np.nan_to_num(cov)
+    portfolio_returns = w @ np.nan_to_num(returns) if names else np.empty(0)
+    wealth = np.cumprod(np.concatenate([[1.0], 1 + portfolio_returns]))
+    var = value_at_risk(portfolio_returns, total, confidence)
+    concentration = hhi(values)
+    drawdowns = max_drawdown(closes[analyzed]) if names else np.empty(0)
+
+    return {
+        "portfolio": {
+            "value": _round(total, 2),
+            "volatility": _round(np.sqrt(w @ filled_cov @ w)) if names else None,
+            "beta": _round(float(np.nansum(w * betas))) if has_benchmark else None,
+            "maxDrawdown": _round(max_drawdown(wealth)[0]) if names else None,
+            "valueAtRisk": {
+                "confidence": confidence,
+                "historical": _round(var["historical"], 2),
+                "parametric": _round(var["parametric"], 2)
+            },
+            "hhi": _round(concentration),
+            "effectivePositions": _round(1 / concentration, 2) if concentration else None,
+            "cashWeight": _round(cash / total) if total > 0 else None,
+            "coverage": _round(float(w.sum() / weights.sum())) if weights.sum() > 0 else None,
+            "observations": int(returns.shape[1]) if names else 0
+        },
+        "positions": {
+            ticker: {
+                "weight": _round(w[row]),
+                "volatility": _round(vol[row]),
+                "beta": _round(betas[row]),
+                "maxDrawdown": _round(drawdowns[row])
+            }
+            for row, ticker in enumerate(names)
+        },
+        "correlation": {
+            "tickers": names,
+            "matrix": [[_round(value, 3) for value in row] for row in correlation(cov)] if names else []
+        },
+        "unanalyzed": [ticker for ticker, keep in zip(tickers, analyzed) if not keep]
+    }
@@ -1,8 +1,10 @@
 import requests
 
+from app.utils import http_client
+
 def check_health():
     try:
-        response = requests.get('https://services-smart-investor.onrender.com/health')
+        response = http_client.get('https://services-smart-investor.onrender.com/health')
         print(f"Health check response: {response.text}")
         print(f"Status code: {response.status_code}")
     except requests.exceptions.RequestException as e:
@@ -0,0 +1,104 @@
+"""Single-flight coalescing of identical in-flight calls.
+
+Concurrent callers that ask for the same key while a call is already running
+wait for that call and share its result (or exception) instead of starting
+their own upstream request.
+"""
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_groups: Dict[str, "SingleFlight"] = {}
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class _AsyncCall:
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, _AsyncCall] = {}
+        self._stats = Counter()
+        _groups[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` once for all concurrent callers with the same ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._stats["calls" if leader else "coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """``do`` for coroutines on the running event loop.
+
+        The call runs as its own task, so a caller that is cancelled (e.g. a
+        client disconnect) only stops waiting; the others still get the
+        result. The task is cancelled once every caller has given up on it.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        call = self._async_calls.get(loop_key)
+        if call is None:
+            self._stats["calls"] += 1
+            call = self._async_calls[loop_key] = _AsyncCall(loop.create_task(fn()))
+            call.task.add_done_callback(lambda task: self._finish_async(loop_key, call))
+        else:
+            self._stats["coalesced"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _finish_async(self, loop_key: Hashable, call: "_AsyncCall") -> None:
+        if self._async_calls.get(loop_key) is call:
+            del self._async_calls[loop_key]
+        # Mark the exception retrieved when nobody was left waiting
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self._stats["calls"], "coalesced": self._stats["coalesced"]}
+
+def group(name: str) -> SingleFlight:
+    """Return the process-wide group called ``name``, creating it on first use."""
+    return _groups.get(name) or SingleFlight(name)
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Calls made and calls coalesced for every group."""
+    return {name: flight.stats() for name, flight in _groups.items()}
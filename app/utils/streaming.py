@@ -0,0 +1,135 @@
+"""Server-Sent Events helpers and an incremental JSON array extractor."""
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from flask import Response, request, stream_with_context
+
+EVENT_STREAM = "text/event-stream"
+
+def wants_event_stream(headers: Optional[Mapping[str, str]] = None) -> bool:
+    """True when the client opted into streaming via the Accept header."""
+    headers = request.headers if headers is None else headers
+    return EVENT_STREAM in headers.get("Accept", "")
+
+def format_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events: Iterable[Tuple[str, Any]]) -> Response:
+    """Stream ``(event, data)`` pairs as an SSE response.
+
+    An exception raised while producing events is reported as a final
+    ``error`` event, since the status line has already been sent.
+    """
+    def generate() -> Iterator[str]:
+        try:
+            for event, data in events:
+                yield format_event(event, data)
+        except Exception as e:
+            yield format_event("error", {"error": str(e)})
+        yield format_event("done", {})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EVENT_STREAM,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def async_sse_response(events: AsyncIterable[Tuple[str, Any]]):
+    """``sse_response`` for the ASGI path, streaming from an async iterator."""
+    from quart import Response as AsyncResponse
+
+    async def generate() -> AsyncIterator[str]:
+        try:
+            async for event, data in events:
+                yield format_event(event, data)
+        except Exception as e:
+            yield format_event("error", {"error": str(e)})
+        yield format_event("done", {})
+
+    return AsyncResponse(
+        generate(),
+        mimetype=EVENT_STREAM,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+class JSONArrayStream:
+    """Extract the elements of one top-level array from streamed JSON text.
+
+    Feed completion chunks with ``feed``; every element of ``key`` whose
+    closing bracket has arrived is returned parsed, exactly once.
+    """
+
+    def __init__(self, key: str):
+        self._marker = f'"{key}"'
+        self._buffer = ""
+        self._position = 0
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element_start = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        self._buffer += chunk
+        elements: List[Any] = []
+        if self._finished:
+            return elements
+
+        if not self._in_array:
+            marker = self._buffer.find(self._marker)
+            if marker == -1:
+                return elements
+            bracket = self._buffer.find("[", marker + len(self._marker))
+            if bracket == -1:
+                return elements
+            self._in_array = True
+            self._position = bracket + 1
+
+        while self._position < len(self._buffer):
+            char = self._buffer[self._position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+                if self._depth == 0 and self._element_start is None:
+                    self._element_start = self._position
+            elif char in "{[":
+                if self._depth == 0:
+                    self._element_start = self._position
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the array itself
+                    self._finished = True
+                    self._emit_scalar(elements)
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(elements, self._position + 1)
+            elif char == "," and self._depth == 0:
+                self._emit_scalar(elements)
+            elif self._depth == 0 and self._element_start is None and not char.isspace():
+                self._element_start = self._position
+            self._position += 1
+
+        return elements
+
+    def _emit(self, elements: List[Any], end: int) -> None:
+        text = self._buffer[self._element_start:end]
+        self._element_start = None
+        elements.append(json.loads(text))
+
+    def _emit_scalar(self, elements: List[Any]) -> None:
+        """Emit a pending scalar element (string or number) ended by ',' or ']'."""
+        if self._element_start is None:
+            return
+        text = self._buffer[self._element_start:self._position].strip()
+        self._element_start = None
+        if text:
+            elements.append(json.loads(text))
@@ -0,0 +1,10 @@
+import os
+from app import create_app
+from app.asgi import create_asgi_app
+from app.scheduler import init_scheduler
+
+# The Flask app serves the non-async routes and runs the scheduled jobs
+wsgi_app = create_app(os.getenv('FLASK_ENV', 'default'))
+scheduler = init_scheduler(wsgi_app)
+
+app = create_asgi_app(wsgi_app=wsgi_app)
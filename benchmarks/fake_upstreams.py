@@ -0,0 +1,263 @@
+"""Local stand-ins for the OpenAI, Polygon.io and throttle/auth services.
+
+Each fake is a threaded HTTP server that sleeps for a latency drawn from a
+log-normal distribution, fails a configurable share of calls and counts the
+calls it served by route.
+"""
+import base64
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+Body = Union[bytes, Iterable[bytes]]
+
+class LatencyProfile:
+    """Log-normal latency around ``median_ms``, with ``error_rate`` of calls failing."""
+
+    def __init__(self, median_ms: float = 50, sigma: float = 0.25, error_rate: float = 0.0, error_status: int = 500):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def delay(self) -> float:
+        return random.lognormvariate(0, self.sigma) * self.median_ms / 1000 if self.median_ms > 0 else 0.0
+
+    def fails(self) -> bool:
+        return random.random() < self.error_rate
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _dispatch(self, method: str) -> None:
+        server: FakeUpstream = self.server  # type: ignore[assignment]
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+
+        route, status, headers, payload = server.handle(method, url.path, parse_qs(url.query), body)
+        server.count(route)
+        time.sleep(server.profile.delay())
+        if server.profile.fails():
+            status, headers, payload = server.profile.error_status, {}, json.dumps({"error": "injected"}).encode()
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if isinstance(payload, bytes):
+            self.send_header("Content-Type", headers.get("Content-Type", "application/json"))
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in payload:
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+class FakeUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+    name = "upstream"
+
+    def __init__(self, profile: Optional[LatencyProfile] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.profile = profile or LatencyProfile()
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, route: str) -> None:
+        with self._lock:
+            self._counts[route] += 1
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients that gave up (request deadline, losing hedge) close the socket mid-response
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def handle(self, method: str, path: str, query: Dict[str, list], body: Any) -> Tuple[str, int, Dict[str, str], Body]:
+        """Return ``(route, status, headers, body)`` for one request."""
+        raise NotImplementedError
+
+    def start(self) -> "FakeUpstream":
+        self._thread = threading.Thread(target=self.serve_forever, name=f"fake-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+def _json(data: Any) -> bytes:
+    return json.dumps(data).encode()
+
+def _not_found(path: str) -> Tuple[str, int, Dict[str, str], Body]:
+    return "unknown", 404, {}, _json({"error": f"No route for {path}"})
+
+def _closes(ticker: str, days: int) -> list:
+    """Deterministic random walk per ticker."""
+    rng = random.Random(ticker)
+    price, closes = rng.uniform(20, 500), []
+    for _ in range(days):
+        price = max(1.0, price * (1 + rng.gauss(0.0004, 0.015)))
+        closes.append(round(price, 2))
+    return closes
+
+class FakeOpenAI(FakeUpstream):
+    """``/v1/chat/completions`` answering in the JSON shape each system prompt asks for."""
+
+    name = "openai"
+    tickers = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "JPM", "XOM", "JNJ", "VTI", "BND"]
+
+    def _content(self, system_prompt: str, user_prompt: str = "") -> str:
+        prompt = system_prompt.lower()
+        picks = random.sample(self.tickers, 5)
+        weights = [30, 25, 20, 15, 10]
+        if "diversification" in prompt:
+            return json.dumps({
+                "assessment": "Concentrated in large-cap US technology.",
+                "diversify": [{"action": "add", "ticker": ticker, "reason": "diversification"} for ticker in picks[:3]]
+            })
+        if "tweet" in prompt and "json array" in prompt:
+            ids = re.findall(r"^(\d+)\.", user_prompt, re.MULTILINE)
+            return json.dumps([{"id": int(i), "tweet": f"Trade {i} done - riding the trend. #investing"} for i in ids])
+        if "tweet" in prompt:
+            return "Bought more shares today - the trend keeps climbing. #investing"
+        portfolio = [{"ticker": ticker, "percentage": weight} for ticker, weight in zip(picks, weights)]
+        if "manipulate" in prompt:
+            return json.dumps({"analysis": "Rebalance toward the leaders.", "portfolio": portfolio})
+        return json.dumps({"portfolio": portfolio})
+
+    def handle(self, method, path, query, body):
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return _not_found(path)
+
+        messages = body.get("messages", [])
+        system_prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user_prompt = next((m["content"] for m in messages if m["role"] == "user"), "")
+        content = self._content(system_prompt, user_prompt)
+        model = body.get("model", "gpt-4o")
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+
+        if body.get("stream"):
+            return "chat.completions.stream", 200, {"Content-Type": "text/event-stream"}, self._stream(model, content)
+
+        return "chat.completions", 200, {}, _json({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4
+            }
+        })
+
+    @staticmethod
+    def _stream(model: str, content: str) -> Iterable[bytes]:
+        for start in range(0, len(content), 16):
+            chunk = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + 16]}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+class FakePolygon(FakeUpstream):
+    """Daily aggregates (per ticker and grouped) built from a seeded random walk."""
+
+    name = "polygon"
+
+    def handle(self, method, path, query, body):
+        parts = path.strip("/").split("/")
+        if parts[:3] == ["v2", "aggs", "ticker"] and len(parts) >= 8:
+            ticker, start, end = parts[3], date.fromisoformat(parts[7]), date.fromisoformat(parts[8])
+            days = max(1, int((end - start).days * 252 / 365))
+            return "aggs.ticker", 200, {}, _json({
+                "ticker": ticker,
+                "status": "OK",
+                "results": [{"c": close} for close in _closes(ticker, days)]
+            })
+        if parts[:3] == ["v2", "aggs", "grouped"]:
+            day = date.fromisoformat(parts[-1])
+            offset = (date.today() - day).days
+            return "aggs.grouped", 200, {}, _json({
+                "status": "OK",
+                "results": [
+                    {"T": ticker, "o": close, "h": close, "l": close, "c": close, "v": 1e6}
+                    for ticker in FakeOpenAI.tickers
+                    for close in [_closes(ticker, 800)[-1 - min(offset, 799)]]
+                ]
+            })
+        return _not_found(path)
+
+class FakeThrottle(FakeUpstream):
+    """The throttle service: ``/authentication`` tokens and ``/throttle`` previous closes."""
+
+    name = "throttle"
+
+    @staticmethod
+    def _token() -> str:
+        def encode(data: Dict[str, Any]) -> str:
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+        return ".".join([encode({"alg": "none"}), encode({"exp": int(time.time()) + 3600}), "bench"])
+
+    def handle(self, method, path, query, body):
+        if method == "POST" and path == "/authentication":
+            return "authentication", 201, {}, _json({"accessToken": self._token()})
+        if method == "GET" and path == "/throttle":
+            ticker = query.get("ticker", [""])[0]
+            return "throttle.prev", 200, {}, _json({"ticker": ticker, "close": _closes(ticker, 1)[-1]})
+        if path == "/health":
+            return "health", 200, {}, _json({"status": "ok"})
+        return _not_found(path)
+
+def start_all(
+    openai: Optional[LatencyProfile] = None,
+    polygon: Optional[LatencyProfile] = None,
+    throttle: Optional[LatencyProfile] = None
+) -> Dict[str, FakeUpstream]:
+    """Start every fake on an ephemeral port."""
+    return {
+        "openai": FakeOpenAI(openai).start(),
+        "polygon": FakePolygon(polygon).start(),
+        "throttle": FakeThrottle(throttle).start(),
+    }
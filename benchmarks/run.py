@@ -0,0 +1,278 @@
+"""Offline load test of every route against local fake upstreams.
+
+Starts the fake OpenAI, Polygon.io and throttle services, serves
+``create_app`` on a local port and drives each route at a fixed
+concurrency. Reports p50/p95/p99 latency, requests per second, status
+codes and the upstream calls each route caused. Results are saved as JSON
+under ``benchmarks/results`` so runs can be compared across versions:
+
+    python -m benchmarks.run --requests 200 --concurrency 16
+    python -m benchmarks.run --baseline benchmarks/results/<earlier>.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from benchmarks.fake_upstreams import FakeOpenAI, FakeUpstream, LatencyProfile, start_all
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+TICKERS = FakeOpenAI.tickers
+# Bearer token the app is started with, sent by the ops scenarios
+OPS_TOKEN = "bench"
+
+Call = Tuple[str, str, Dict[str, Any]]
+
+def _holdings(rng: random.Random, count: int) -> Dict[str, Dict[str, float]]:
+    totals = {}
+    for ticker in rng.sample(TICKERS, count):
+        position, price = rng.randint(1, 200), round(rng.uniform(20, 500), 2)
+        totals[ticker] = {"position": position, "currentPrice": price, "currentValue": round(position * price, 2)}
+    return totals
+
+def _scenarios(batch_accounts: int) -> Dict[str, Callable[[int, random.Random], Call]]:
+    """Request builders by route name; ``variant`` picks the prompt, so repeats can hit the caches."""
+    def build_portfolio(variant, rng):
+        return "GET", "/build-portfolio", {"params": {"prompt": f"Long-term growth portfolio #{variant}"}}
+
+    def manipulate(variant, rng):
+        return "POST", "/manipulate-portfolio", {"json": {
+            "cash": 10000, "totals": _holdings(rng, 5), "additionalInfo": f"variant {variant}"}}
+
+    def manipulate_batch(variant, rng):
+        return "POST", "/manipulate-portfolio/batch", {"json": {
+            "targets": {ticker: 10 for ticker in TICKERS},
+            "accounts": [
+                {"id": str(index), "cash": rng.randint(0, 50000), "totals": _holdings(rng, 5)}
+                for index in range(batch_accounts)
+            ]}}
+
+    def assess(variant, rng):
+        return "POST", "/assess-risk-and-diversify", {"json": {
+            "cash": 5000, "totals": _holdings(rng, 4), "additionalInfo": f"variant {variant}"}}
+
+    def trade(variant, rng):
+        return "GET", "/trade", {"params": {"ticker": TICKERS[variant % len(TICKERS)]}}
+
+    def trade_batch(variant, rng):
+        return "POST", "/trade/batch", {"json": {"tickers": rng.sample(TICKERS, 5)}}
+
+    def tweet(variant, rng):
+        return "GET", "/tweet", {"params": {
+            "ticker": TICKERS[variant % len(TICKERS)], "price": "123.45", "operation": "buy", "papers": str(variant)}}
+
+    def tweet_batch(variant, rng):
+        return "POST", "/tweet/batch", {"json": {"trades": [
+            {"ticker": ticker, "price": 123.45, "operation": rng.choice(["buy", "sell"]), "papers": rng.randint(1, 50)}
+            for ticker in rng.sample(TICKERS, 8)]}}
+
+    def get(path):
+        return lambda variant, rng: ("GET", path, {"headers": {"Authorization": f"Bearer {OPS_TOKEN}"}})
+
+    return {
+        "build-portfolio": build_portfolio,
+        "manipulate-portfolio": manipulate,
+        "manipulate-portfolio-batch": manipulate_batch,
+        "assess-risk-and-diversify": assess,
+        "trade": trade,
+        "trade-batch": trade_batch,
+        "tweet": tweet,
+        "tweet-batch": tweet_batch,
+        "cache-stats": get("/cache/stats"),
+        "coalescing-stats": get("/coalescing/stats"),
+        "rate-limits-stats": get("/rate-limits/stats"),
+        "metrics": get("/metrics"),
+    }
+
+def _configure_environment(upstreams: Dict[str, FakeUpstream], workdir: str, args: argparse.Namespace) -> None:
+    """Point the app at the fakes; must run before ``app`` is imported."""
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{upstreams['openai'].url}/v1",
+        "POLYGON_API_KEY": "bench",
+        "POLYGON_BASE_URL": upstreams["polygon"].url,
+        "THROTTLE_SERVICE_URL": upstreams["throttle"].url,
+        "CACHE_PATH": os.path.join(workdir, "cache.sqlite3"),
+        "BAR_STORE_PATH": os.path.join(workdir, "bars"),
+        "LLM_CACHE_PATH": "",
+        "PREWARM_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+        "OPS_TOKEN": OPS_TOKEN,
+    })
+    if not args.rate_limits:
+        os.environ.update({
+            "OPENAI_REQUESTS_PER_MINUTE": "0",
+            "OPENAI_TOKENS_PER_MINUTE": "0",
+            "POLYGON_REQUESTS_PER_MINUTE": "0",
+        })
+
+def _serve(app) -> Tuple[str, Any]:
+    from werkzeug.serving import make_server
+
+    # One access log line per request would drown the report
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+def _upstream_counts(upstreams: Dict[str, FakeUpstream]) -> Dict[str, int]:
+    return {f"{name}:{route}": count for name, fake in upstreams.items() for route, count in fake.counts().items()}
+
+def run_route(base_url: str, build: Callable[[int, random.Random], Call], args: argparse.Namespace,
+              upstreams: Dict[str, FakeUpstream]) -> Dict[str, Any]:
+    """Send ``args.requests`` requests for one route and summarise them."""
+    rng = random.Random(args.seed)
+    distinct = args.distinct or args.requests
+    calls = [build(index % distinct, rng) for index in range(args.requests)]
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+    def send(call: Call) -> Tuple[float, int]:
+        method, path, kwargs = call
+        started = time.perf_counter()
+        try:
+            status = session.request(method, base_url + path, timeout=args.timeout, **kwargs).status_code
+        except requests.RequestException:
+            status = 0
+        return time.perf_counter() - started, status
+
+    before = _upstream_counts(upstreams)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(send, calls))
+    elapsed = time.perf_counter() - started
+    after = _upstream_counts(upstreams)
+
+    latencies = np.array([latency for latency, _ in outcomes]) * 1000
+    statuses = Counter(str(status) for _, status in outcomes)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(outcomes),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "statuses": dict(statuses),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "rps": round(len(outcomes) / elapsed, 2),
+        "upstream_calls": {name: after[name] - before.get(name, 0) for name in after if after[name] != before.get(name, 0)},
+    }
+
+def _git_version() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Routes whose p95 or throughput got worse than ``baseline`` by more than ``threshold`` percent."""
+    regressions = []
+    for route, current in results["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if not previous:
+            continue
+        p95_change = 100 * (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0
+        rps_change = 100 * (current["rps"] - previous["rps"]) / previous["rps"] if previous["rps"] else 0
+        current["vs_baseline"] = {"p95_pct": round(p95_change, 1), "rps_pct": round(rps_change, 1)}
+        if p95_change > threshold or rps_change < -threshold:
+            regressions.append(route)
+    return regressions
+
+def _print_report(results: Dict[str, Any]) -> None:
+    print(f"{'route':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'errors':>8}  upstream calls")
+    for route, stats in results["routes"].items():
+        upstream = ", ".join(f"{name}={count}" for name, count in sorted(stats["upstream_calls"].items()))
+        change = stats.get("vs_baseline")
+        suffix = f"  [p95 {change['p95_pct']:+.1f}%, rps {change['rps_pct']:+.1f}%]" if change else ""
+        print(f"{route:<28}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+              f"{stats['rps']:>9.1f}{stats['errors']:>8}  {upstream or '-'}{suffix}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--routes", help="Comma-separated route names (default: all)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="Distinct request variants per route; fewer than --requests exercises the caches")
+    parser.add_argument("--batch-accounts", type=int, default=100, help="Accounts per /manipulate-portfolio/batch")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the configured upstream rate limits")
+    for name, median in (("openai", 400), ("polygon", 80), ("throttle", 30)):
+        parser.add_argument(f"--{name}-latency-ms", type=float, default=median, help=f"Median {name} latency")
+        parser.add_argument(f"--{name}-sigma", type=float, default=0.3, help=f"Log-normal sigma of {name} latency")
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0, help=f"Share of {name} calls that fail")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>-<version>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent p95 increase or throughput drop that counts as a regression")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    profiles = {
+        name: LatencyProfile(getattr(args, f"{name}_latency_ms"), getattr(args, f"{name}_sigma"),
+                             getattr(args, f"{name}_error_rate"))
+        for name in ("openai", "polygon", "throttle")
+    }
+    upstreams = start_all(**profiles)
+
+    with tempfile.TemporaryDirectory(prefix="matrix-agent-bench-") as workdir:
+        _configure_environment(upstreams, workdir, args)
+        from app import create_app
+
+        base_url, server = _serve(create_app())
+        scenarios = _scenarios(args.batch_accounts)
+        names = args.routes.split(",") if args.routes else list(scenarios)
+        unknown = [name for name in names if name not in scenarios]
+        if unknown:
+            print(f"Unknown routes: {', '.join(unknown)}; choose from {', '.join(scenarios)}", file=sys.stderr)
+            return 2
+
+        try:
+            routes = {name: run_route(base_url, scenarios[name], args, upstreams) for name in names}
+        finally:
+            server.shutdown()
+            for fake in upstreams.values():
+                fake.stop()
+
+    results = {
+        "version": _git_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "routes": routes,
+    }
+
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{results['version']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    _print_report(results)
+    print(f"\nSaved results to {output}")
+    if regressions:
+        print(f"Regressions over {args.threshold}%: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
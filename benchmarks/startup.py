@@ -0,0 +1,199 @@
+"""Worker boot time and import time per module.
+
+Imports the gunicorn entry point (``run`` or ``asgi``) in fresh interpreters
+under ``python -X importtime`` and reports the median cumulative import time
+of the heaviest modules. It also reports how long a worker takes to boot in
+each ``STARTUP_MODE``:
+
+- ``lazy``: the entry point is imported in a bare interpreter.
+- ``preload``: the gunicorn master has already imported ``preload``'s
+  modules before forking.
+
+Results are saved as JSON under ``benchmarks/results``:
+
+    python -m benchmarks.startup --repeats 5
+    python -m benchmarks.startup --baseline benchmarks/results/<earlier>.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from benchmarks.run import RESULTS_DIR, _git_version
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = {"sync": "run", "async": "asgi"}
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)$")
+
+# Run in the child: boot the entry point, optionally after the master's preload
+_BOOT = """
+import time
+if {preload}:
+    from preload import master_modules, preload
+    preload(master_modules({mode!r}))
+started = time.perf_counter()
+import {entry}
+print(time.perf_counter() - started)
+"""
+
+def _environment(workdir: str) -> Dict[str, str]:
+    """Offline settings, so importing the entry point touches no real service."""
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": "bench",
+        "POLYGON_API_KEY": "bench",
+        "CACHE_PATH": os.path.join(workdir, "cache.sqlite3"),
+        "BAR_STORE_PATH": os.path.join(workdir, "bars"),
+        "LLM_CACHE_PATH": "",
+        "PREWARM_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+
+def _run(code: str, env: Dict[str, str], importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", code]
+    return subprocess.run(command, capture_output=True, text=True, check=True, cwd=ROOT, env=env)
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, float]]:
+    """Self and cumulative import milliseconds by module from ``-X importtime`` output."""
+    modules: Dict[str, Dict[str, float]] = {}
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, name = match.groups()
+            modules[name] = {"self_ms": int(own) / 1000, "cumulative_ms": int(cumulative) / 1000}
+    return modules
+
+def _top_level(modules: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Import milliseconds by top-level package: the sum of its modules' own times."""
+    packages: Dict[str, float] = defaultdict(float)
+    for name, timing in modules.items():
+        packages[name.split(".")[0]] += timing["self_ms"]
+    return packages
+
+def measure(mode: str, repeats: int, top: int) -> Dict[str, Any]:
+    """Boot the ``mode`` entry point ``repeats`` times in fresh interpreters."""
+    entry = ENTRY_POINTS[mode]
+    imports: Dict[str, List[float]] = defaultdict(list)
+    packages: Dict[str, List[float]] = defaultdict(list)
+    boots: Dict[str, List[float]] = {"lazy": [], "preload": []}
+
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as workdir:
+        env = _environment(workdir)
+        for _ in range(repeats):
+            profile = _run(f"import {entry}", env, importtime=True)
+            modules = parse_importtime(profile.stderr)
+            for name, timing in modules.items():
+                imports[name].append(timing["cumulative_ms"])
+            for name, ms in _top_level(modules).items():
+                packages[name].append(ms)
+
+            for startup_mode in boots:
+                code = _BOOT.format(preload=startup_mode == "preload", mode=mode, entry=entry)
+                boots[startup_mode].append(1000 * float(_run(code, env).stdout.strip().splitlines()[-1]))
+
+    median = {name: round(statistics.median(values), 1) for name, values in imports.items()}
+    heaviest = sorted(median.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "entry_point": entry,
+        "import_ms": median.get(entry),
+        "worker_boot_ms": {name: round(statistics.median(values), 1) for name, values in boots.items()},
+        "packages_ms": dict(sorted(
+            ((name, round(statistics.median(values), 1)) for name, values in packages.items()),
+            key=lambda item: item[1], reverse=True
+        )[:top]),
+        "modules_ms": dict(heaviest[:top]),
+        "app_modules_ms": {name: ms for name, ms in heaviest if name.split(".")[0] == "app"},
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Boot times and packages whose import got slower than ``baseline`` by more than ``threshold`` percent."""
+    regressions = []
+    for mode, current in results["modes"].items():
+        previous = baseline.get("modes", {}).get(mode)
+        if not previous:
+            continue
+        pairs = [(f"{mode}:import", current["import_ms"], previous.get("import_ms"))]
+        pairs += [(f"{mode}:boot:{name}", ms, previous.get("worker_boot_ms", {}).get(name))
+                  for name, ms in current["worker_boot_ms"].items()]
+        pairs += [(f"{mode}:{name}", ms, previous.get("packages_ms", {}).get(name))
+                  for name, ms in current["packages_ms"].items()]
+
+        changes = current["vs_baseline"] = {}
+        for name, now, before in pairs:
+            if now is None or not before:
+                continue
+            change = 100 * (now - before) / before
+            changes[name] = round(change, 1)
+            # Ignore changes within timer noise on very fast imports
+            if change > threshold and now - before > 5:
+                regressions.append(name)
+    return regressions
+
+def _print_report(results: Dict[str, Any]) -> None:
+    for mode, stats in results["modes"].items():
+        changes = stats.get("vs_baseline", {})
+
+        def change(name: str) -> str:
+            return f" ({changes[name]:+.1f}%)" if name in changes else ""
+
+        print(f"{mode} ({stats['entry_point']}): import {stats['import_ms']:.0f} ms{change(f'{mode}:import')}")
+        for name, ms in stats["worker_boot_ms"].items():
+            print(f"  worker boot, STARTUP_MODE={name}: {ms:.0f} ms{change(f'{mode}:boot:{name}')}")
+        print("  heaviest packages (own import time):")
+        for name, ms in stats["packages_ms"].items():
+            print(f"    {name:<28} {ms:>8.1f} ms{change(f'{mode}:{name}')}")
+        print("  heaviest modules (cumulative):")
+        for name, ms in stats["modules_ms"].items():
+            print(f"    {name:<48} {ms:>8.1f} ms")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=sorted(ENTRY_POINTS), default=["sync"],
+                        help="Server modes whose entry points to boot")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="Packages and modules to list")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/startup-<time>-<version>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="Percent slowdown that counts as a regression")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = {
+        "version": _git_version(),
+        "python": sys.version.split()[0],
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "modes": {mode: measure(mode, args.repeats, args.top) for mode in args.modes},
+    }
+
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"startup-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{results['version']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    _print_report(results)
+    print(f"\nSaved results to {output}")
+    if regressions:
+        print(f"Regressions over {args.threshold}%: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
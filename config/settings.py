@@ -1,13 +1,175 @@
+import json
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class Config:
     """Base configuration."""
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
+    # Upstream base URLs, overridable to point at stand-ins (see benchmarks/)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+    POLYGON_BASE_URL = os.getenv("POLYGON_BASE_URL", "https://api.polygon.io")
+    THROTTLE_SERVICE_URL = os.getenv("THROTTLE_SERVICE_URL", "http://localhost:3030")
     FRONTEND_URL = os.getenv("FRONTEND_URL")
+    # Bearer token for the ops endpoints (/metrics, /cache/stats, ...); unset disables them
+    OPS_TOKEN = os.getenv("OPS_TOKEN")
+    # Bearer token for reading stored recommendations (/recommendations); unset disables them
+    RECOMMENDATIONS_READ_TOKEN = os.getenv("RECOMMENDATIONS_READ_TOKEN")
+
+    # OpenAI client
+    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+    OPENAI_TWEET_MODEL = os.getenv("OPENAI_TWEET_MODEL", "gpt-4o-mini")
+    OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.8"))
+    OPENAI_ASSESSMENT_TEMPERATURE = float(os.getenv("OPENAI_ASSESSMENT_TEMPERATURE", "0.7"))
+    OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+    OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+    OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+    # Cheaper, faster model that small or low-stakes completions are routed to
+    OPENAI_FAST_MODEL = os.getenv("OPENAI_FAST_MODEL", "gpt-4o-mini")
+
+    # Latency control per OpenAIService method (non-streamed completions; streams only use "model"):
+    #   model: always use this model instead of the method's default
+    #   small_prompt_tokens: user prompts up to this many tokens go to OPENAI_FAST_MODEL
+    #   hedge_percentile: send a duplicate request once the first has run longer than this
+    #       percentile of the model's recent latencies; the first answer wins
+    #   deadline, fallback_model: also ask fallback_model once this many seconds have passed
+    # OPENAI_LATENCY_POLICIES (JSON) replaces the policy of the methods it names.
+    OPENAI_LATENCY_POLICIES = {
+        "generate_portfolio": {"hedge_percentile": 95, "deadline": 15, "fallback_model": OPENAI_FAST_MODEL},
+        "manipulate_portfolio": {"hedge_percentile": 95, "deadline": 12, "fallback_model": OPENAI_FAST_MODEL},
+        "assess_risk_and_diversify": {"model": OPENAI_FAST_MODEL, "hedge_percentile": 95},
+        "generate_trade_tweet": {},
+        "generate_trade_tweets": {},
+        **json.loads(os.getenv("OPENAI_LATENCY_POLICIES", "{}")),
+    }
+    # Hedge delay used until a model has OPENAI_HEDGE_MIN_SAMPLES recent latencies
+    OPENAI_HEDGE_DEFAULT_DELAY = float(os.getenv("OPENAI_HEDGE_DEFAULT_DELAY", "10"))
+    OPENAI_HEDGE_MIN_SAMPLES = int(os.getenv("OPENAI_HEDGE_MIN_SAMPLES", "20"))
+
+    # LLM response cache; set LLM_CACHE_PATH to add an on-disk tier shared by workers
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+    LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "10000"))
+    # Seconds per OpenAIService method; 0 disables caching
+    LLM_CACHE_TTLS = {
+        "generate_portfolio": 24 * 3600,
+        "assess_risk_and_diversify": 3600,
+        "manipulate_portfolio": 300,
+        "generate_trade_tweet": 0,
+        "generate_trade_tweets": 0,
+    }
+
+    # Market data
+    POLYGON_MAX_CONCURRENCY = int(os.getenv("POLYGON_MAX_CONCURRENCY", "8"))
+    TRADE_BATCH_MAX_TICKERS = int(os.getenv("TRADE_BATCH_MAX_TICKERS", "100"))
+    TREND_DEFAULT_WINDOW = 150
+    TREND_DEFAULT_LIMIT = 10
+    TREND_MAX_WINDOW = int(os.getenv("TREND_MAX_WINDOW", "500"))
+    TREND_MAX_LIMIT = int(os.getenv("TREND_MAX_LIMIT", "500"))
+
+    # Shared market data cache (one SQLite file used by every worker on the host)
+    CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(tempfile.gettempdir(), "matrix-agent-cache.sqlite3"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    CACHE_STALE_SECONDS = float(os.getenv("CACHE_STALE_SECONDS", "86400"))
+    CACHE_REFRESH_LEASE_SECONDS = float(os.getenv("CACHE_REFRESH_LEASE_SECONDS", "30"))
+    # Minutes after the close before Polygon's daily bars are considered final
+    MARKET_DATA_DELAY_MINUTES = int(os.getenv("MARKET_DATA_DELAY_MINUTES", "30"))
+
+    # Local memory-mapped OHLCV bar store, filled with `flask ingest-bars`
+    BAR_STORE_PATH = os.getenv("BAR_STORE_PATH", os.path.join(tempfile.gettempdir(), "matrix-agent-bars"))
+    BAR_STORE_BACKFILL_DAYS = int(os.getenv("BAR_STORE_BACKFILL_DAYS", "730"))
+
+    # Recommendation store: every /manipulate-portfolio and /assess-risk-and-diversify result,
+    # by X-User-Id, and the Idempotency-Keys retries are answered from. A duplicate waits up to
+    # IDEMPOTENCY_WAIT_SECONDS for the in-flight original; a claim older than
+    # IDEMPOTENCY_LEASE_SECONDS (its worker died) may be taken over by a retry.
+    RECOMMENDATION_STORE_PATH = os.getenv(
+        "RECOMMENDATION_STORE_PATH", os.path.join(tempfile.gettempdir(), "matrix-agent-recommendations.sqlite3"))
+    RECOMMENDATION_HISTORY_MAX_LIMIT = int(os.getenv("RECOMMENDATION_HISTORY_MAX_LIMIT", "100"))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+    IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "120"))
+
+    # Time each request has for its upstream calls, kept under gunicorn's 30s worker timeout.
+    # Callers may ask for less with an X-Request-Timeout header (seconds); 0 disables.
+    REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))
+
+    # Circuit breakers per upstream: open after this many consecutive failures, fail fast
+    # (or serve stale data) for CIRCUIT_BREAKER_RESET_SECONDS, then allow trial calls
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "1"))
+
+    # Shared outbound HTTP client
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+    HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+
+    # Throttle-service authentication; tokens are refreshed this many seconds before
+    # their `exp` claim, or after the default TTL when they carry none
+    SERVICE_AGENT_EMAIL = os.getenv("SERVICE_AGENT_EMAIL")
+    SERVICE_AGENT_PASSWORD = os.getenv("SERVICE_AGENT_PASSWORD")
+    AUTH_TOKEN_REFRESH_MARGIN_SECONDS = float(os.getenv("AUTH_TOKEN_REFRESH_MARGIN_SECONDS", "60"))
+    AUTH_TOKEN_DEFAULT_TTL_SECONDS = float(os.getenv("AUTH_TOKEN_DEFAULT_TTL_SECONDS", "3600"))
+
+    # Throttle-service price lookups
+    PRICE_LOOKUP_MAX_CONCURRENCY = int(os.getenv("PRICE_LOOKUP_MAX_CONCURRENCY", "8"))
+    PRICE_CACHE_TTL_SECONDS = float(os.getenv("PRICE_CACHE_TTL_SECONDS", "60"))
+
+    # Largest user prompt sent with holdings; smaller positions are merged beyond it
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+
+    # Risk figures for /assess-risk-and-diversify, from daily closes
+    RISK_LOOKBACK_DAYS = int(os.getenv("RISK_LOOKBACK_DAYS", "252"))
+    RISK_BENCHMARK = os.getenv("RISK_BENCHMARK", "SPY").upper()
+    RISK_VAR_CONFIDENCE = float(os.getenv("RISK_VAR_CONFIDENCE", "0.95"))
+    # Tickers with fewer daily returns are left out of the figures
+    RISK_MIN_OBSERVATIONS = int(os.getenv("RISK_MIN_OBSERVATIONS", "20"))
+
+    # Rebalancing
+    REBALANCE_MIN_TRADE_VALUE = float(os.getenv("REBALANCE_MIN_TRADE_VALUE", "0"))
+    REBALANCE_BATCH_MAX_ACCOUNTS = int(os.getenv("REBALANCE_BATCH_MAX_ACCOUNTS", "5000"))
+
+    # POST /tweet/batch: trades per request, and the prompt tokens and trades packed into one completion
+    TWEET_BATCH_MAX_TRADES = int(os.getenv("TWEET_BATCH_MAX_TRADES", "100"))
+    TWEET_BATCH_TOKEN_BUDGET = int(os.getenv("TWEET_BATCH_TOKEN_BUDGET", "1500"))
+    TWEET_BATCH_TRADES_PER_COMPLETION = int(os.getenv("TWEET_BATCH_TRADES_PER_COMPLETION", "10"))
+    TWEET_BATCH_MAX_CONCURRENCY = int(os.getenv("TWEET_BATCH_MAX_CONCURRENCY", "4"))
+
+    # Backtests (`flask backtest`): costs in basis points of each trade's value and per trade
+    BACKTEST_COST_BPS = float(os.getenv("BACKTEST_COST_BPS", "5"))
+    BACKTEST_FIXED_COST = float(os.getenv("BACKTEST_FIXED_COST", "0"))
+
+    # Post-close pre-warming of trend closes and previous-close prices
+    PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true"
+    # Comma-separated tickers; when empty the most recently requested tickers are used
+    PREWARM_WATCHLIST = [t.strip().upper() for t in os.getenv("PREWARM_WATCHLIST", "").split(",") if t.strip()]
+    PREWARM_RECENT_TICKERS = int(os.getenv("PREWARM_RECENT_TICKERS", "50"))
+    # Minutes after the data delay has passed before the job starts, plus random jitter
+    PREWARM_OFFSET_MINUTES = int(os.getenv("PREWARM_OFFSET_MINUTES", "5"))
+    PREWARM_JITTER_SECONDS = int(os.getenv("PREWARM_JITTER_SECONDS", "300"))
+    PREWARM_MAX_CONCURRENCY = int(os.getenv("PREWARM_MAX_CONCURRENCY", "4"))
+
+    # Client-side upstream rate limits, enforced per worker process (0 disables a budget)
+    OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+    OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+    # Per-model overrides, e.g. {"gpt-4o": {"requests": 500, "tokens": 30000}}
+    OPENAI_RATE_LIMITS = json.loads(os.getenv("OPENAI_RATE_LIMITS", "{}"))
+    # Completion tokens budgeted per request on top of the prompt estimate
+    OPENAI_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("OPENAI_COMPLETION_TOKENS_ESTIMATE", "800"))
+    POLYGON_REQUESTS_PER_MINUTE = int(os.getenv("POLYGON_REQUESTS_PER_MINUTE", "5"))
+    # Longest a call may queue for its budget, by priority class
+    RATE_LIMIT_MAX_WAIT_SECONDS = {
+        "interactive": float(os.getenv("RATE_LIMIT_MAX_WAIT_INTERACTIVE", "20")),
+        "normal": float(os.getenv("RATE_LIMIT_MAX_WAIT_NORMAL", "30")),
+        "background": float(os.getenv("RATE_LIMIT_MAX_WAIT_BACKGROUND", "600")),
+    }
     
     # OpenAI prompts
     PORTFOLIO_SYSTEM_PROMPT = """
@@ -54,6 +216,18 @@ class Config:
     You are a financial analyst that write tweets about your trades.
     """
 
+    TWEET_BATCH_SYSTEM_PROMPT = """
+    You are a financial analyst that write tweets about your trades.
+    Write one tweet for every trade; (optional) consider adding a short explanation based on its trend analysis.
+    Respond with the following JSON array, one object per trade, without any markdowns and surroundings:
+    [
+        {
+            "id": number (The trade's id),
+            "tweet": string (The tweet)
+        }
+    ]
+    """
+
     ASSESSMENT_AND_DIVERSIFICATION_PROMPT = """
     You are a financial advisor specializing in risk assessment and diversification.
     Provide an assessment of the risk profile of the portfolio and recommendations for balancing the portfolio across sectors, asset classes, and geographies.
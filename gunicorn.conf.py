@@ -0,0 +1,26 @@
+import os
+
+# SERVER_MODE=async serves the async blueprints on uvicorn workers, where one
+# process can hold many in-flight OpenAI/Polygon waits. The default keeps the
+# original sync Flask app on sync workers.
+server_mode = os.getenv("SERVER_MODE", "sync")
+
+if server_mode == "async":
+    wsgi_app = "asgi:app"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    # `app:app` would resolve to the `app` package, not app.py
+    wsgi_app = "run:app"
+
+# STARTUP_MODE=preload imports the heavy third-party dependencies once in the
+# master, so forked workers boot without importing them and share their pages
+# copy-on-write. STARTUP_MODE=lazy leaves every worker to import them itself,
+# on first use. Either way the app's own modules are imported and the app is
+# created per worker (no preload_app), so the scheduler and connection pools
+# are never shared across a fork and a HUP reload runs the current code.
+startup_mode = os.getenv("STARTUP_MODE", "preload")
+
+if startup_mode == "preload":
+    from preload import master_modules, preload
+
+    preload(master_modules(server_mode))
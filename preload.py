@@ -0,0 +1,55 @@
+"""Preloading of the app's heavy imports in the gunicorn master.
+
+With ``STARTUP_MODE=preload`` (the default) ``gunicorn.conf.py`` imports
+these third-party modules once in the master before it forks. Every worker,
+including the ones started later to replace or add workers, then inherits
+them already imported and shares their pages copy-on-write. The app's own
+modules are never imported in the master: each worker imports them and
+creates the app itself, so clients, pools and the scheduler are never
+shared, and a HUP reload picks up new app code. Upgraded dependencies still
+need a full restart (this module sits outside the ``app`` package so that
+importing it loads none of the app). With ``STARTUP_MODE=lazy`` the master
+imports nothing, and each worker imports the OpenAI SDK only when it builds
+its first client.
+"""
+import gc
+import importlib
+import logging
+import time
+from typing import Dict, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Third-party packages that dominate a worker's import time
+HEAVY_MODULES = ("numpy", "requests", "httpx", "openai", "flask", "flask_cors", "flask_apscheduler")
+# Extra packages for SERVER_MODE=async
+ASYNC_MODULES = ("quart", "quart_cors", "asgiref.wsgi")
+
+def master_modules(server_mode: str) -> Sequence[str]:
+    """The modules the gunicorn master preloads for ``server_mode``."""
+    return HEAVY_MODULES + (ASYNC_MODULES if server_mode == "async" else ())
+
+def preload(modules: Sequence[str], freeze: bool = True) -> Dict[str, float]:
+    """Import ``modules`` and return the seconds each one took.
+
+    Modules that fail to import are logged and skipped; workers will report
+    the error themselves. With ``freeze`` the objects created so far are
+    moved out of the garbage collector's reach, so collections in the
+    workers do not write to (and copy) the shared pages.
+    """
+    timings: Dict[str, float] = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning("Could not preload %s: %s", name, e)
+            continue
+        timings[name] = time.perf_counter() - started
+
+    if freeze:
+        gc.freeze()
+    logger.info(
+        "Preloaded %d modules in %.0f ms", len(timings), 1000 * sum(timings.values())
+    )
+    return timings
@@ -1,7 +1,9 @@
 import os
 from app import create_app
+from app.scheduler import init_scheduler
 
 app = create_app(os.getenv('FLASK_ENV', 'default'))
+scheduler = init_scheduler(app)
 
 if __name__ == '__main__':
-    app.run() 
\ No newline at end of file
+    app.run()
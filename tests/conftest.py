@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read when config.settings is imported, so point every store at a scratch directory first
+_SCRATCH = tempfile.mkdtemp(prefix="matrix-agent-tests-")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("POLYGON_API_KEY", "test")
+os.environ.update({
+    "CACHE_PATH": os.path.join(_SCRATCH, "cache.sqlite3"),
+    "BAR_STORE_PATH": os.path.join(_SCRATCH, "bars"),
+    "RECOMMENDATION_STORE_PATH": os.path.join(_SCRATCH, "recommendations.sqlite3"),
+    "LLM_CACHE_PATH": "",
+    "PREWARM_ENABLED": "false",
+})
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+    return create_app()
@@ -0,0 +1,43 @@
+from app.utils import auth_utils
+
+class Response:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"accessToken": "token"}
+
+def test_token_comes_from_the_configured_throttle_service(app, monkeypatch):
+    posted = []
+    monkeypatch.setattr(auth_utils.http_client, "post", lambda url, json: posted.append((url, json)) or Response())
+    monkeypatch.setitem(app.config, 'THROTTLE_SERVICE_URL', "http://throttle.test")
+    monkeypatch.setitem(app.config, 'SERVICE_AGENT_EMAIL', "agent@example.com")
+    auth_utils.init_app(app)
+    try:
+        assert auth_utils.token_manager.get_token() == "token"
+        assert auth_utils.token_manager.get_token() == "token"
+    finally:
+        monkeypatch.undo()
+        auth_utils.init_app(app)
+
+    url, credentials = posted[0]
+    assert len(posted) == 1
+    assert url == "http://throttle.test/authentication"
+    assert credentials["email"] == "agent@example.com"
+
+def test_cached_token_survives_a_concurrent_invalidation():
+    raced = []
+
+    class RacingTokenManager(auth_utils.TokenManager):
+        def _is_valid(self, *args):
+            valid = super()._is_valid(*args)
+            # Another thread drops the token right after this one found it valid
+            if valid and not raced:
+                raced.append(True)
+                self.invalidate("token")
+            return valid
+
+    manager = RacingTokenManager(fetch=lambda: "token", refresh_margin=0, default_ttl=3600)
+    assert manager.get_token() == "token"
+    assert manager.get_token() == "token"
+    assert raced
@@ -0,0 +1,20 @@
+import numpy as np
+
+from app.utils.backtest import backtest
+from app.utils.rebalance import rebalance
+
+def test_rebalance_sizes_from_the_given_value():
+    # The unpriced holding's 500 still counts, so the priced one is already on target
+    deltas = rebalance(np.array([[50.0, 50.0]]), np.array([10.0, np.nan]), np.array([0.5, 0.5]), np.array([0.0]),
+                       value=np.array([1000.0]))
+    assert deltas.tolist() == [[0.0, 0.0]]
+
+def test_held_asset_without_a_close_keeps_its_last_value():
+    closes = np.array([[10.0, 10.0], [10.0, np.nan], [10.0, 10.0]])
+    targets = np.array([[[0.5, 0.5], [0.5, 0.5], [np.nan, np.nan]]])
+
+    result = backtest(closes, np.array([0, 1, 2]), targets, np.array([1000.0]))
+
+    assert result["traded"].tolist() == [[1000.0, 0.0, 0.0]]
+    assert result["positions"].tolist() == [[50.0, 50.0]]
+    assert result["equity"].tolist() == [[1000.0, 1000.0, 1000.0]]
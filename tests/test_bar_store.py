@@ -0,0 +1,101 @@
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from app.services import polygon_service
+from app.services.polygon_service import PolygonService
+from app.utils import rate_limiter
+from app.utils.bar_store import BarStore
+from app.utils.market_hours import MARKET_CLOSE, MARKET_TIMEZONE
+
+def _bar(close):
+    return {"open": close, "high": close, "low": close, "close": close, "volume": 1.0}
+
+@pytest.fixture
+def service(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        polygon_service, "last_market_close",
+        lambda delay_minutes=0: datetime.combine(date(2024, 6, 4), MARKET_CLOSE, tzinfo=MARKET_TIMEZONE)
+    )
+    with app.app_context():
+        service = PolygonService(app)
+    service._bar_store = BarStore(str(tmp_path))
+    return service
+
+def test_stored_closes_skip_tickers_without_a_current_bar(service):
+    store = service._bar_store
+    store.append_day(date(2024, 6, 3), {"AAA": _bar(1.0), "OLD": _bar(5.0)})
+    store.append_day(date(2024, 6, 4), {"AAA": _bar(2.0)})
+
+    assert service._stored_closes("AAA", 2).tolist() == [1.0, 2.0]
+    assert service._stored_closes("OLD", 1) is None
+    assert service._stored_closes("NONE", 1) is None
+
+def test_holidays_do_not_make_tickers_stale(service):
+    store = service._bar_store
+    store.append_day(date(2024, 6, 3), {"AAA": _bar(1.0)})
+    store.append_day(date(2024, 6, 4), {})
+
+    assert store.ingested_through() == date(2024, 6, 4)
+    assert store.last_session() == date(2024, 6, 3)
+    assert service._stored_closes("AAA", 1).tolist() == [1.0]
+
+def test_ingest_re_backfills_tickers_that_split(service, monkeypatch):
+    store = service._bar_store
+    store.append_day(date(2024, 5, 31), {"AAA": _bar(100.0), "BBB": _bar(10.0)})
+    adjusted = {
+        "date": [np.datetime64("2024-05-31"), np.datetime64("2024-06-03")],
+        "open": [50.0, 51.0], "high": [50.0, 51.0], "low": [50.0, 51.0],
+        "close": [50.0, 51.0], "volume": [2.0, 2.0],
+    }
+    monkeypatch.setattr(service, "fetch_splits", lambda start, end: {"AAA": date(2024, 6, 3), "NEW": date(2024, 6, 3)})
+    monkeypatch.setattr(service, "fetch_daily_bars", lambda ticker, start, end: adjusted)
+    monkeypatch.setattr(service, "fetch_grouped_daily", lambda day: {"AAA": _bar(51.0), "BBB": _bar(11.0)})
+
+    appended = service.ingest_bars(date(2024, 6, 3), date(2024, 6, 3))
+
+    assert appended == {"2024-06-03": 1}
+    assert store.read("AAA")["close"].tolist() == [50.0, 51.0]
+    assert store.read("BBB")["close"].tolist() == [10.0, 11.0]
+    assert store.first_date("NEW") is None
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+def test_ingest_waits_out_the_rate_limit(app, service, monkeypatch):
+    # Normal-priority calls may not wait at all; only background ones can outlast the bucket
+    rate_limiter.configure({"polygon": {"requests": 600}},
+                           {rate_limiter.INTERACTIVE: 0.0, rate_limiter.NORMAL: 0.0, rate_limiter.BACKGROUND: 5.0})
+    bucket = rate_limiter.limiter("polygon")._buckets["requests"]
+    bucket.level, bucket.updated = 2, time.monotonic()
+    monkeypatch.setattr(polygon_service.http_client, "get", lambda url: _Response(
+        {"results": [] if "/splits" in url else [{"T": "AAA", "o": 1, "h": 1, "l": 1, "c": 1, "v": 1}]}
+    ))
+    try:
+        appended = service.ingest_bars(date(2024, 6, 3), date(2024, 6, 12))
+    finally:
+        rate_limiter.init_app(app)
+
+    assert len(appended) == 8
+    assert service._bar_store.ingested_through() == date(2024, 6, 12)
+    assert rate_limiter.current_priority() == rate_limiter.NORMAL
+
+def test_cli_rejects_a_start_inside_the_ingested_range(app, tmp_path, monkeypatch):
+    store = BarStore(str(tmp_path))
+    store.append_day(date(2024, 6, 4), {"AAA": _bar(1.0)})
+    monkeypatch.setitem(app.extensions, "bar_store", store)
+    monkeypatch.setattr(PolygonService, "ingest_bars", lambda self, start, end: pytest.fail("ingested"))
+
+    result = app.test_cli_runner().invoke(args=["ingest-bars", "--start", "2024-06-04", "--end", "2024-06-07"])
+
+    assert result.exit_code != 0
+    assert "ingested through 2024-06-04" in result.output
@@ -0,0 +1,13 @@
+import pytest
+
+from app.utils.deadlines import TIMEOUT_HEADER, _request_seconds
+
+CONFIG = {"REQUEST_DEADLINE_SECONDS": 25.0}
+
+@pytest.mark.parametrize("value", ["0", "-5", "nan", "inf", "-inf", "soon", ""])
+def test_invalid_timeouts_keep_the_server_deadline(value):
+    assert _request_seconds(CONFIG, {TIMEOUT_HEADER: value}) == 25.0
+
+def test_shorter_timeout_is_honoured_and_longer_one_capped():
+    assert _request_seconds(CONFIG, {TIMEOUT_HEADER: "3"}) == 3.0
+    assert _request_seconds(CONFIG, {TIMEOUT_HEADER: "90"}) == 25.0
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.deadlines import DeadlineExceeded
+from app.utils.rate_limiter import RateLimitTimeout
+
+CASES = [
+    (ValueError("Window must be positive"), 400, None),
+    (RateLimitTimeout("polygon", 2.5), 503, "3"),
+    (CircuitOpenError("polygon", 4), 503, "4"),
+    (DeadlineExceeded("out of time"), 504, None),
+    (RuntimeError("boom"), 500, None),
+]
+
+@pytest.fixture
+def failing_trend(monkeypatch):
+    from app.services.async_polygon_service import AsyncPolygonService
+    from app.services.polygon_service import PolygonService
+
+    def use(error):
+        def analyze_trend(self, ticker, **params):
+            raise error
+
+        async def analyze_trend_async(self, ticker, **params):
+            raise error
+
+        monkeypatch.setattr(PolygonService, "analyze_trend", analyze_trend)
+        monkeypatch.setattr(AsyncPolygonService, "analyze_trend", analyze_trend_async)
+    return use
+
+@pytest.mark.parametrize("error, status, retry_after", CASES)
+def test_flask_views_map_errors(app, failing_trend, error, status, retry_after):
+    failing_trend(error)
+    response = app.test_client().get("/trade?ticker=AAA")
+
+    assert response.status_code == status
+    assert response.headers.get("Retry-After") == retry_after
+    assert response.get_json()["error"] == ("Internal server error" if status == 500 else str(error))
+
+@pytest.mark.parametrize("error, status, retry_after", CASES)
+def test_quart_views_map_errors(app, failing_trend, error, status, retry_after):
+    from app.asgi import create_asgi_app
+
+    failing_trend(error)
+    async_client = create_asgi_app(wsgi_app=app).async_app.test_client()
+
+    async def get():
+        response = await async_client.get("/trade?ticker=AAA")
+        return response.status_code, response.headers.get("Retry-After"), await response.get_json()
+
+    got_status, got_retry_after, body = asyncio.run(get())
+    assert got_status == status
+    assert got_retry_after == retry_after
+    assert body["error"] == ("Internal server error" if status == 500 else str(error))
+
+def test_http_errors_keep_their_status(app):
+    from app.asgi import create_asgi_app
+
+    async_client = create_asgi_app(wsgi_app=app).async_app.test_client()
+
+    async def post():
+        return (await async_client.post("/trade?ticker=AAA")).status_code
+
+    assert app.test_client().get("/no-such-route").status_code == 404
+    assert app.test_client().post("/trade?ticker=AAA").status_code == 405
+    assert asyncio.run(post()) == 405
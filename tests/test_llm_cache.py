@@ -0,0 +1,22 @@
+import json
+
+from app.utils.llm_cache import LLMCache
+
+def _is_json(content):
+    try:
+        json.loads(content)
+        return True
+    except ValueError:
+        return False
+
+def test_malformed_completion_is_not_cached():
+    cache = LLMCache()
+    answers = iter(["not json", '{"portfolio": []}'])
+
+    first = cache.get_or_create("generate_portfolio", "key", 60, lambda: next(answers), validate=_is_json)
+    second = cache.get_or_create("generate_portfolio", "key", 60, lambda: next(answers), validate=_is_json)
+
+    assert first == "not json"
+    assert second == '{"portfolio": []}'
+    assert cache.lookup("generate_portfolio", "key", 60) == '{"portfolio": []}'
+    assert cache.stats()["endpoints"]["generate_portfolio"]["invalid"] == 1
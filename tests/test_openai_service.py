@@ -0,0 +1,78 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.async_openai_service import AsyncOpenAIService
+from app.services.openai_service import OpenAIService
+from app.utils import circuit_breaker, deadlines
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+def _chunks(pause=0.0, error=None):
+    for content in ("one", "two"):
+        time.sleep(pause)
+        yield _chunk(content)
+    if error is not None:
+        raise error
+
+async def _async_chunks(pause=0.0, error=None):
+    for chunk in _chunks(pause, error):
+        yield chunk
+
+def _service(app, monkeypatch, cls, chunks):
+    create = chunks if cls is OpenAIService else (lambda **kwargs: _awaitable(chunks(**kwargs)))
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(cls, "_get_client", staticmethod(lambda app: client))
+    with app.app_context():
+        return cls(app, bypass_cache=True)
+
+async def _awaitable(value):
+    return value
+
+def _collect(service, model):
+    stream = service._stream("stream_test", model, "system", "prompt", 0.5)
+    if isinstance(service, AsyncOpenAIService):
+        async def collect():
+            return [delta async for delta in stream]
+        return asyncio.run(collect())
+    return list(stream)
+
+@pytest.mark.parametrize("cls, chunks", [(OpenAIService, _chunks), (AsyncOpenAIService, _async_chunks)])
+def test_a_broken_stream_counts_against_the_model(app, monkeypatch, cls, chunks):
+    model = f"broken-{cls.__name__}"
+    service = _service(app, monkeypatch, cls, lambda **kwargs: chunks(error=ConnectionError("reset")))
+
+    with pytest.raises(ConnectionError):
+        _collect(service, model)
+
+    stats = circuit_breaker.breaker(f"openai:{model}").stats()
+    assert stats.get("failure", 0) == 1 and stats.get("success", 0) == 0
+
+@pytest.mark.parametrize("cls, chunks", [(OpenAIService, _chunks), (AsyncOpenAIService, _async_chunks)])
+def test_a_slow_stream_is_bounded_by_the_deadline(app, monkeypatch, cls, chunks):
+    model = f"slow-{cls.__name__}"
+    service = _service(app, monkeypatch, cls, lambda **kwargs: chunks(pause=0.1))
+
+    deadlines.start(0.15)
+    try:
+        with pytest.raises(deadlines.DeadlineExceeded):
+            _collect(service, model)
+    finally:
+        deadlines.start(None)
+
+    stats = circuit_breaker.breaker(f"openai:{model}").stats()
+    assert stats.get("ignored", 0) == 1 and stats.get("failure", 0) == 0
+
+def test_closing_a_stream_early_is_not_a_failure(app, monkeypatch):
+    model = "closed-stream"
+    service = _service(app, monkeypatch, OpenAIService, lambda **kwargs: _chunks())
+
+    stream = service._stream("stream_test", model, "system", "prompt", 0.5)
+    assert next(stream) == "one"
+    stream.close()
+
+    stats = circuit_breaker.breaker(f"openai:{model}").stats()
+    assert stats.get("ignored", 0) == 1 and stats.get("failure", 0) == 0
@@ -0,0 +1,28 @@
+import pytest
+
+from app.utils import metrics
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def test_ops_endpoints_are_off_without_a_token(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'OPS_TOKEN', None)
+    assert client.get("/metrics").status_code == 404
+
+def test_ops_endpoints_require_the_token(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'OPS_TOKEN', "secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
+
+@pytest.mark.parametrize("request_id, kept", [
+    ("abc-123_X.y", True),
+    ("a" * 64, True),
+    ("a" * 65, False),
+    ("bad id", False),
+    ("inject\r\nX-Evil: 1", False),
+    ("", False),
+])
+def test_client_request_ids_are_kept_only_when_well_formed(request_id, kept):
+    assert (metrics.start_request("test", request_id) == request_id) is kept
@@ -0,0 +1,91 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from app.utils import deadlines
+from app.utils.rate_limiter import (
+    BACKGROUND, INTERACTIVE, NORMAL, RateLimiter, RateLimitTimeout, estimate_tokens, priority
+)
+
+MAX_WAIT = {INTERACTIVE: 5.0, NORMAL: 5.0, BACKGROUND: 5.0}
+
+def _limiter(limits, max_wait=MAX_WAIT, level=0.0):
+    limiter = RateLimiter("test", limits, max_wait)
+    for bucket in limiter._buckets.values():
+        bucket.level, bucket.updated = level, time.monotonic()
+    return limiter
+
+def test_calls_within_the_budget_do_not_wait():
+    limiter = _limiter({"requests": 60}, level=2)
+    assert limiter.acquire({"requests": 1}) < 0.05
+    assert limiter.acquire({"requests": 1}) < 0.05
+    assert limiter.stats()["admitted"] == 2
+
+def test_higher_priority_is_admitted_first():
+    # One request per 0.1 s, starting from an empty bucket
+    limiter = _limiter({"requests": 600})
+    admitted = []
+
+    def call(level):
+        limiter.acquire({"requests": 1}, level)
+        admitted.append(level)
+
+    background = threading.Thread(target=call, args=(BACKGROUND,))
+    background.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=call, args=(INTERACTIVE,))
+    interactive.start()
+    background.join()
+    interactive.join()
+
+    assert admitted == [INTERACTIVE, BACKGROUND]
+
+def test_context_priority_applies_without_an_explicit_level():
+    limiter = _limiter({"requests": 6}, max_wait={INTERACTIVE: 0.0, NORMAL: 0.0, BACKGROUND: 0.3})
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire({"requests": 1})
+    with priority(BACKGROUND), pytest.raises(RateLimitTimeout):
+        started = time.monotonic()
+        limiter.acquire({"requests": 1})
+    assert time.monotonic() - started >= 0.25
+
+def test_wait_is_bounded_and_reports_retry_after():
+    # One request per 10 s, so the wait for the next one exceeds the 0.1 s allowed
+    limiter = _limiter({"requests": 6}, max_wait={**MAX_WAIT, NORMAL: 0.1})
+    with pytest.raises(RateLimitTimeout) as raised:
+        limiter.acquire({"requests": 1})
+
+    assert raised.value.retry_after == 10
+    assert limiter.stats()["timeouts"] == 1
+    assert limiter.stats()["queued"] == 0
+
+def test_wait_is_clipped_to_the_request_deadline():
+    limiter = _limiter({"requests": 6})
+
+    def acquire():
+        deadlines.start(0.1)
+        started = time.monotonic()
+        with pytest.raises(RateLimitTimeout):
+            limiter.acquire({"requests": 1})
+        return time.monotonic() - started
+
+    assert contextvars.copy_context().run(acquire) < 1
+
+def test_token_budget_gates_large_prompts():
+    limiter = _limiter({"requests": 600, "tokens": 6000}, max_wait={**MAX_WAIT, NORMAL: 0.1}, level=100)
+    assert limiter.acquire({"requests": 1, "tokens": 50}) < 0.05
+    # 50 tokens left, refilling at 100/s: 200 more take longer than the allowed wait
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire({"requests": 1, "tokens": 250})
+    assert estimate_tokens("x" * 400, completion_tokens=50) == 150
+
+def test_async_acquire_waits_for_the_bucket():
+    limiter = _limiter({"requests": 600})
+    waited = asyncio.run(limiter.acquire_async({"requests": 1}))
+    assert 0.05 < waited < 1
+
+def test_unlimited_limiter_admits_immediately():
+    assert RateLimiter("free", {}, MAX_WAIT).acquire({"requests": 100}) == 0
@@ -0,0 +1,63 @@
+import numpy as np
+
+from app.services.portfolio_service import PortfolioService
+from app.utils.rebalance import rebalance, trade_cash
+
+def test_rebalance_buys_to_target_weights():
+    deltas = rebalance(np.zeros((1, 2)), np.array([10.0, 20.0]), np.array([0.5, 0.5]), np.array([1000.0]))
+    assert deltas.tolist() == [[50.0, 25.0]]
+    assert trade_cash(deltas, np.array([10.0, 20.0])).tolist() == [-1000.0]
+
+def test_rebalance_leaves_unpriced_assets_in_cash():
+    deltas = rebalance(np.zeros((1, 2)), np.array([10.0, np.nan]), np.array([0.5, 0.5]), np.array([1000.0]))
+    assert deltas.tolist() == [[50.0, 0.0]]
+
+def test_rebalance_scales_buys_to_available_cash():
+    # Targets above 100% of value cannot all be bought; buys shrink by the same factor
+    deltas = rebalance(np.zeros((1, 2)), np.array([10.0, 10.0]), np.array([1.0, 1.0]), np.array([1000.0]))
+    assert deltas.tolist() == [[50.0, 50.0]]
+
+def test_request_prices_take_precedence_over_holdings(app):
+    accounts = [{
+        "id": "a",
+        "cash": 0,
+        "totals": {"AAA": {"position": 10, "currentPrice": 100}},
+        "targets": {"AAA": 50},
+    }]
+    with app.app_context():
+        result = PortfolioService(app).rebalance_accounts(accounts, prices={"AAA": 200})
+
+    trade, = result["results"][0]["trades"]
+    # Valued at the request's 200, not the holding's 100: 2000 total, half of it sold
+    assert trade == {"ticker": "AAA", "action": "sell", "papers": 5.0, "currentPrice": 200.0}
+    assert result["results"][0]["remainingCash"] == 1000.0
+
+def test_holding_prices_apply_per_account_without_request_prices(app):
+    accounts = [
+        {"id": "a", "cash": 0, "totals": {"AAA": {"position": 10, "currentPrice": 100}}, "targets": {"AAA": 50}},
+        {"id": "b", "cash": 0, "totals": {"AAA": {"position": 10, "currentPrice": 50}}, "targets": {"AAA": 50}},
+    ]
+    with app.app_context():
+        result = PortfolioService(app).rebalance_accounts(accounts)
+
+    assert [r["trades"][0]["currentPrice"] for r in result["results"]] == [100.0, 50.0]
+
+def test_recommended_actions_follow_the_trades(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'REBALANCE_MIN_TRADE_VALUE', 50)
+    totals = {
+        "AAA": {"position": 10, "currentPrice": 100, "currentValue": 1000},
+        "BBB": {"position": 10, "currentPrice": 100, "currentValue": 1000},
+    }
+    recommendation = {"portfolio": [
+        {"ticker": "AAA", "percentage": 51},
+        {"ticker": "BBB", "percentage": 25},
+        {"ticker": "CCC", "percentage": 24},
+    ]}
+    with app.app_context():
+        result = PortfolioService(app)._apply_actions(recommendation, 0, totals, {"CCC": 50})
+
+    # AAA is 1% (20) under its target, below the minimum trade: held, not bought
+    actions = {stock["ticker"]: (stock["action"], stock["papers"]) for stock in result["portfolio"]}
+    assert actions["AAA"] == ("hold", 0.0)
+    assert actions["BBB"][0] == "sell" and actions["BBB"][1] > 0
+    assert actions["CCC"][0] == "buy" and actions["CCC"][1] > 0
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils.recommendation_store import IdempotencyConflict, IdempotencyInFlight, RecommendationStore
+
+@pytest.fixture
+def store(tmp_path):
+    return RecommendationStore(str(tmp_path / "recommendations.sqlite3"), wait_seconds=2)
+
+def test_retry_with_the_same_key_replays_the_stored_result(store):
+    calls = []
+    first = store.record("alice", "k1", "manipulate_portfolio", "fp", lambda: calls.append(1) or {"n": 1})
+    retry = store.record("alice", "k1", "manipulate_portfolio", "fp", lambda: calls.append(1) or {"n": 2})
+
+    assert first == (1, {"n": 1}, False)
+    assert retry == (1, {"n": 1}, True)
+    assert calls == [1]
+
+def test_requests_without_a_key_always_run(store):
+    assert store.record("alice", None, "e", "fp", lambda: 1)[:2] == (1, 1)
+    assert store.record("alice", None, "e", "fp", lambda: 2)[:2] == (2, 2)
+
+def test_reusing_a_key_for_another_request_conflicts(store):
+    store.record("alice", "k1", "e", "fp", lambda: 1)
+    with pytest.raises(IdempotencyConflict):
+        store.record("alice", "k1", "e", "other", lambda: 2)
+    with pytest.raises(IdempotencyConflict):
+        store.record("alice", "k1", "other", "fp", lambda: 2)
+
+def test_keys_are_scoped_to_their_owner(store):
+    store.record("alice", "k1", "e", "fp", lambda: "alice's")
+    record_id, result, replayed = store.record("bob", "k1", "e", "fp", lambda: "bob's")
+
+    assert (result, replayed) == ("bob's", False)
+    assert [record["result"] for record in store.history("bob")] == ["bob's"]
+    assert store.get(record_id)["userId"] == "bob"
+
+def test_failed_request_releases_its_key(store):
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        store.record("alice", "k1", "e", "fp", fail)
+    record_id, result, replayed = store.record("alice", "k1", "e", "fp", lambda: "ok")
+
+    assert (result, replayed) == ("ok", False)
+    assert store.history("alice") == [store.get(record_id)]
+
+def test_duplicate_waits_for_the_request_in_flight(store):
+    record_id, _ = store.claim("alice", "k1", "e", "fp")
+
+    def finish():
+        time.sleep(0.2)
+        store.complete(record_id, "done")
+
+    threading.Thread(target=finish).start()
+    assert store.record("alice", "k1", "e", "fp", lambda: "again") == (record_id, "done", True)
+
+def test_duplicate_gives_up_after_the_wait(tmp_path):
+    store = RecommendationStore(str(tmp_path / "r.sqlite3"), wait_seconds=0.2)
+    store.claim("alice", "k1", "e", "fp")
+
+    with pytest.raises(IdempotencyInFlight) as raised:
+        store.claim("alice", "k1", "e", "fp")
+    assert raised.value.retry_after == 1
+
+def test_lapsed_lease_is_taken_over(tmp_path):
+    store = RecommendationStore(str(tmp_path / "r.sqlite3"), lease_seconds=0.05, wait_seconds=1)
+    record_id, _ = store.claim("alice", "k1", "e", "fp")
+    time.sleep(0.1)
+
+    assert store.claim("alice", "k1", "e", "fp") == (record_id, None)
+
+def test_record_async_replays_and_releases(store):
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def succeed():
+        return "ok"
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await store.record_async("alice", "k1", "e", "fp", fail)
+        first = await store.record_async("alice", "k1", "e", "fp", succeed)
+        return first, await store.record_async("alice", "k1", "e", "fp", fail)
+
+    first, retry = asyncio.run(main())
+    assert first[1:] == ("ok", False)
+    assert retry == (first[0], "ok", True)
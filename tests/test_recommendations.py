@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+AUTH = {"Authorization": "Bearer reader"}
+
+@pytest.fixture
+def client(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'RECOMMENDATIONS_READ_TOKEN', "reader")
+    return app.test_client()
+
+def test_reads_are_off_without_a_token(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'RECOMMENDATIONS_READ_TOKEN', None)
+    assert client.get("/recommendations", headers={"X-User-Id": "alice"}).status_code == 404
+
+def test_reads_require_the_token(client):
+    assert client.get("/recommendations", headers={"X-User-Id": "alice"}).status_code == 401
+    assert client.get("/recommendations", headers={"X-User-Id": "alice", **AUTH}).status_code == 200
+
+def test_reads_require_a_bounded_user_id(client):
+    assert client.get("/recommendations", headers=AUTH).status_code == 400
+    assert client.get("/recommendations", headers={"X-User-Id": "a" * 256, **AUTH}).status_code == 400
+
+BODY = {"cash": 1000, "totals": {}}
+
+@pytest.fixture
+def manipulations(monkeypatch):
+    from app.services.async_portfolio_service import AsyncPortfolioService
+    from app.services.portfolio_service import PortfolioService
+
+    calls = []
+
+    def manipulate(self, cash, totals, additional_info=""):
+        calls.append(cash)
+        return {"cash": cash, "call": len(calls)}
+
+    async def manipulate_async(self, cash, totals, additional_info=""):
+        return manipulate(self, cash, totals, additional_info)
+
+    monkeypatch.setattr(PortfolioService, "manipulate", manipulate)
+    monkeypatch.setattr(AsyncPortfolioService, "manipulate", manipulate_async)
+    return calls
+
+def test_route_replays_a_retried_request(client, manipulations):
+    headers = {"X-User-Id": "route-sync", "Idempotency-Key": "retry-1"}
+    first = client.post("/manipulate-portfolio", json=BODY, headers=headers)
+    retry = client.post("/manipulate-portfolio", json=BODY, headers=headers)
+    other = client.post("/manipulate-portfolio", json={**BODY, "cash": 5}, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json() == first.get_json() == {"cash": 1000, "call": 1}
+    assert retry.headers["X-Recommendation-Id"] == first.headers["X-Recommendation-Id"]
+    assert "Idempotent-Replayed" not in first.headers and retry.headers["Idempotent-Replayed"] == "true"
+    assert other.status_code == 422
+    assert manipulations == [1000]
+
+    stored = client.get(f"/recommendations/{first.headers['X-Recommendation-Id']}",
+                        headers={"X-User-Id": "someone-else", **AUTH})
+    assert stored.status_code == 404
+
+def test_route_needs_an_owner_for_a_key(client, manipulations):
+    response = client.post("/manipulate-portfolio", json=BODY, headers={"Idempotency-Key": "anonymous"})
+    assert response.status_code == 400
+    assert manipulations == []
+
+def test_async_route_replays_a_retried_request(app, manipulations):
+    from app.asgi import create_asgi_app
+
+    async_client = create_asgi_app(wsgi_app=app).async_app.test_client()
+    headers = {"X-User-Id": "route-async", "Idempotency-Key": "retry-1"}
+
+    async def post(body):
+        response = await async_client.post("/manipulate-portfolio", json=body, headers=headers)
+        return response.status_code, await response.get_json(), response.headers
+
+    async def main():
+        return await post(BODY), await post(BODY), await post({**BODY, "cash": 5})
+
+    first, retry, other = asyncio.run(main())
+    assert first[0] == retry[0] == 200
+    assert retry[1] == first[1] == {"cash": 1000, "call": 1}
+    assert retry[2]["X-Recommendation-Id"] == first[2]["X-Recommendation-Id"]
+    assert retry[2]["Idempotent-Replayed"] == "true"
+    assert other[0] == 422
+    assert manipulations == [1000]
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight("test.cancelled_leader")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do_async("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do_async("key", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == 42
+    assert len(calls) == 1
+
+def test_call_is_cancelled_when_every_caller_gives_up():
+    flight = SingleFlight("test.abandoned")
+    finished = []
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def scenario():
+        caller = asyncio.create_task(flight.do_async("key", fetch))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert finished == []
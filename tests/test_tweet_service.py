@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from app.services.async_tweet_service import AsyncTweetService
+from app.services.tweet_service import TweetService
+from app.utils.circuit_breaker import CircuitOpenError
+
+TRADES = [
+    {"ticker": "AAA", "price": 10, "operation": "BUY", "papers": 1},
+    {"ticker": "BBB", "price": 20, "operation": "SELL", "papers": 2},
+]
+
+class FakeOpenAI:
+    def __init__(self, batch):
+        self.batch = batch
+        self.single_calls = 0
+
+    def generate_trade_tweets(self, trades):
+        if isinstance(self.batch, Exception):
+            raise self.batch
+        return self.batch
+
+    def generate_trade_tweet(self, ticker, **_):
+        self.single_calls += 1
+        return f"tweet {ticker}"
+
+class AsyncFakeOpenAI(FakeOpenAI):
+    async def generate_trade_tweets(self, trades):
+        return FakeOpenAI.generate_trade_tweets(self, trades)
+
+    async def generate_trade_tweet(self, ticker, **kwargs):
+        return FakeOpenAI.generate_trade_tweet(self, ticker, **kwargs)
+
+def _service(app, cls, openai):
+    with app.app_context():
+        service = cls(app)
+    service._openai_service = openai
+    service.analyses = (lambda tickers: {}) if cls is TweetService else _no_analyses
+    return service
+
+async def _no_analyses(tickers):
+    return {}
+
+def test_partial_answer_falls_back_per_trade(app):
+    openai = FakeOpenAI('[{"id": 0, "tweet": "batch AAA"}]')
+    results = _service(app, TweetService, openai).tweet_batch(TRADES)["results"]
+
+    assert [result["tweet"] for result in results] == ["batch AAA", "tweet BBB"]
+    assert openai.single_calls == 1
+
+def test_open_circuit_fails_the_batch(app):
+    openai = FakeOpenAI(CircuitOpenError("openai:gpt", 5))
+    with pytest.raises(CircuitOpenError):
+        _service(app, TweetService, openai).tweet_batch(TRADES)
+    assert openai.single_calls == 0
+
+def test_open_circuit_fails_the_async_batch(app):
+    openai = AsyncFakeOpenAI(CircuitOpenError("openai:gpt", 5))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(_service(app, AsyncTweetService, openai).tweet_batch(TRADES))
+    assert openai.single_calls == 0